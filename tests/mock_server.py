@@ -0,0 +1,158 @@
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def self_signed_context() -> ssl.SSLContext:
+    """
+    Method to build the TLS context of a local server, with a certificate for localhost made by openssl
+
+    :return: (ssl.SSLContext) None when openssl is not installed
+    """
+    if shutil.which("openssl") is None:
+        return None
+    directory = tempfile.mkdtemp()
+    cert, key = os.path.join(directory, "localhost.crt"), os.path.join(directory, "localhost.key")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-keyout", key, "-out", cert, "-subj", "/CN=localhost",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    shutil.rmtree(directory)
+
+    return context
+
+
+def zia_pages(
+    records: list,
+):
+    """
+    Method to serve records the way ZIA list endpoints do: page and pageSize parameters, an empty page after the last
+
+    :param records: (list) Records
+
+    :return: (callable) Route
+    """
+
+    def route(query, body):
+        page = int(query.get("page", 1))
+        size = int(query.get("pageSize", 100))
+        return 200, records[(page - 1) * size : page * size]
+
+    return route
+
+
+def zpa_pages(
+    records: list,
+):
+    """
+    Method to serve records the way ZPA list endpoints do: page and pagesize parameters, a list and totalPages
+
+    :param records: (list) Records
+
+    :return: (callable) Route
+    """
+
+    def route(query, body):
+        page = int(query.get("page", 1))
+        size = int(query.get("pagesize", 20))
+        total_pages = max(1, -(-len(records) // size))
+        return 200, {"totalPages": str(total_pages), "list": records[(page - 1) * size : page * size]}
+
+    return route
+
+
+class MockServer(object):
+    """
+    Offline stand-in for the Zscaler APIs on localhost, over HTTP or HTTPS. Routes map a method and a path to a
+    JSON document, to bytes served as they are, or to a callable of the query parameters and the JSON or form body
+    returning (status, document). The server counts the connections it accepted and the requests it served. Routes
+    read the headers of the request they serve in current.headers.
+    """
+
+    def __init__(
+        self,
+        routes: dict = None,
+        tls: ssl.SSLContext = None,
+    ):
+        """
+        :param routes: (dict) (method, path): document or callable
+        :param tls: (ssl.SSLContext) Optional server TLS context, see self_signed_context
+        """
+        self.routes = dict(routes or {})
+        self.connections = 0
+        self.requests = []
+        self.current = threading.local()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body in one segment, without waiting for delayed ACKs
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                with server._lock:
+                    server.connections += 1
+                super().setup()
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self):
+                parts = urlsplit(self.path)
+                query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else None
+                if body and "x-www-form-urlencoded" in self.headers.get("Content-Type", ""):
+                    body = {key: values[-1] for key, values in parse_qs(body.decode()).items()}
+                elif body:
+                    body = json.loads(body)
+                with server._lock:
+                    server.requests.append((self.command, parts.path, query, dict(self.headers)))
+                server.current.headers = dict(self.headers)
+                route = server.routes.get((self.command, parts.path))
+                if route is None:
+                    status, document = 404, {"message": f"No route for {self.command} {parts.path}"}
+                elif callable(route):
+                    status, document = route(query, body)
+                else:
+                    status, document = 200, route
+                # Bytes are served as they are, e.g. the CSV of a report
+                raw = isinstance(document, bytes)
+                payload = document if raw else json.dumps(document).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain" if raw else "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _serve
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        if tls is not None:
+            self._server.socket = tls.wrap_socket(self._server.socket, server_side=True)
+        scheme = "https" if tls is not None else "http"
+        self.url = f"{scheme}://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
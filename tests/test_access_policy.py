@@ -0,0 +1,97 @@
+import pytest
+
+from zscaler_api_talkers.zpa.access_policy import AccessPolicySimulator
+
+SEGMENTS = [
+    {
+        "id": "1",
+        "domainNames": ["*.corp.example"],
+        "tcpPortRange": [{"from": "443", "to": "443"}],
+        "segmentGroupId": "50",
+    },
+    {"id": "2", "domainNames": ["hr.corp.example"], "tcpPortRanges": ["443", "443", "8443", "8443"]},
+    {"id": "3", "domainNames": ["10.0.0.0/8"], "tcpPortRange": [{"from": "22", "to": "22"}], "enabled": False},
+]
+SEGMENT_GROUPS = [{"id": "60", "applications": [{"id": "2"}]}]
+SAML_ATTRIBUTES = [{"id": "700", "name": "Department", "samlName": "department"}]
+SCIM_GROUPS = [{"id": "900", "name": "Admins", "idpId": "1"}]
+
+
+def _condition(*operands, operator="OR", negated=False) -> dict:
+    return {"operator": operator, "negated": negated, "operands": list(operands)}
+
+
+POLICIES = [
+    {
+        "id": "r1",
+        "ruleOrder": "1",
+        "action": "ALLOW",
+        "conditions": [
+            _condition({"objectType": "APP_GROUP", "lhs": "id", "rhs": "60"}),
+            _condition({"objectType": "SAML", "lhs": "700", "rhs": "HR"}),
+        ],
+    },
+    {
+        "id": "r2",
+        "ruleOrder": "2",
+        "action": "DENY",
+        "conditions": [_condition({"objectType": "POSTURE", "lhs": "udid-1", "rhs": "true"}, negated=True)],
+    },
+    {
+        "id": "r3",
+        "ruleOrder": "3",
+        "action": "ALLOW",
+        "conditions": [
+            _condition({"objectType": "APP", "lhs": "id", "rhs": "1"}),
+            _condition({"objectType": "SCIM_GROUP", "entryValues": [{"lhs": "1", "rhs": "900"}]}),
+        ],
+    },
+    {"id": "r4", "ruleOrder": "4", "action": "ALLOW", "disabled": "true", "conditions": []},
+]
+
+
+def _simulator() -> AccessPolicySimulator:
+    return AccessPolicySimulator(POLICIES, SEGMENTS, SEGMENT_GROUPS, SAML_ATTRIBUTES, SCIM_GROUPS)
+
+
+def test_most_specific_segment_and_rule_order():
+    simulator = _simulator()
+    hr = simulator.user_facts(saml={"department": "HR"}, posture={"udid-1": True})
+    result = simulator.evaluate(hr, "hr.corp.example", 8443)
+    assert (result["action"], result["rule"]["id"], result["segment"]["id"]) == ("ALLOW", "r1", "2")
+    result = simulator.evaluate(hr, "wiki.corp.example", 443)
+    assert (result["action"], result["rule"], result["segment"]["id"]) == ("DENY", None, "1")
+
+
+def test_negated_condition_and_scim_groups():
+    simulator = _simulator()
+    admin = simulator.user_facts(scim_groups=["Admins"], posture={"udid-1": True})
+    assert simulator.evaluate(admin, "wiki.corp.example", 443)["rule"]["id"] == "r3"
+    unmanaged = simulator.user_facts(scim_groups=["900"], posture={"udid-1": False})
+    assert simulator.evaluate(unmanaged, "wiki.corp.example", 443)["rule"]["id"] == "r2"
+    with pytest.raises(ValueError):
+        simulator.user_facts(scim_groups=["Nobody"])
+
+
+def test_unknown_host_port_and_disabled_segment_are_denied():
+    simulator = _simulator()
+    user = simulator.user_facts(posture={"udid-1": True})
+    assert simulator.evaluate(user, "www.example.com", 443) == {"action": "DENY", "rule": None, "segment": None}
+    assert simulator.evaluate(user, "wiki.corp.example", 80)["segment"] is None
+    assert simulator.evaluate(user, "10.1.2.3", 22)["segment"] is None
+
+
+def test_matrix():
+    simulator = _simulator()
+    users = {
+        "hr": simulator.user_facts(saml={"700": ["HR", "Sales"]}, posture={"udid-1": True}),
+        "admin": simulator.user_facts(scim_groups=["Admins"], posture={"udid-1": True}),
+    }
+    matrix = simulator.matrix(users, [("hr.corp.example", 443), ("wiki.corp.example", "443", "tcp")])
+    actions = {
+        name: {app[0]: result["action"] for app, result in results.items()} for name, results in matrix.items()
+    }
+    assert actions == {
+        "hr": {"hr.corp.example": "ALLOW", "wiki.corp.example": "DENY"},
+        "admin": {"hr.corp.example": "DENY", "wiki.corp.example": "ALLOW"},
+    }
@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+import pytest
+
+from tests.mock_server import MockServer, zia_pages, zpa_pages
+from zscaler_api_talkers.helpers.page_size import PageSizePolicy
+from zscaler_api_talkers.helpers.rate_limiter import RateLimiter
+from zscaler_api_talkers.zia.talker import AsyncZiaTalker, ZiaTalker
+from zscaler_api_talkers.zpa.talker import AsyncZpaTalker, ZpaTalker
+
+USERS = [{"id": i, "name": f"user{i}", "department": {"id": i % 7}} for i in range(2350)]
+SEGMENTS = [{"id": str(i), "name": f"segment{i}", "domainNames": [f"app{i}.example.com"]} for i in range(130)]
+ZPA_SEGMENTS = "/mgmtconfig/v1/admin/customers/1234/application"
+
+
+def _slow_pages(records: list):
+    pages = zia_pages(records)
+
+    def route(query, body):
+        time.sleep(0.1)
+        return pages(query, body)
+
+    return route
+
+
+ROUTES = {
+    ("GET", "/api/v1/users"): zia_pages(USERS),
+    ("GET", "/api/v1/groups"): _slow_pages([{"id": i, "name": f"group{i}"} for i in range(250)]),
+    ("GET", "/api/v1/urlCategories"): [{"id": "CUSTOM_01", "configuredName": "Partners", "urls": ["a.example"]}],
+    ("GET", "/api/v1/status"): {"status": "ACTIVE"},
+    ("GET", "/api/v1/locations/404"): lambda query, body: (404, {"message": "Not found"}),
+    ("GET", ZPA_SEGMENTS): zpa_pages(SEGMENTS),
+    ("GET", f"{ZPA_SEGMENTS}/7"): SEGMENTS[7],
+}
+
+
+def _options() -> dict:
+    return {"rate_limiter": RateLimiter([]), "page_size_policy": PageSizePolicy(persist=False)}
+
+
+def _zia_talkers(
+    server: MockServer,
+) -> tuple:
+    sync_talker = ZiaTalker("zscaler.net", bearer="token", **_options())
+    async_talker = AsyncZiaTalker("zscaler.net", bearer="token", max_concurrency=8, **_options())
+    for talker in (sync_talker, async_talker.talker):
+        talker.hp_http.host = f"{server.url}/api/v1"
+
+    return sync_talker, async_talker
+
+
+def _zpa_talkers(
+    server: MockServer,
+) -> tuple:
+    sync_talker = ZpaTalker(1234, cloud=server.url, **_options())
+    async_talker = AsyncZpaTalker(1234, cloud=server.url, max_concurrency=8, **_options())
+    for talker in (sync_talker, async_talker.talker):
+        talker.header = {"Authorization": "Bearer token"}
+
+    return sync_talker, async_talker
+
+
+def test_async_zia_results_match_sync():
+    with MockServer(ROUTES) as server:
+        sync_talker, async_talker = _zia_talkers(server)
+
+        async def run():
+            return await asyncio.gather(
+                async_talker.list_users(page_size=500),
+                async_talker.list_url_categories(),
+                async_talker.get_status(),
+            )
+
+        users, categories, status = asyncio.run(run())
+        assert users == sync_talker.list_users(page_size=500) == USERS
+        assert categories == sync_talker.list_url_categories()
+        assert status == sync_talker.get_status() == {"status": "ACTIVE"}
+        async_talker.close()
+
+
+def test_async_zpa_results_match_sync():
+    with MockServer(ROUTES) as server:
+        sync_talker, async_talker = _zpa_talkers(server)
+
+        async def run():
+            return await asyncio.gather(
+                async_talker.list_application_segments(page_size=20),
+                async_talker.list_application_segments(application_id=7),
+            )
+
+        segments, segment = asyncio.run(run())
+        assert segments == sync_talker.list_application_segments(page_size=20) == SEGMENTS
+        assert segment == sync_talker.list_application_segments(application_id=7) == SEGMENTS[7]
+        async_talker.close()
+
+
+def test_async_errors_match_sync():
+    with MockServer(ROUTES) as server:
+        sync_talker, async_talker = _zia_talkers(server)
+        with pytest.raises(ValueError) as sync_error:
+            sync_talker.list_locations(location_id=404)
+        with pytest.raises(ValueError) as async_error:
+            asyncio.run(async_talker.list_locations(location_id=404))
+        assert str(async_error.value) == str(sync_error.value)
+        async_talker.close()
+
+
+def test_concurrent_calls_send_their_own_headers():
+    with MockServer(ROUTES) as server:
+        _, async_talker = _zia_talkers(server)
+        http = async_talker.hp_http
+
+        async def run():
+            return await asyncio.gather(
+                *(http.get_call("/status", headers={"X-Call": str(i)}) for i in range(200))
+            )
+
+        asyncio.run(run())
+        sent = sorted(int(headers["X-Call"]) for _, _, _, headers in server.requests)
+        assert sent == list(range(200))
+        async_talker.close()
+
+
+def test_async_iterators_do_not_block_the_event_loop():
+    with MockServer(ROUTES) as server:
+        sync_talker, async_talker = _zia_talkers(server)
+        gaps = []
+
+        async def tick():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        async def run():
+            ticker = asyncio.ensure_future(tick())
+            groups = [group async for group in async_talker.iter_groups(page_size=100)]
+            users = []
+            async for user in async_talker.iter_users(page_size=500):
+                users.append(user)
+                if len(users) == 750:
+                    break
+            ticker.cancel()
+            return groups, users
+
+        groups, users = asyncio.run(run())
+        assert groups == list(sync_talker.iter_groups(page_size=100))
+        assert users == USERS[:750]
+        # Four pages of 0.1s each were fetched while the loop kept ticking
+        assert len(gaps) > 20 and max(gaps) < 0.08
+        async_talker.close()
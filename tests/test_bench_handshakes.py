@@ -0,0 +1,68 @@
+"""
+Benchmark of the connections HttpCalls opens, against a local TLS stub: a pooled session reuses one keep-alive
+connection where one-off requests calls open a connection, and do a TCP+TLS handshake, per call.
+
+    python -m tests.test_bench_handshakes [calls]
+"""
+import sys
+import time
+import warnings
+
+import pytest
+import requests
+import urllib3
+
+from tests.mock_server import MockServer, self_signed_context
+from zscaler_api_talkers.helpers.http_calls import HttpCalls
+
+ROUTES = {("GET", "/api/v1/status"): {"status": "ACTIVE"}}
+
+
+def run(
+    calls: int,
+) -> dict:
+    """
+    Method to make the same calls with one-off requests calls and with HttpCalls
+
+    :param calls: (int) Number of calls of each kind
+
+    :return: (dict) Handshakes and seconds of each kind, and handshakes saved per 1,000 calls
+    """
+    context = self_signed_context()
+    if context is None:
+        raise RuntimeError("openssl is required to build the TLS stub")
+    result = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", urllib3.exceptions.InsecureRequestWarning)
+        with MockServer(ROUTES, tls=context) as server:
+            start = time.perf_counter()
+            for _ in range(calls):
+                requests.get(f"{server.url}/api/v1/status", verify=False)
+            result["one_off"] = {"handshakes": server.connections, "seconds": time.perf_counter() - start}
+        with MockServer(ROUTES, tls=context) as server:
+            http = HttpCalls(host=f"{server.url}/api/v1", verify=False)
+            start = time.perf_counter()
+            for _ in range(calls):
+                http.get_call("/status")
+            result["pooled"] = {"handshakes": server.connections, "seconds": time.perf_counter() - start}
+            http.close()
+    saved = result["one_off"]["handshakes"] - result["pooled"]["handshakes"]
+    result["saved_per_1000_calls"] = saved * 1000 / calls
+
+    return result
+
+
+def test_pooled_session_saves_handshakes():
+    if self_signed_context() is None:
+        pytest.skip("openssl is not installed")
+    result = run(50)
+    assert result["one_off"]["handshakes"] == 50
+    assert result["pooled"]["handshakes"] == 1
+    assert result["saved_per_1000_calls"] == 980
+
+
+if __name__ == "__main__":
+    report = run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
+    for kind in ("one_off", "pooled"):
+        print(f"{kind}: {report[kind]['handshakes']} handshakes in {report[kind]['seconds']:.2f}s")
+    print(f"Handshakes saved per 1,000 calls: {report['saved_per_1000_calls']:.0f}")
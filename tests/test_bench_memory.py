@@ -0,0 +1,109 @@
+"""
+Benchmark of the peak memory of list_users against iter_users, on a local stub serving many users. Each method runs
+in its own process, which reports its peak resident set size: list_users holds every user at once, iter_users one
+page at a time.
+
+    python -m tests.test_bench_memory [users]
+"""
+import json
+import resource
+import subprocess
+import sys
+
+from tests.mock_server import MockServer
+
+PAGE_SIZE = 1000
+
+
+def users_route(
+    total: int,
+):
+    """
+    Method to serve total users, built page by page so the stub holds no more than one page
+
+    :param total: (int) Number of users
+
+    :return: (callable) Route
+    """
+
+    def route(query, body):
+        page = int(query.get("page", 1))
+        size = int(query.get("pageSize", 100))
+        return 200, [
+            {
+                "id": i,
+                "name": f"User {i}",
+                "email": f"user{i}@example.com",
+                "groups": [{"id": i % 50, "name": f"Group {i % 50}"}],
+                "department": {"id": i % 20, "name": f"Department {i % 20}"},
+                "adminUser": False,
+                "type": "SUPERADMIN" if i == 0 else "USER",
+            }
+            for i in range((page - 1) * size, min(page * size, total))
+        ]
+
+    return route
+
+
+def _child(
+    method: str,
+    url: str,
+):
+    """
+    Internal method run in the child process: reads every user with method and prints the count and peak RSS
+    """
+    from zscaler_api_talkers.helpers.page_size import PageSizePolicy
+    from zscaler_api_talkers.helpers.rate_limiter import RateLimiter
+    from zscaler_api_talkers.zia.talker import ZiaTalker
+
+    talker = ZiaTalker(
+        "zscaler.net",
+        bearer="token",
+        rate_limiter=RateLimiter([]),
+        page_size_policy=PageSizePolicy(persist=False),
+    )
+    talker.hp_http.host = f"{url}/api/v1"
+    count = 0
+    for _ in getattr(talker, method)(page_size=PAGE_SIZE):
+        count += 1
+    print(json.dumps({"users": count, "peak_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+
+
+def run(
+    users: int,
+) -> dict:
+    """
+    Method to read the same users with list_users and with iter_users, each in a new process
+
+    :param users: (int) Number of users served
+
+    :return: (dict) Users read and peak RSS in KiB of each method
+    """
+    result = {}
+    with MockServer({("GET", "/api/v1/users"): users_route(users)}) as server:
+        for method in ("list_users", "iter_users"):
+            output = subprocess.run(
+                [sys.executable, "-m", "tests.test_bench_memory", "--child", method, server.url],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result[method] = json.loads(output.splitlines()[-1])
+
+    return result
+
+
+def test_iter_users_peak_memory_is_lower():
+    result = run(30000)
+    assert result["list_users"]["users"] == result["iter_users"]["users"] == 30000
+    # 30,000 users take about 30 MiB at once, one page about 1 MiB
+    assert result["iter_users"]["peak_kib"] < result["list_users"]["peak_kib"] - 10 * 1024
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        _child(sys.argv[2], sys.argv[3])
+    else:
+        report = run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
+        for name in ("list_users", "iter_users"):
+            print(f"{name}: {report[name]['users']} users, peak RSS {report[name]['peak_kib'] / 1024:.1f} MiB")
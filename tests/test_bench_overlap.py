@@ -0,0 +1,76 @@
+"""
+Benchmark of OverlapAnalyzer on generated URL categories and IP destination groups, one in ten entries redundant.
+The analysis sorts and indexes the entries instead of comparing every pair, so its time grows with n log n.
+
+    python -m tests.test_bench_overlap [urls] [ip entries]
+"""
+import sys
+import time
+
+from zscaler_api_talkers.zia.overlap import OverlapAnalyzer
+
+
+def build(
+    urls: int,
+    ip_entries: int,
+) -> OverlapAnalyzer:
+    """
+    Method to build an analyzer of 100 categories and 100 groups. Every tenth URL is covered by a wildcard of its
+    category and every tenth address by a CIDR of its group
+
+    :param urls: (int) Number of URLs
+    :param ip_entries: (int) Number of IP entries, 655,360 at most
+
+    :return: (OverlapAnalyzer)
+    """
+    categories = [{"id": f"CUSTOM_{i:02}", "urls": []} for i in range(100)]
+    for i in range(urls):
+        if i % 10:
+            entry = f"host{i}.example{i // 10}.com/path{i % 3}"
+        else:
+            entry = f".example{i // 10}.com"
+        categories[(i // 10) % 100]["urls"].append(entry)
+    groups = [{"id": i, "type": "DSTN_IP", "addresses": []} for i in range(100)]
+    for i in range(ip_entries):
+        block = i // 10
+        network = f"10.{block >> 8 & 255}.{block & 255}"
+        groups[block % 100]["addresses"].append(f"{network}.{i % 10}" if i % 10 else f"{network}.0/24")
+
+    return OverlapAnalyzer(url_categories=categories, ip_destination_groups=groups)
+
+
+def run(
+    urls: int,
+    ip_entries: int,
+) -> dict:
+    """
+    Method to time the report of a generated analyzer
+
+    :param urls: (int) Number of URLs
+    :param ip_entries: (int) Number of IP entries
+
+    :return: (dict) Report and seconds
+    """
+    analyzer = build(urls, ip_entries)
+    start = time.perf_counter()
+    report = analyzer.report()
+
+    return {"report": report, "seconds": time.perf_counter() - start}
+
+
+def test_finds_generated_redundancies():
+    report = run(10000, 5000)["report"]
+    assert report["url_categories"]["covered"] == 9000
+    assert report["url_categories"]["reclaimable"] == 9000
+    assert report["ip_destination_groups"]["covered"] == 4500
+    assert report["ip_destination_groups"]["reclaimable"] == 4500
+
+
+if __name__ == "__main__":
+    result = run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500000,
+    )
+    for kind in ("url_categories", "ip_destination_groups"):
+        print(f"{kind}: {result['report'][kind]}")
+    print(f"Analyzed in {result['seconds']:.2f}s")
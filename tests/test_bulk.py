@@ -0,0 +1,71 @@
+import threading
+import time
+
+from tests.mock_server import MockServer
+from zscaler_api_talkers.helpers.bulk import BulkExecutor
+from zscaler_api_talkers.helpers.page_size import PageSizePolicy
+from zscaler_api_talkers.helpers.rate_limiter import RateLimiter
+from zscaler_api_talkers.zia.talker import ZiaTalker
+
+
+def test_chunks_are_deduplicated_and_bounded():
+    executor = BulkExecutor(chunk_size=3)
+    assert executor.chunks([1, 2, 2, 3, 4, 1, 5, 6, 7]) == [[1, 2, 3], [4, 5, 6], [7]]
+    assert executor.chunks([]) == []
+
+
+def test_failures_are_reported_per_id():
+    def call(chunk):
+        if 13 in chunk:
+            raise ValueError("409 conflict")
+        return {"ids": [item for item in chunk if item != 4]}
+
+    result = BulkExecutor(chunk_size=5, concurrency=3).run(
+        call,
+        list(range(20)) + list(range(10)),
+        succeeded=lambda chunk, response: response["ids"],
+    )
+    assert sorted(result.succeeded) == [item for item in range(20) if item != 4 and not 10 <= item < 15]
+    assert result.failed == {
+        4: "Not reported as done by the API",
+        **{item: "409 conflict" for item in range(10, 15)},
+    }
+    assert not result.ok and len(result.responses) == 3
+    assert repr(result) == "BulkResult(succeeded=14, failed=6)"
+
+
+def test_concurrency_is_bounded():
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def call(chunk):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+
+    assert BulkExecutor(chunk_size=1, concurrency=4).run(call, list(range(20))).ok
+    assert 1 < peak[0] <= 4
+
+
+def test_bulk_delete_users_sends_500_ids_per_call():
+    calls = []
+
+    def bulk_delete(query, body):
+        calls.append(body["ids"])
+        return 200, {"ids": body["ids"][:-1]}
+
+    with MockServer({("POST", "/api/v1/users/bulkDelete"): bulk_delete}) as server:
+        talker = ZiaTalker(
+            "zscaler.net",
+            bearer="token",
+            rate_limiter=RateLimiter([]),
+            page_size_policy=PageSizePolicy(),
+        )
+        talker.hp_http.host = f"{server.url}/api/v1"
+        result = talker.bulk_delete_users(list(range(1200)) + list(range(100)), concurrency=2)
+        assert sorted(len(ids) for ids in calls) == [200, 500, 500]
+        assert sorted(sum(calls, [])) == list(range(1200))
+        assert len(result.succeeded) == 1197 and sorted(result.failed) == [499, 999, 1199]
+        talker.hp_http.close()
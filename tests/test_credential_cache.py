@@ -0,0 +1,68 @@
+import base64
+import json
+import multiprocessing
+import os
+import stat
+import time
+
+from zscaler_api_talkers.helpers.credential_cache import (
+    CredentialCache,
+    FileCredentialBackend,
+    MemoryCredentialBackend,
+    jwt_expiry,
+)
+
+
+def _login_once(path: str, logins: str) -> dict:
+    """Process target: logs in through a shared file cache, counting real logins in the logins file"""
+
+    def login():
+        with open(logins, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(0.2)
+        return {"JSESSIONID": f"session-{os.getpid()}"}, time.time() + 1800
+
+    return CredentialCache(FileCredentialBackend(path)).get_or_login("https://zsapi.zscaler.net", "admin", login)
+
+
+def test_file_backend_is_private(tmp_path):
+    path = tmp_path / "cache" / "credentials.json"
+    cache = CredentialCache(FileCredentialBackend(str(path)))
+    cache.set("cloud", "admin", {"JSESSIONID": "abc"}, time.time() + 1800)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(f"{path}.lock").st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(path.parent).st_mode) == 0o700
+    assert json.loads(path.read_text())["cloud|admin"]["credential"] == {"JSESSIONID": "abc"}
+    assert CredentialCache(FileCredentialBackend(str(path))).get("cloud", "admin") == {"JSESSIONID": "abc"}
+
+
+def test_processes_share_a_single_login(tmp_path):
+    path, logins = str(tmp_path / "credentials.json"), str(tmp_path / "logins")
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(4) as pool:
+        credentials = pool.starmap(_login_once, [(path, logins)] * 4)
+    with open(logins) as f:
+        assert len(f.readlines()) == 1
+    assert len({credential["JSESSIONID"] for credential in credentials}) == 1
+
+
+def test_expiry_margin_and_stale_credentials():
+    cache = CredentialCache(MemoryCredentialBackend(), margin=60)
+    cache.set("cloud", "expiring", {"token": "old"}, time.time() + 30)
+    assert cache.get("cloud", "expiring") is None
+    tokens = iter(["first", "second"])
+
+    def login():
+        return {"token": next(tokens)}, time.time() + 3600
+
+    assert cache.get_or_login("cloud", "admin", login) == {"token": "first"}
+    assert cache.get_or_login("cloud", "admin", login) == {"token": "first"}
+    assert cache.login("cloud", "admin", login, stale={"token": "first"})[0] == {"token": "second"}
+    cache.delete("cloud", "admin")
+    assert cache.get("cloud", "admin") is None
+
+
+def test_jwt_expiry():
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": 1700000000}).encode()).decode().rstrip("=")
+    assert jwt_expiry(f"Bearer header.{payload}.signature") == 1700000000
+    assert jwt_expiry("not a jwt") is None
@@ -0,0 +1,70 @@
+import json
+
+from zscaler_api_talkers.helpers.diff import DiffEngine, read_export
+
+OLD = {
+    "locations": [
+        {"id": 1, "name": "Paris", "ipAddresses": ["1.1.1.1", "2.2.2.2"], "lastModifiedTime": 1},
+        {"id": 2, "name": "Lyon", "profile": {"xff": False}},
+        {"id": 3, "name": "Nice"},
+    ],
+    "rules": [{"id": 9, "name": "Allow"}],
+}
+NEW = {
+    "locations": [
+        {"id": 1, "name": "Paris", "ipAddresses": ["2.2.2.2", "1.1.1.1"], "lastModifiedTime": 2},
+        {"id": 2, "name": "Lyon", "profile": {"xff": True}},
+        {"id": 4, "name": "Nantes"},
+    ],
+    "rules": [{"id": 9, "name": "Allow"}],
+}
+
+
+def test_same_configuration_is_empty():
+    diff = DiffEngine().diff(OLD, OLD)
+    assert diff.is_empty
+    assert diff.summary() == {}
+
+
+def test_volatile_fields_and_list_order_are_ignored():
+    diff = DiffEngine().diff(OLD, NEW)
+    assert diff.summary() == {"locations": {"added": 1, "removed": 1, "changed": 1}}
+    locations = diff.collections["locations"]
+    assert locations["added"] == {4: {"id": 4, "name": "Nantes"}}
+    assert list(locations["removed"]) == [3]
+    assert locations["changed"] == {2: {"profile.xff": (False, True)}}
+
+
+def test_ordered_lists():
+    diff = DiffEngine(ordered_lists=True).diff(OLD, NEW)
+    assert diff.collections["locations"]["changed"][1] == {
+        "ipAddresses": (["1.1.1.1", "2.2.2.2"], ["2.2.2.2", "1.1.1.1"])
+    }
+
+
+def test_records_matched_by_name_across_tenants():
+    old = {"groups": [{"id": 1, "name": "Sales"}, {"id": 2, "name": "IT"}]}
+    new = {"groups": [{"id": 7, "name": "Sales"}, {"id": 8, "name": "IT", "comments": "new"}]}
+    diff = DiffEngine(key=("name", "id"), ignore={"groups": ("id",)}).diff(old, new)
+    assert diff.summary() == {"groups": {"added": 0, "removed": 0, "changed": 1}}
+    assert diff.collections["groups"]["changed"] == {"IT": {"comments": (None, "new")}}
+
+
+def test_duplicate_keys_are_ranked():
+    old = {"users": [{"name": "a", "dept": 1}, {"name": "a", "dept": 2}]}
+    new = {"users": [{"name": "a", "dept": 1}, {"name": "a", "dept": 3}, {"name": "a", "dept": 4}]}
+    diff = DiffEngine(key="name").diff(old, new)
+    assert diff.collections["users"]["changed"] == {("a", 2): {"dept": (2, 3)}}
+    assert list(diff.collections["users"]["added"]) == [("a", 3)]
+
+
+def test_diff_exports(tmp_path):
+    for name, config in (("old", OLD), ("new", NEW)):
+        directory = tmp_path / name
+        directory.mkdir()
+        for collection, records in config.items():
+            (directory / f"{collection}.ndjson").write_text("".join(json.dumps(r) + "\n" for r in records))
+        (directory / "manifest.json").write_text("{}")
+    assert sorted(read_export(str(tmp_path / "old"))) == ["locations", "rules"]
+    diff = DiffEngine().diff_exports(str(tmp_path / "old"), str(tmp_path / "new"))
+    assert diff.summary() == DiffEngine().diff(OLD, NEW).summary()
@@ -0,0 +1,82 @@
+import pytest
+
+from tests.mock_server import MockServer, zia_pages
+from zscaler_api_talkers.helpers.page_size import PageSizePolicy
+from zscaler_api_talkers.helpers.rate_limiter import RateLimiter
+from zscaler_api_talkers.zia.directory import ZiaDirectory
+from zscaler_api_talkers.zia.talker import ZiaTalker
+
+DEPARTMENTS = [{"id": 1, "name": "Sales"}, {"id": 2, "name": "IT"}]
+GROUPS = [{"id": 10, "name": "VPN"}, {"id": 11, "name": "Admins", "idpId": 3}]
+USERS = [
+    {"id": 100, "name": "Alice", "email": "Alice@Example.com", "department": {"id": 1}, "groups": [{"id": 10}]},
+    {"id": 101, "name": "Bob", "email": "bob@example.com", "department": {"id": 2}, "groups": [{"id": 10}, {"id": 11}]},
+    {"id": 102, "name": "Bob", "email": "bob2@example.com"},
+]
+
+
+def _directory() -> ZiaDirectory:
+    directory = ZiaDirectory()
+    for department in DEPARTMENTS:
+        directory.upsert_department(department)
+    for group in GROUPS:
+        directory.upsert_group(group)
+    for user in USERS:
+        directory.upsert_user(user)
+    return directory
+
+
+def _ids(records: list) -> list:
+    return sorted(record.id for record in records)
+
+
+def test_lookups_by_id_email_and_name():
+    directory = _directory()
+    assert len(directory) == 3
+    assert directory.user(email="alice@EXAMPLE.com").id == 100
+    assert directory.user(user_id=102).ref() == {"id": 102, "name": "Bob"}
+    assert _ids(directory.users_named("Bob")) == [101, 102]
+    assert directory.group(name="Admins").idp_id == 3
+    assert directory.department(department_id=2).name == "IT"
+    assert _ids(directory.group_members(name="VPN")) == [100, 101]
+    assert _ids(directory.department_members(1)) == [100]
+    assert directory.group_members(name="Nobody") == []
+    with pytest.raises(ValueError):
+        directory.user()
+
+
+def test_updates_keep_the_indexes_consistent():
+    directory = _directory()
+    directory.upsert_user({"id": 101, "name": "Robert", "email": "robert@example.com", "groups": [{"id": 11}]})
+    assert directory.user(email="bob@example.com") is None
+    assert _ids(directory.users_named("Bob")) == [102]
+    assert _ids(directory.group_members(10)) == [100]
+    assert _ids(directory.group_members(11)) == [101]
+    assert directory.department_members(2) == []
+    directory.upsert_group({"id": 10, "name": "Remote"})
+    assert directory.group(name="VPN") is None and _ids(directory.group_members(name="Remote")) == [100]
+    directory.remove_user(100)
+    directory.remove_user(100)
+    assert directory.user(email="alice@example.com") is None and directory.group_members(10) == []
+    directory.remove_department(1)
+    assert directory.department(name="Sales") is None
+
+
+def test_load_directory_from_the_talker():
+    routes = {
+        ("GET", "/api/v1/departments"): zia_pages(DEPARTMENTS),
+        ("GET", "/api/v1/groups"): zia_pages(GROUPS),
+        ("GET", "/api/v1/users"): zia_pages(USERS),
+    }
+    with MockServer(routes) as server:
+        talker = ZiaTalker(
+            "zscaler.net",
+            bearer="token",
+            rate_limiter=RateLimiter([]),
+            page_size_policy=PageSizePolicy(),
+        )
+        talker.hp_http.host = f"{server.url}/api/v1"
+        directory = talker.load_directory(page_size=2)
+        assert len(directory) == 3 and len(directory.groups) == 2 and len(directory.departments) == 2
+        assert _ids(directory.group_members(name="Admins")) == [101]
+        talker.hp_http.close()
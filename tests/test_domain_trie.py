@@ -0,0 +1,66 @@
+from zscaler_api_talkers.helpers.domain_trie import DOT, EXACT, WILDCARD, DomainTrie, covers, parse_domain
+
+
+def _trie() -> DomainTrie:
+    trie = DomainTrie()
+    trie.add("www.example.com", 1)
+    trie.add("*.example.com", 2)
+    trie.add(".example.org", 3)
+    trie.add("*.example.com", 4)
+    trie.add("Api.Example.COM.", 5)
+    return trie
+
+
+def test_parse_domain():
+    assert parse_domain("www.example.com") == (("com", "example", "www"), EXACT)
+    assert parse_domain("*.Example.com.") == (("com", "example"), WILDCARD)
+    assert parse_domain(".example.com") == (("com", "example"), DOT)
+
+
+def test_covers():
+    assert covers("*.example.com", "www.example.com")
+    assert covers("*.example.com", "*.www.example.com")
+    assert not covers("*.example.com", "example.com")
+    assert covers(".example.com", "example.com")
+    assert covers(".example.com", "*.example.com")
+    assert not covers("www.example.com", "a.www.example.com")
+    assert covers("www.example.com", "www.example.com")
+
+
+def test_lookup_most_specific_first():
+    trie = _trie()
+    assert len(trie) == 5
+    assert trie.lookup("www.example.com") == [("www.example.com", 1), ("*.example.com", 2), ("*.example.com", 4)]
+    assert trie.best("www.example.com") == [("www.example.com", 1)]
+    assert trie.best("a.b.example.com") == [("*.example.com", 2), ("*.example.com", 4)]
+    assert trie.best("api.example.com") == [("api.example.com", 5)]
+    assert trie.lookup("example.com") == []
+    assert trie.lookup("example.org") == [(".example.org", 3)]
+    assert trie.lookup("a.example.org") == [(".example.org", 3)]
+    assert trie.lookup("example.net") == []
+
+
+def test_exact_covering_and_under():
+    trie = _trie()
+    assert trie.exact("*.example.com") == [2, 4]
+    assert trie.exact("example.com") == []
+    assert trie.covering("www.example.com") == [("*.example.com", 2), ("*.example.com", 4)]
+    assert trie.covering("*.example.com") == []
+    assert sorted(trie.under("*.example.com")) == [
+        ("*.example.com", 2),
+        ("*.example.com", 4),
+        ("api.example.com", 5),
+        ("www.example.com", 1),
+    ]
+
+
+def test_remove_prunes_empty_nodes():
+    trie = _trie()
+    assert trie.remove("www.example.com", 1)
+    assert not trie.remove("www.example.com", 1)
+    assert not trie.remove("nope.example.com", 1)
+    assert trie.lookup("www.example.com") == [("*.example.com", 2), ("*.example.com", 4)]
+    for pattern, value in list(trie.items()):
+        assert trie.remove(pattern, value)
+    assert len(trie) == 0
+    assert trie._root.children == {}
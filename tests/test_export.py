@@ -0,0 +1,53 @@
+import json
+import os
+
+from zscaler_api_talkers.helpers.export import ConfigExporter
+
+
+def _read(
+    path,
+) -> list:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def _failing():
+    yield {"id": 3, "name": "Nice"}
+    raise ValueError("Connection reset")
+
+
+def test_manifest_and_files(tmp_path):
+    exporter = ConfigExporter(
+        {
+            "locations": lambda: ({"id": i, "name": f"location-{i}"} for i in (1, 2)),
+            "settings": lambda: {"enabled": True},
+            "empty": lambda: None,
+        },
+        fan_outs={"sublocations": ("locations", lambda parent_id: [{"id": parent_id * 10, "parentId": parent_id}])},
+    )
+    manifest = exporter.export(str(tmp_path / "export"))
+    assert json.loads((tmp_path / "export" / "manifest.json").read_text()) == manifest
+    collections = manifest["collections"]
+    assert {name: entry["count"] for name, entry in collections.items()} == {
+        "locations": 2,
+        "settings": 1,
+        "empty": 0,
+        "sublocations": 2,
+    }
+    assert collections["locations"]["file"] == "locations.ndjson" and manifest["errors"] == []
+    assert _read(tmp_path / "export" / "sublocations.ndjson") == [{"id": 10, "parentId": 1}, {"id": 20, "parentId": 2}]
+    assert _read(tmp_path / "export" / "settings.ndjson") == [{"enabled": True}]
+
+
+def test_failed_collection_keeps_previous_file(tmp_path):
+    directory = tmp_path / "export"
+    ConfigExporter({"locations": lambda: [{"id": 1, "name": "Paris"}]}).export(str(directory))
+    manifest = ConfigExporter(
+        {"locations": _failing},
+        fan_outs={"sublocations": ("locations", lambda parent_id: [])},
+    ).export(str(directory))
+    assert manifest["errors"] == ["locations", "sublocations"]
+    assert manifest["collections"]["locations"]["error"] == "Connection reset"
+    assert manifest["collections"]["sublocations"]["error"] == "Parent collection locations was not exported"
+    # The truncated file is never moved in place and no temporary file is left behind
+    assert _read(directory / "locations.ndjson") == [{"id": 1, "name": "Paris"}]
+    assert sorted(os.listdir(directory)) == ["locations.ndjson", "manifest.json"]
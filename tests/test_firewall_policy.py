@@ -0,0 +1,74 @@
+from zscaler_api_talkers.zia.firewall_policy import FirewallPolicyEngine
+
+SOURCE_GROUPS = [{"id": 100, "ipAddresses": ["10.1.0.0/16", "10.2.0.1-10.2.0.9"]}]
+DESTINATION_GROUPS = [
+    {"id": 200, "type": "DSTN_IP", "addresses": ["192.0.2.0/24"]},
+    {"id": 201, "type": "DSTN_DOMAIN", "addresses": ["*.example.com"]},
+    {"id": 202, "type": "DSTN_OTHER", "ipCategories": ["NEWS_AND_MEDIA"], "countries": ["COUNTRY_FR"]},
+]
+SERVICES = [
+    {"id": 1, "name": "HTTPS", "destTcpPorts": [{"start": 443}]},
+    {"id": 2, "name": "DNS", "destTcpPorts": [{"start": 53}], "destUdpPorts": [{"start": 53}]},
+    {
+        "id": 3,
+        "name": "HIGH",
+        "destTcpPorts": [{"start": 8000, "end": 8999}],
+        "srcTcpPorts": [{"start": 1024, "end": 65535}],
+    },
+    {"id": 4, "name": "ICMP_ANY"},
+]
+SERVICE_GROUPS = [{"id": 50, "services": [{"id": 2}, {"id": 3}]}]
+RULES = [
+    {"id": 99, "name": "Default", "order": 1, "defaultRule": True},
+    {"id": 1, "name": "Sources", "order": 2, "srcIpGroups": [{"id": 100}], "nwServices": [{"id": 1}]},
+    {"id": 2, "name": "Web", "order": 3, "destIpGroups": [{"id": 200}], "nwServiceGroups": [{"id": 50}]},
+    {"id": 3, "name": "Domains", "order": 4, "destIpGroups": [{"id": 201}, {"id": 202}]},
+    {"id": 4, "name": "Sales", "order": 5, "groups": [{"id": 10}], "departments": [{"id": 20}], "locationGroups": [5]},
+    {"id": 5, "name": "Ping", "order": 6, "nwServices": [{"id": 4}], "destAddresses": ["198.51.100.1"]},
+    {"id": 6, "name": "Disabled", "order": 0, "state": "DISABLED"},
+]
+
+
+def _engine() -> FirewallPolicyEngine:
+    return FirewallPolicyEngine(RULES, SOURCE_GROUPS, DESTINATION_GROUPS, SERVICES, SERVICE_GROUPS)
+
+
+def _rule(flow: dict) -> int:
+    return _engine().evaluate(**flow)["id"]
+
+
+def test_default_rule_is_evaluated_last():
+    engine = _engine()
+    assert engine.rules[-1]["id"] == 99
+    assert engine.evaluate(src_ip="172.16.0.1", dest_ip="203.0.113.1", dest_port=22)["id"] == 99
+
+
+def test_addresses_and_services():
+    assert _rule({"src_ip": "10.1.2.3", "dest_ip": "203.0.113.1", "dest_port": 443}) == 1
+    assert _rule({"src_ip": "10.2.0.5", "dest_ip": "203.0.113.1", "dest_port": 443}) == 1
+    assert _rule({"src_ip": "10.2.0.10", "dest_ip": "203.0.113.1", "dest_port": 443}) == 99
+    assert _rule({"src_ip": "10.9.0.1", "dest_ip": "192.0.2.7", "protocol": 17, "dest_port": 53}) == 2
+    assert _rule({"src_ip": "10.9.0.1", "dest_ip": "192.0.2.7", "dest_port": 8080, "src_port": 50000}) == 2
+    # HIGH only matches source ports 1024 and above
+    assert _rule({"src_ip": "10.9.0.1", "dest_ip": "192.0.2.7", "dest_port": 8080, "src_port": 80}) == 99
+    assert _rule({"src_ip": "10.9.0.1", "dest_ip": "198.51.100.1", "protocol": "ICMP"}) == 5
+
+
+def test_domains_categories_and_countries():
+    assert _rule({"dest_host": "www.example.com", "dest_port": 22}) == 3
+    assert _rule({"dest_host": "example.org", "dest_port": 22}) == 99
+    assert _rule({"dest_categories": ["NEWS_AND_MEDIA"], "dest_port": 22}) == 3
+    assert _rule({"dest_country": "COUNTRY_FR", "dest_port": 22}) == 3
+
+
+def test_identity_and_location_criteria_match_any_value_of_their_family():
+    flow = {"dest_ip": "203.0.113.1", "dest_port": 22, "location_groups": [5]}
+    assert _rule({**flow, "groups": [10]}) == 4
+    assert _rule({**flow, "department": 20}) == 4
+    assert _rule({**flow, "groups": [11], "department": 21}) == 99
+    assert _rule({**flow, "groups": [10], "location_groups": [6]}) == 99
+
+
+def test_evaluate_many():
+    flows = [{"src_ip": "10.1.0.1", "dest_port": 443}, {"src_ip": "10.1.0.1", "dest_port": 22}]
+    assert [rule["id"] for _, rule in _engine().evaluate_many(flows)] == [1, 99]
@@ -0,0 +1,66 @@
+import random
+
+from zscaler_api_talkers.helpers.intervals import BitIndex, IntervalIndex, IntervalSet, address_range, address_value
+
+
+def test_address_range():
+    base = address_value("10.0.0.0")
+    assert address_range("10.0.0.1") == (base + 1, base + 1)
+    assert address_range("10.0.0.0/24") == (base, base + 255)
+    assert address_range("10.0.0.7/24") == (base, base + 255)
+    assert address_range("10.0.0.1-10.0.0.9") == (base + 1, base + 9)
+    assert address_range(" 10.0.0.1 ") == (base + 1, base + 1)
+    assert address_range("2001:db8::/126") == (0x20010DB8 << 96, (0x20010DB8 << 96) + 3)
+    assert address_range("www.example.com") is None
+    assert address_range("10.0.0.0/33") is None
+
+
+def test_ipv4_and_ipv6_share_one_space():
+    assert address_value("::ffff:10.0.0.1") == address_value("10.0.0.1")
+    assert address_value("::1") == 1
+    first, last = address_range("0.0.0.0/0")
+    assert first > address_value("::1") and last < address_value("2001:db8::")
+
+
+def test_bit_index():
+    index = BitIndex()
+    index.add(0, ["a", "b"])
+    index.add(1, [])
+    index.add(2, ["b"])
+    assert index.match(["a"]) == 0b011
+    assert index.match(["b"]) == 0b111
+    assert index.match(["c"]) == 0b010
+    assert index.match([]) == 0b010
+
+
+def test_interval_index_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    index = IntervalIndex()
+    for position in range(200):
+        first = rng.randrange(1000)
+        last = first + rng.randrange(50)
+        intervals.append((first, last, 1 << (position % 20)))
+        index.add(*intervals[-1])
+    assert len(index) == 200
+    for value in range(-1, 1100):
+        expected = 0
+        for first, last, bits in intervals:
+            if first <= value <= last:
+                expected |= bits
+        assert index.match(value) == expected
+    index.add(2000, 2000, 1 << 30)
+    assert index.match(2000) == 1 << 30
+
+
+def test_interval_set():
+    ports = IntervalSet([(80, 80), (443, 443), (8000, 8080), (81, 90)])
+    assert list(ports) == [(80, 90), (443, 443), (8000, 8080)]
+    assert 85 in ports and 8080 in ports
+    assert 91 not in ports and 79 not in ports
+    assert ports.overlaps(400, 500) and not ports.overlaps(444, 7999)
+    assert ports.size() == 11 + 1 + 81
+    ports.add(91, 442)
+    assert list(ports) == [(80, 443), (8000, 8080)]
+    other = IntervalSet([(0, 100), (440, 8000)])
+    assert list(ports.intersection(other)) == [(80, 100), (440, 443), (8000, 8000)]
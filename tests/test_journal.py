@@ -0,0 +1,142 @@
+import json
+
+import requests
+
+from zscaler_api_talkers.helpers.journal import JournaledResponse, MutationJournal
+
+
+def _response(
+    status_code: int,
+    content: bytes,
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+class FakeTalker(object):
+    def __init__(self):
+        self.calls = []
+
+    def add_location(self, name: str, password: str = None) -> dict:
+        self.calls.append(("add_location", name))
+        return {"id": len(self.calls), "name": name}
+
+    def delete_location(self, location_id: int) -> requests.Response:
+        self.calls.append(("delete_location", location_id))
+        return _response(204, b"")
+
+    def update_location(self, location_id: int) -> requests.Response:
+        self.calls.append(("update_location", location_id))
+        return _response(200, b'{"id": 1, "status": "updated"}')
+
+    def add_auditlog_entry_report(self) -> requests.Response:
+        self.calls.append(("add_auditlog_entry_report",))
+        return _response(204, b"")
+
+    def add_api_key(self, name: str) -> dict:
+        self.calls.append(("add_api_key", name))
+        return {"id": 7, "name": name, "apiKey": f"key-{len(self.calls)}"}
+
+    def add_opaque(self) -> object:
+        self.calls.append(("add_opaque",))
+        return object()
+
+    def list_locations(self) -> list:
+        self.calls.append(("list_locations",))
+        return []
+
+
+def _run(
+    path: str,
+) -> tuple:
+    talker = FakeTalker()
+    journal = MutationJournal(path)
+    journal.attach(talker)
+    results = (
+        talker.add_location("Paris", password="secret"),
+        talker.add_location(name="Paris", password="secret"),
+        talker.update_location(1),
+        talker.delete_location(location_id=2),
+        talker.add_auditlog_entry_report(),
+        talker.add_opaque(),
+        talker.list_locations(),
+    )
+    journal.close()
+
+    return talker, journal, results
+
+
+def test_resume_replays_done_calls(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    first, _, first_results = _run(path)
+    assert len(first.calls) == 7
+    second, journal, results = _run(path)
+    assert journal.skipped == 4
+    # Identical calls are matched by occurrence, keyword or positional
+    assert results[0] == first_results[0] == {"id": 1, "name": "Paris"}
+    assert results[1] == {"id": 2, "name": "Paris"}
+    assert isinstance(results[2], JournaledResponse)
+    assert results[2].status_code == 200 and results[2].ok
+    assert results[2].json() == {"id": 1, "status": "updated"}
+    assert results[3].status_code == 204 and results[3].text == ""
+    # Report requests, results that cannot be stored and reads are sent again
+    assert second.calls == [("add_auditlog_entry_report",), ("add_opaque",), ("list_locations",)]
+
+
+def test_secrets_are_redacted(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    _run(str(path))
+    assert "secret" not in path.read_text()
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert entries[0]["params"] == {"name": "Paris", "password": "***"}
+
+
+def test_calls_without_outcome_are_pending(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text(
+        json.dumps({"key": "a", "status": "started", "method": "add_location"})
+        + "\n"
+        + '{"key": "b", "status": "do'
+    )
+    journal = MutationJournal(str(path))
+    assert [entry["key"] for entry in journal.pending()] == ["a"]
+    journal.close()
+
+
+def test_failed_calls_are_sent_again(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    talker = FakeTalker()
+    journal = MutationJournal(path)
+    journal.attach(talker)
+    talker.delete_location = journal.wrap("delete_location", lambda location_id: 1 / 0)
+    try:
+        talker.delete_location(3)
+    except ZeroDivisionError:
+        pass
+    journal.close()
+    assert journal.failed == 1
+    talker = FakeTalker()
+    journal = MutationJournal(path)
+    journal.attach(talker)
+    talker.delete_location(3)
+    journal.close()
+    assert talker.calls == [("delete_location", 3)]
+
+
+def test_results_with_secrets_are_not_replayed(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    talker = FakeTalker()
+    journal = MutationJournal(str(path))
+    journal.attach(talker)
+    assert talker.add_api_key("ci")["apiKey"] == "key-1"
+    journal.close()
+    assert "key-1" not in path.read_text()
+    talker = FakeTalker()
+    journal = MutationJournal(str(path))
+    journal.attach(talker)
+    # The key is not replayed as "***": the call is sent again and returns a usable key
+    assert talker.add_api_key("ci")["apiKey"] == "key-1"
+    assert talker.calls == [("add_api_key", "ci")] and journal.skipped == 0
+    journal.close()
@@ -0,0 +1,74 @@
+from zscaler_api_talkers.zia.overlap import OverlapAnalyzer
+
+CATEGORIES = [
+    {"id": "CUSTOM_01", "urls": ["www.example.com", ".example.org", "www.example.org", "example.net/docs"]},
+    {
+        "id": "CUSTOM_02",
+        "urls": ["WWW.example.com", "example.net/docs/api", "example.net"],
+        "dbCategorizedUrls": ["www.example.com"],
+    },
+]
+GROUPS = [
+    {"id": 1, "type": "DSTN_IP", "addresses": ["10.0.0.0/24", "10.0.0.5", "10.0.0.0/24", "10.0.1.0-10.0.1.9"]},
+    {"id": 2, "type": "DSTN_IP", "addresses": ["10.0.0.7", "10.0.0.128/25", "10.0.1.5-10.0.1.20", "10.0.1.21"]},
+    {"id": 3, "type": "DSTN_DOMAIN", "addresses": ["*.example.com", "www.example.com", "*.example.com"]},
+    {"id": 4, "type": "DSTN_FQDN", "addresses": ["api.example.com"]},
+    {"id": 5, "type": "DSTN_OTHER", "addresses": ["not-an-address"], "countries": ["COUNTRY_FR"]},
+]
+
+
+def _findings(
+    findings: list,
+) -> set:
+    return {(f["type"], f["owner"], f["entry"], f["by_owner"], f["by_entry"]) for f in findings}
+
+
+def test_url_duplicates_within_and_across_categories():
+    findings = _findings(OverlapAnalyzer(url_categories=CATEGORIES).url_findings())
+    # A same-category cause is preferred
+    assert ("duplicate", "CUSTOM_02", "www.example.com", "CUSTOM_02", "WWW.example.com") in findings
+    assert ("duplicate", "CUSTOM_02", "WWW.example.com", "CUSTOM_01", "www.example.com") in findings
+
+
+def test_urls_covered_by_wildcard_and_shorter_path():
+    findings = _findings(OverlapAnalyzer(url_categories=CATEGORIES).url_findings())
+    assert ("covered", "CUSTOM_01", "www.example.org", "CUSTOM_01", ".example.org") in findings
+    assert ("covered", "CUSTOM_02", "example.net/docs/api", "CUSTOM_02", "example.net") in findings
+    assert ("covered", "CUSTOM_01", "example.net/docs", "CUSTOM_02", "example.net") in findings
+    # Each redundant entry is reported once, and a wildcard does not cover its own domain entries
+    assert len(findings) == 5
+
+
+def test_ip_duplicate_covered_and_overlap():
+    findings = _findings(OverlapAnalyzer(ip_destination_groups=GROUPS[:2]).ip_findings())
+    assert findings == {
+        ("duplicate", 1, "10.0.0.0/24", 1, "10.0.0.0/24"),
+        ("covered", 1, "10.0.0.5", 1, "10.0.0.0/24"),
+        ("covered", 2, "10.0.0.7", 1, "10.0.0.0/24"),
+        ("covered", 2, "10.0.0.128/25", 1, "10.0.0.0/24"),
+        ("overlap", 2, "10.0.1.5-10.0.1.20", 1, "10.0.1.0-10.0.1.9"),
+    }
+
+
+def test_domains_of_domain_groups_only():
+    findings = _findings(OverlapAnalyzer(ip_destination_groups=GROUPS[2:]).ip_findings())
+    assert findings == {
+        ("duplicate", 3, "*.example.com", 3, "*.example.com"),
+        ("covered", 3, "www.example.com", 3, "*.example.com"),
+        ("covered", 4, "api.example.com", 3, "*.example.com"),
+    }
+
+
+def test_mergeable_ip_entries():
+    analyzer = OverlapAnalyzer(ip_destination_groups=GROUPS)
+    # Group 1: 10.0.1.0-10.0.1.9 is adjacent to 10.0.0.0/24. Group 2: 10.0.1.5-10.0.1.20 to 10.0.1.21
+    assert analyzer.mergeable_ip_entries() == {1: 3, 2: 1}
+
+
+def test_report_reclaims_same_owner_findings():
+    analyzer = OverlapAnalyzer(CATEGORIES, GROUPS, url_quota={"uniqueUrlsProvisioned": 9, "remainingUrlsQuota": 10})
+    report = analyzer.report()
+    assert report["url_categories"] == {"entries": 8, "reclaimable": 3, "duplicate": 2, "covered": 3}
+    assert report["ip_destination_groups"]["reclaimable"] == 4
+    assert report["ip_destination_groups"]["overlap"] == 1
+    assert report["url_quota"]["remainingUrlsQuotaAfterCleanup"] == 13
@@ -0,0 +1,69 @@
+import json
+
+from tests.mock_server import MockServer, zia_pages
+from zscaler_api_talkers.helpers.page_size import PageSizePolicy
+from zscaler_api_talkers.helpers.rate_limiter import RateLimiter
+from zscaler_api_talkers.zia.talker import ZiaTalker
+
+LABELS = [{"id": i, "name": f"label-{i}"} for i in range(2500)]
+
+
+def _run(policy: PageSizePolicy, seconds_per_page: float, records: int = 10000, failed: bool = False) -> int:
+    """Records an enumeration of the size the policy chose and returns that size"""
+    size = policy.page_size("tenant", "/users", 1000)
+    pages = -(-records // size)
+    policy.record("tenant", "/users", size, 1000, pages, records, pages * seconds_per_page, failed=failed)
+    return size
+
+
+def test_shrinks_on_slow_pages_and_failures():
+    policy = PageSizePolicy(min_page_size=100, target_page_seconds=1)
+    assert _run(policy, 2) == 1000
+    assert _run(policy, 2) == 500
+    assert _run(policy, 0.5, failed=True) == 250
+    assert policy.page_size("tenant", "/users", 1000) == 125
+    for _ in range(3):
+        _run(policy, 5)
+    assert policy.page_size("tenant", "/users", 1000) == 100
+    assert policy.page_size("tenant", "/users", 50) == 50
+    assert policy.page_size("other", "/users", 1000) == 1000
+
+
+def test_grows_while_pages_stay_under_target():
+    policy = PageSizePolicy(min_page_size=100, target_page_seconds=1)
+    policy.record("tenant", "/users", 125, 1000, 80, 10000, 80 * 0.1)
+    # Larger pages are cheaper per record, the policy explores up to the endpoint maximum and settles there
+    assert [_run(policy, 0.1) for _ in range(5)] == [250, 500, 1000, 1000, 1000]
+    # Sizes whose pages were too slow or that failed are not explored again
+    policy = PageSizePolicy(min_page_size=100, target_page_seconds=1)
+    assert _run(policy, 3) == 1000
+    assert [_run(policy, 0.9) for _ in range(3)] == [500, 500, 500]
+    policy = PageSizePolicy(min_page_size=100, target_page_seconds=1)
+    assert _run(policy, 0.2, failed=True) == 1000
+    assert [_run(policy, 0.2) for _ in range(3)] == [500, 500, 500]
+
+
+def test_persistence_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    policy = PageSizePolicy()
+    assert policy.path is None
+    _run(policy, 5)
+    assert not (tmp_path / "cache").exists()
+    path = tmp_path / "page_sizes.json"
+    policy = PageSizePolicy(path=str(path), persist=True, target_page_seconds=1)
+    _run(policy, 5)
+    assert json.loads(path.read_text())["tenant|/users"]["next"] == 500
+    assert PageSizePolicy(path=str(path), persist=True).page_size("tenant", "/users", 1000) == 500
+    assert PageSizePolicy(path=str(path)).page_size("tenant", "/users", 1000) == 1000
+
+
+def test_rule_labels_go_through_the_policy():
+    policy = PageSizePolicy()
+    with MockServer({("GET", "/api/v1/ruleLabels"): zia_pages(LABELS)}) as server:
+        talker = ZiaTalker("zscaler.net", bearer="token", rate_limiter=RateLimiter([]), page_size_policy=policy)
+        talker.hp_http.host = f"{server.url}/api/v1"
+        assert talker.list_rule_labels() == LABELS
+        assert {query["pageSize"] for _, _, query, _ in server.requests} == {"1000"}
+        assert talker.list_rule_labels(page_size=700) == LABELS
+        assert "700" in policy._state[f"{talker.tenant}|/ruleLabels"]["sizes"]
+        talker.hp_http.close()
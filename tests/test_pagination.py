@@ -0,0 +1,104 @@
+import threading
+import time
+
+from tests.mock_server import MockServer, zia_pages, zpa_pages
+from zscaler_api_talkers.helpers.page_size import PageSizePolicy
+from zscaler_api_talkers.helpers.pagination import fetch_pages, iter_pages
+from zscaler_api_talkers.helpers.rate_limiter import RateLimiter
+from zscaler_api_talkers.zia.talker import ZiaTalker
+from zscaler_api_talkers.zpa.talker import ZpaTalker
+
+CUSTOMER = "/mgmtconfig/v1/admin/customers/1234"
+SEGMENTS = [{"id": str(i), "name": f"segment-{i}"} for i in range(95)]
+USERS = [{"id": i, "name": f"user-{i}"} for i in range(450)]
+
+
+class InFlight(object):
+    """Route wrapper counting the calls served at the same time"""
+
+    def __init__(self, route, delay: float = 0.05):
+        self.route = route
+        self.delay = delay
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query, body):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(self.delay)
+        with self._lock:
+            self.current -= 1
+        return self.route(query, body)
+
+
+def _zpa_talker(server: MockServer) -> ZpaTalker:
+    talker = ZpaTalker(
+        1234,
+        cloud=server.url,
+        rate_limiter=RateLimiter([]),
+        page_size_policy=PageSizePolicy(persist=False),
+    )
+    talker.header = {"Authorization": "Bearer token"}
+    return talker
+
+
+def test_fetch_pages_keeps_order_and_bounds_concurrency():
+    route = InFlight(lambda page, body: [page], delay=0.02)
+    pages = list(fetch_pages(lambda page: route(page, None), range(2, 30), concurrency=4))
+    assert pages == [[page] for page in range(2, 30)]
+    assert 1 < route.peak <= 4
+    assert list(fetch_pages(lambda page: [page], range(1, 4))) == [[1], [2], [3]]
+
+
+def test_zpa_pages_fetched_in_parallel_once_each():
+    route = InFlight(zpa_pages(SEGMENTS))
+    with MockServer({("GET", f"{CUSTOMER}/application"): route}) as server:
+        talker = _zpa_talker(server)
+        assert talker.list_application_segments(concurrency=5, page_size=10) == SEGMENTS
+        assert route.peak > 1
+        pages = sorted(int(query["page"]) for _, _, query, _ in server.requests)
+        # The first page tells totalPages, then every other page is requested once and none past the last
+        assert pages == list(range(1, 11))
+        assert list(talker.iter_application_segments(page_size=10)) == SEGMENTS
+        assert route.peak <= 5
+        talker.hp_http.close()
+
+
+def test_iter_pages_prefetch_stops_at_the_first_empty_page():
+    requested = []
+    route = InFlight(lambda page, body: list(range(10 * page, 10 * page + 10)) if page <= 6 else [], delay=0.02)
+
+    def fetch(page):
+        requested.append(page)
+        return route(page, None)
+
+    pages = list(iter_pages(fetch, prefetch=3))
+    assert pages == [list(range(10 * page, 10 * page + 10)) for page in range(1, 7)]
+    assert 1 < route.peak <= 4
+    # Pages requested ahead of the empty one are bounded by prefetch
+    assert max(requested) <= 7 + 3
+    requested.clear()
+    assert list(iter_pages(fetch)) == pages and requested == list(range(1, 8))
+
+
+def test_zia_prefetch_returns_the_same_records_sooner():
+    route = InFlight(zia_pages(USERS))
+    with MockServer({("GET", "/api/v1/users"): route}) as server:
+        timings = {}
+        for prefetch in (0, 3):
+            talker = ZiaTalker(
+                "zscaler.net",
+                bearer="token",
+                prefetch=prefetch,
+                rate_limiter=RateLimiter([]),
+                page_size_policy=PageSizePolicy(persist=False),
+            )
+            talker.hp_http.host = f"{server.url}/api/v1"
+            start = time.perf_counter()
+            assert talker.list_users(page_size=50) == USERS
+            timings[prefetch] = time.perf_counter() - start
+            talker.hp_http.close()
+        assert route.peak > 1
+        assert timings[3] < timings[0] / 2
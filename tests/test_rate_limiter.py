@@ -0,0 +1,96 @@
+import pytest
+
+from zscaler_api_talkers.helpers import rate_limiter
+from zscaler_api_talkers.helpers.rate_limiter import (
+    CLIENT_CONNECTOR_RATE_LIMITS,
+    MemoryBucketStore,
+    RateLimiter,
+    SqliteBucketStore,
+)
+
+FAMILIES = [
+    ("lookup", ["POST"], r"^/urlLookup", [(1, 1), (3, 60)]),
+    ("read", ["GET"], None, [(2, 1)]),
+]
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "time", fake.time)
+    monkeypatch.setattr(rate_limiter.time, "sleep", fake.sleep)
+    return fake
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBucketStore()
+    return SqliteBucketStore(str(tmp_path / "buckets.sqlite"))
+
+
+def test_burst_then_refill(clock, store):
+    limiter = RateLimiter(FAMILIES, store=store)
+    assert limiter.reserve("GET", "/users") == 0
+    assert limiter.reserve("GET", "/users") == 0
+    assert limiter.reserve("GET", "/users") == pytest.approx(0.5)
+    clock.now += 0.25
+    assert limiter.reserve("GET", "/users") == pytest.approx(0.25)
+    clock.now += 0.25
+    assert limiter.reserve("GET", "/users") == 0
+    assert limiter.calls == {"read": 3}
+
+
+def test_every_bucket_of_the_family_is_taken(clock, store):
+    limiter = RateLimiter(FAMILIES, store=store)
+    for _ in range(3):
+        limiter.acquire("POST", "/urlLookup")
+    # The per-second bucket waited twice, then the per-minute bucket has 0.1 token left, refilled over 2s
+    assert clock.slept == [pytest.approx(1), pytest.approx(1)]
+    assert limiter.reserve("POST", "/urlLookup") == pytest.approx(18)
+    limiter.acquire("POST", "/urlLookup")
+    assert limiter.wait_seconds == pytest.approx(20)
+    assert limiter.calls == {"lookup": 4}
+
+
+def test_calls_without_family_are_not_limited(clock, store):
+    limiter = RateLimiter(FAMILIES, store=store)
+    for _ in range(10):
+        limiter.acquire("DELETE", "/users/1")
+    assert clock.slept == [] and limiter.calls == {}
+    assert RateLimiter([]).family("GET", "/users") == (None, [])
+
+
+def test_limiters_share_quotas_by_name_and_store(clock, tmp_path):
+    path = str(tmp_path / "buckets.sqlite")
+    first = RateLimiter(FAMILIES, store=SqliteBucketStore(path), name="tenant")
+    second = RateLimiter(FAMILIES, store=SqliteBucketStore(path), name="tenant")
+    other = RateLimiter(FAMILIES, store=SqliteBucketStore(path), name="other")
+    assert first.reserve("GET", "/users") == 0
+    assert second.reserve("GET", "/users") == 0
+    assert second.reserve("GET", "/users") > 0
+    assert other.reserve("GET", "/users") == 0
+
+
+def test_client_connector_enumerations_are_not_limited(clock):
+    limiter = RateLimiter(CLIENT_CONNECTOR_RATE_LIMITS)
+    for page in range(1, 500):
+        limiter.acquire("GET", f"/public/v1/getDevices?pageSize=50&page={page}")
+    limiter.acquire("POST", "/auth/v1/login")
+    assert clock.slept == []
+    for _ in range(3):
+        limiter.acquire("GET", "/public/v1/downloadServiceStatus")
+    assert limiter.reserve("GET", "/public/v1/downloadServiceStatus") == pytest.approx(28800)
@@ -0,0 +1,92 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tests.mock_server import MockServer, zia_pages
+from zscaler_api_talkers.helpers.page_size import PageSizePolicy
+from zscaler_api_talkers.helpers.rate_limiter import RateLimiter
+from zscaler_api_talkers.helpers.resolver import NameResolver
+from zscaler_api_talkers.zia.talker import ZiaTalker
+
+
+class Collection(object):
+    """Loader counting its calls"""
+
+    def __init__(self, items: list, delay: float = 0):
+        self.items = items
+        self.delay = delay
+        self.loads = 0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> list:
+        with self._lock:
+            self.loads += 1
+        time.sleep(self.delay)
+        return list(self.items)
+
+
+def test_collections_are_loaded_lazily_and_once():
+    groups = Collection([{"id": 1, "name": "Sales"}, {"id": 2, "name": "IT"}], delay=0.05)
+    locations = Collection([{"id": 9, "name": "Paris"}])
+    resolver = NameResolver({"groups": groups, "locations": locations})
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: resolver.resolve("groups", "IT"), range(16)))
+    assert results == [{"id": 2, "name": "IT"}] * 16
+    assert (groups.loads, locations.loads, resolver.loads) == (1, 0, 1)
+    assert resolver.resolve_many("groups", ["Sales", "IT"]) == [{"id": 1, "name": "Sales"}, {"id": 2, "name": "IT"}]
+    assert resolver.ids("locations", ["Paris"]) == [9]
+    resolver.invalidate("groups")
+    resolver.resolve("groups", "IT")
+    assert groups.loads == 2 and locations.loads == 1
+
+
+def test_misses_reload_once_then_fail():
+    groups = Collection([{"id": 1, "name": "Sales"}])
+    resolver = NameResolver({"groups": groups}, miss_reload_age=0)
+    assert resolver.resolve("groups", "Sales")["id"] == 1
+    groups.items.append({"id": 2, "name": "New"})
+    # Created since the load: found after one reload
+    assert resolver.resolve("groups", "New")["id"] == 2
+    assert groups.loads == 2
+    with pytest.raises(ValueError, match="Not found in groups: Nobody"):
+        resolver.resolve("groups", "Nobody")
+    assert groups.loads == 3
+    never = NameResolver({"groups": groups}, miss_reload_age=None)
+    with pytest.raises(ValueError):
+        never.resolve("groups", "Nobody")
+    assert never.loads == 1
+
+
+def test_ambiguous_names_fields_and_ttl():
+    categories = Collection([{"id": "CUSTOM_01", "configuredName": "Partners"}, {"id": "NEWS", "name": None}])
+    duplicates = Collection([{"id": 1, "name": "Bob"}, {"id": 2, "name": "Bob"}])
+    resolver = NameResolver({"categories": (categories, ("configuredName", "id")), "users": duplicates}, ttl=0)
+    assert resolver.resolve("categories", "Partners") == {"id": "CUSTOM_01", "name": "Partners"}
+    assert resolver.resolve("categories", "NEWS") == {"id": "NEWS", "name": "NEWS"}
+    assert categories.loads == 2
+    with pytest.raises(ValueError, match="Several objects of users"):
+        resolver.resolve("users", "Bob")
+    with pytest.raises(ValueError, match="Unknown collection"):
+        resolver.resolve("nothing", "Bob")
+
+
+def test_zia_name_resolver_lists_each_collection_once():
+    routes = {("GET", "/api/v1/groups"): zia_pages([{"id": 10, "name": "VPN"}, {"id": 11, "name": "Admins"}])}
+    with MockServer(routes) as server:
+        talker = ZiaTalker(
+            "zscaler.net",
+            bearer="token",
+            rate_limiter=RateLimiter([]),
+            page_size_policy=PageSizePolicy(),
+        )
+        talker.hp_http.host = f"{server.url}/api/v1"
+        resolver = talker.name_resolver()
+        assert resolver.resolve_many("groups", ["Admins", "VPN"]) == [
+            {"id": 11, "name": "Admins"},
+            {"id": 10, "name": "VPN"},
+        ]
+        resolver.resolve("groups", "VPN")
+        assert [path for _, path, _, _ in server.requests] == ["/api/v1/groups"] * 2
+        talker.hp_http.close()
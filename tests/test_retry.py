@@ -0,0 +1,114 @@
+import time
+
+import pytest
+import requests
+
+from tests.mock_server import MockServer
+from zscaler_api_talkers.helpers import http_calls
+from zscaler_api_talkers.helpers.http_calls import HttpCalls
+from zscaler_api_talkers.helpers.retry import RetryPolicy
+from zscaler_api_talkers.helpers.token_manager import TokenManager
+
+
+def _response(status: int, headers: dict = None, body: bytes = b"") -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = body
+    return response
+
+
+@pytest.fixture
+def slept(monkeypatch):
+    waits = []
+    monkeypatch.setattr(http_calls.time, "sleep", waits.append)
+    return waits
+
+
+def _failing(statuses: list):
+    """Route answering the given statuses in turn, then 200"""
+    remaining = list(statuses)
+
+    def route(query, body):
+        if remaining:
+            return remaining.pop(0), {"Retry-After": "3 seconds"}
+        return 200, {"ok": True}
+
+    return route
+
+
+def test_retry_after_header_and_body():
+    policy = RetryPolicy(jitter=False, backoff_factor=0.5)
+    assert policy.next_delay("GET", 0, response=_response(429, {"Retry-After": "7"})) == 7
+    assert policy.next_delay("POST", 0, response=_response(429, body=b'{"Retry-After": "2 seconds"}')) == 2
+    # The backoff wins when it is longer than what the server asked
+    assert policy.next_delay("GET", 4, response=_response(503, {"Retry-After": "1"})) == 8
+    assert policy.next_delay("GET", 0, response=_response(503)) == 0.5
+    assert policy.retries == 4 and policy.retries_by_status == {429: 2, 503: 2}
+    retry_date = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert policy.next_delay("GET", 0, response=_response(429, {"Retry-After": retry_date})) == 0.5
+
+
+def test_only_idempotent_methods_retry_server_errors():
+    policy = RetryPolicy(jitter=False)
+    for method in ("POST", "PATCH"):
+        assert policy.next_delay(method, 0, response=_response(503)) is None
+        assert policy.next_delay(method, 0, error=requests.ConnectionError()) is None
+        assert policy.next_delay(method, 0, response=_response(429)) == 1
+    for method in ("GET", "PUT", "DELETE"):
+        assert policy.next_delay(method, 0, response=_response(502)) == 1
+        assert policy.next_delay(method, 0, error=requests.ConnectionError()) == 1
+    assert policy.next_delay("GET", 0, response=_response(500)) is None
+    assert policy.next_delay("GET", 5, response=_response(429)) is None
+    assert RetryPolicy(jitter=False, retry_non_idempotent=True).next_delay("POST", 0, response=_response(503)) == 1
+
+
+def test_retry_budget():
+    policy = RetryPolicy(jitter=False, backoff_factor=2, retry_budget=5)
+    assert policy.next_delay("GET", 0, response=_response(429)) == 2
+    assert policy.next_delay("GET", 0, response=_response(429)) == 2
+    assert policy.next_delay("GET", 0, response=_response(429)) is None
+    assert (policy.retries, policy.wait_seconds, policy.budget_exhausted) == (2, 4, 1)
+
+
+def test_http_calls_retry(slept):
+    routes = {
+        ("GET", "/users"): _failing([429, 503]),
+        ("POST", "/users"): _failing([503]),
+        ("PUT", "/users"): _failing([429]),
+    }
+    with MockServer(routes) as server:
+        hp_http = HttpCalls(server.url, retry_policy=RetryPolicy(jitter=False, backoff_factor=0.1))
+        assert hp_http.get_call("/users").json() == {"ok": True}
+        assert slept == [3, 3]
+        with pytest.raises(ValueError):
+            hp_http.post_call("/users", payload={})
+        assert hp_http.put_call("/users", payload={}).json() == {"ok": True}
+        assert [method for method, *_ in server.requests] == ["GET"] * 3 + ["POST", "PUT", "PUT"]
+        assert HttpCalls(server.url).put_call("/users", payload={}).json() == {"ok": True}
+        hp_http.close()
+
+
+def test_credential_is_refreshed_between_attempts(slept):
+    logins = iter(["first", "second"])
+
+    def login():
+        return {"Authorization": f"Bearer {next(logins)}"}, time.time() + 60
+
+    answers = [429, 200]
+
+    def throttled(query, body):
+        # The wait asked by the server outlives the token
+        manager.expires_at = time.time() - 1
+        return answers.pop(0), {"Retry-After": "120 seconds"}
+
+    with MockServer({("GET", "/users"): throttled}) as server:
+        hp_http = HttpCalls(server.url, retry_policy=RetryPolicy(jitter=False))
+        manager = TokenManager(login, hp_http, "headers", "headers", background=False)
+        manager.refresh()
+        hp_http.token_manager = manager
+        hp_http.get_call("/users")
+        assert slept == [120]
+        sent = [headers["Authorization"] for _, _, _, headers in server.requests]
+        assert sent == ["Bearer first", "Bearer second"]
+        hp_http.close()
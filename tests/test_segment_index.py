@@ -0,0 +1,116 @@
+import random
+
+from tests.mock_server import MockServer, zpa_pages
+from zscaler_api_talkers.helpers.intervals import IntervalMap
+from zscaler_api_talkers.helpers.page_size import PageSizePolicy
+from zscaler_api_talkers.helpers.rate_limiter import RateLimiter
+from zscaler_api_talkers.zpa.segment_index import AppSegmentIndex
+from zscaler_api_talkers.zpa.talker import ZpaTalker
+
+SEGMENTS = [
+    {"id": "1", "domainNames": ["*.example.com"], "tcpPortRange": [{"from": "443", "to": "443"}]},
+    {"id": "2", "domainNames": ["www.example.com"], "tcpPortRanges": ["80", "443"]},
+    {"id": "3", "domainNames": ["10.0.0.0/8", "10.1.0.0/16"], "tcpPortRange": [{"from": "22", "to": "22"}]},
+    {"id": "4", "domainNames": ["10.1.2.3"], "tcpPortRange": [{"from": "22", "to": "22"}]},
+    {"id": "5", "domainNames": ["db.example.com"], "udpPortRange": [{"from": "53", "to": "53"}]},
+]
+
+
+def test_interval_map_matches_brute_force():
+    rng = random.Random(11)
+    intervals = IntervalMap()
+    expected = []
+    for value in range(500):
+        first = rng.randrange(10000)
+        last = first + rng.choice((0, 1, 10, 300, 5000))
+        intervals.add(first, last, value)
+        expected.append((first, last, value))
+    for first, last, value in expected[::3]:
+        assert intervals.remove(first, last, value)
+    assert not intervals.remove(*expected[0])
+    expected = [entry for i, entry in enumerate(expected) if i % 3]
+    assert len(intervals) == len(expected)
+    for _ in range(300):
+        first = rng.randrange(-10, 16000)
+        last = first + rng.choice((0, 5, 500))
+        assert sorted(intervals.overlapping(first, last)) == sorted(
+            entry for entry in expected if entry[0] <= last and entry[1] >= first
+        )
+        assert sorted(intervals.match(first)) == sorted(
+            entry for entry in expected if entry[0] <= first <= entry[1]
+        )
+
+
+def test_lookup_and_match_most_specific_first():
+    index = AppSegmentIndex(SEGMENTS)
+    assert [domain for domain, _ in index.lookup("www.example.com")] == ["www.example.com", "*.example.com"]
+    assert [domain for domain, _ in index.lookup("10.1.2.3")] == ["10.1.2.3", "10.1.0.0/16", "10.0.0.0/8"]
+    assert index.match("www.example.com", 443)["id"] == "2"
+    assert index.match("www.example.com", 8443) is None
+    assert index.match("mail.example.com", 443)["id"] == "1"
+    assert index.match("db.example.com", 53, "udp")["id"] == "5"
+    assert index.match("10.9.9.9", 22)["id"] == "3"
+    assert [segment["id"] for segment in index.claims("10.1.0.0/16")] == ["3"]
+    assert [segment["id"] for segment in index.claims("*.example.com")] == ["1"]
+
+
+def test_conflicts_and_overlaps():
+    index = AppSegmentIndex(SEGMENTS)
+    findings = index.conflicts({"domainNames": ["www.example.com", "10.1.2.0/24"], "tcpPortRanges": ["443", "443"]})
+    assert sorted((f["type"], f["other_domain"], f["other"]["id"]) for f in findings) == [
+        ("conflict", "www.example.com", "2"),
+        ("overlap", "*.example.com", "1"),
+    ]
+    findings = index.conflicts({"domainNames": ["10.1.0.0/16"], "tcpPortRange": [{"from": "20", "to": "30"}]})
+    assert sorted((f["type"], f["other_domain"]) for f in findings) == [
+        ("conflict", "10.1.0.0/16"),
+        ("overlap", "10.0.0.0/8"),
+        ("overlap", "10.1.2.3"),
+    ]
+    assert findings[0]["ports"] == {"TCP": [(22, 22)]}
+    assert len(index.all_conflicts()) == 3
+
+
+def test_remove_unindexes_domains_and_ranges():
+    index = AppSegmentIndex(SEGMENTS)
+    assert index.remove(3)
+    assert not index.remove(3)
+    assert 3 not in index and len(index) == 4
+    assert [domain for domain, _ in index.lookup("10.1.2.3")] == ["10.1.2.3"]
+    assert index.lookup("10.9.9.9") == []
+
+
+def test_talker_keeps_the_index_up_to_date():
+    customer = "/mgmtconfig/v1/admin/customers/1234/application"
+    routes = {
+        ("GET", customer): zpa_pages(SEGMENTS),
+        ("PUT", f"{customer}/2"): lambda query, body: (204, None),
+        ("PUT", f"{customer}/4"): lambda query, body: (204, None),
+        ("POST", customer): lambda query, body: (200, {**body, "id": "6"}),
+        ("DELETE", f"{customer}/1"): lambda query, body: (204, None),
+    }
+    with MockServer(routes) as server:
+        talker = ZpaTalker(
+            1234,
+            cloud=server.url,
+            rate_limiter=RateLimiter([]),
+            page_size_policy=PageSizePolicy(persist=False),
+        )
+        talker.header = {"Authorization": "Bearer token"}
+        index = talker.load_segment_index()
+        assert len(index) == 5
+        # New ports replace the old ones, whichever field set them
+        talker.update_application_segment(2, {"tcpPortRange": [{"from": "8443", "to": "8443"}]})
+        assert index.match("www.example.com", 8443)["id"] == "2"
+        assert index.match("www.example.com", 80) is None
+        assert index.match("www.example.com", 443)["id"] == "1"
+        talker.update_application_segment(4, {"domainNames": ["10.1.2.4"]})
+        assert index.match("10.1.2.3", 22)["id"] == "3"
+        assert index.match("10.1.2.4", 22)["id"] == "4"
+        talker.add_application_segment(
+            "New", "NONE", ["new.example.com"], "50", [], tcp_port_range=[{"from": "443", "to": "443"}]
+        )
+        assert index.match("new.example.com", 443)["id"] == "6"
+        talker.delete_application_segment(1)
+        assert index.match("mail.example.com", 443) is None
+        talker.hp_http.close()
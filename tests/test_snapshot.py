@@ -0,0 +1,95 @@
+import time
+
+from tests.mock_server import MockServer, zia_pages
+from zscaler_api_talkers.helpers.page_size import PageSizePolicy
+from zscaler_api_talkers.helpers.rate_limiter import RateLimiter
+from zscaler_api_talkers.helpers.snapshot import SnapshotStore
+from zscaler_api_talkers.zia.talker import ZiaTalker
+
+REPORT_HEADER = b"Report Created,Oct 18 2026\n\nTime,Action,Category,Sub-Category,Result\n"
+
+
+class FakeTalker(object):
+    tenant = "tenant"
+
+    def __init__(self):
+        self.calls = []
+
+    def list_nothing(self):
+        self.calls.append("list_nothing")
+        return None
+
+    def list_users(self, query: str = None):
+        self.calls.append(("list_users", query))
+        return [{"id": len(self.calls), "query": query}]
+
+
+def test_none_and_empty_results_are_served_from_the_snapshot(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.sqlite"))
+    talker = FakeTalker()
+    assert store.get(talker, "list_nothing") is None
+    assert store.get(talker, "list_nothing") is None
+    assert talker.calls == ["list_nothing"]
+    assert store.fetched_at("tenant", "list_nothing") is not None
+
+
+def test_ttl_parameters_and_invalidation(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.sqlite"), ttl=3600, ttls={"list_nothing": 0})
+    talker = FakeTalker()
+    assert store.get(talker, "list_users") == store.get(talker, "list_users") == [{"id": 1, "query": None}]
+    assert store.get(talker, "list_users", query="dept=Sales")[0]["id"] == 2
+    assert store.get(talker, "list_users", max_age=0)[0]["id"] == 3
+    store.get(talker, "list_nothing")
+    store.get(talker, "list_nothing")
+    assert talker.calls.count("list_nothing") == 2
+    # Invalidating a collection invalidates it with every set of parameters
+    store.invalidate("tenant", ["list_users"])
+    assert store.get(talker, "list_users", query="dept=Sales")[0]["id"] == 6
+    assert store.get(talker, "list_users")[0]["id"] == 7
+    store.clear("tenant")
+    assert store.fetched_at("tenant", "list_users") is None
+
+
+def test_audit_log_invalidates_only_changed_collections(tmp_path):
+    report = [REPORT_HEADER]
+    routes = {
+        ("GET", "/api/v1/users"): zia_pages([{"id": 1, "name": "alice"}]),
+        ("GET", "/api/v1/locations"): [{"id": 10, "name": "Paris"}],
+        ("POST", "/api/v1/auditlogEntryReport"): lambda query, body: (204, None),
+        ("GET", "/api/v1/auditlogEntryReport"): {"status": "COMPLETE"},
+        ("GET", "/api/v1/auditlogEntryReport/download"): lambda query, body: (200, report[0]),
+    }
+    with MockServer(routes) as server:
+        talker = ZiaTalker(
+            "zscaler.net",
+            bearer="token",
+            rate_limiter=RateLimiter([]),
+            page_size_policy=PageSizePolicy(),
+        )
+        talker.hp_http.host = f"{server.url}/api/v1"
+        store = SnapshotStore(str(tmp_path / "snapshots.sqlite"), ttl=86400)
+
+        def fetches() -> dict:
+            # One call per enumeration, counting only first pages
+            first_pages = [path for _, path, query, _ in server.requests if query.get("page", "1") == "1"]
+            return {path: first_pages.count(path) for path in ("/api/v1/users", "/api/v1/locations")}
+
+        # The first sync only records the time
+        assert store.sync_audit_log(talker) == set()
+        assert not any(path == "/api/v1/auditlogEntryReport" for _, path, _, _ in server.requests)
+        store.get_many(talker, ["list_users", "list_locations"])
+        report[0] = REPORT_HEADER + b"Oct 18 2026,Update,User Management,User,Success\n"
+        report[0] += b"Oct 18 2026,Sign In,Login,,Success\n"
+        time.sleep(0.01)
+        changed = store.sync_audit_log(talker)
+        assert "list_users" in changed and "list_locations" not in changed
+        assert store.fetched_at(talker.tenant, "list_locations") > 0
+        assert store.fetched_at(talker.tenant, "list_users") == 0
+        store.get_many(talker, ["list_users", "list_locations"])
+        assert fetches()["/api/v1/users"] == 2 and fetches()["/api/v1/locations"] == 1
+        # A change that maps to no list method invalidates everything
+        report[0] = REPORT_HEADER + b"Oct 18 2026,Update,Something New,,Success\n"
+        assert store.sync_audit_log(talker) is None
+        store.get_many(talker, ["list_users", "list_locations"])
+        assert fetches()["/api/v1/users"] == 3 and fetches()["/api/v1/locations"] == 2
+        talker.hp_http.close()
@@ -0,0 +1,93 @@
+from zscaler_api_talkers.zia.sync import SyncPlanner
+
+LIVE = {
+    "url_categories": [
+        {
+            "id": "CUSTOM_01",
+            "configuredName": "Partners",
+            "superCategory": "USER_DEFINED",
+            "urls": ["a.example", "b.example", "c.example"],
+            "keywords": [],
+            "urlKeywordCounts": {"totalUrlCount": 3},
+            "customUrlsCount": 3,
+            "editable": True,
+            "val": 128,
+        },
+        {"id": "CUSTOM_02", "configuredName": "Old", "urls": ["old.example"]},
+    ],
+    "security_blacklisted_urls": ["bad1.example", "bad2.example"],
+    "security_whitelisted_urls": ["good.example"],
+}
+
+
+class FakeTalker(object):
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(**kwargs):
+            self.calls.append((name, kwargs))
+            return name
+
+        return call
+
+
+def test_computed_fields_do_not_force_a_full_update():
+    desired = {
+        "url_categories": [
+            {"configuredName": "Partners", "superCategory": "USER_DEFINED", "urls": ["a.example", "b.example"]}
+        ]
+    }
+    plan = SyncPlanner().plan(desired, LIVE)
+    assert [(step.stage, step.method) for step in plan.steps] == [("remove", "update_url_categories")]
+    assert plan.steps[0].kwargs == {
+        "category_id": "CUSTOM_01",
+        "action": "REMOVE_FROM_LIST",
+        "configured_name": "Partners",
+        "urls": ["c.example"],
+    }
+    assert plan.payload_bytes < plan.full_payload_bytes
+
+
+def test_configurable_field_change_replaces_the_category():
+    desired = {"url_categories": [{"configuredName": "Partners", "description": "New", "urls": ["a.example"]}]}
+    plan = SyncPlanner().plan(desired, LIVE)
+    assert [(step.stage, step.method) for step in plan.steps] == [("update", "update_call")]
+    assert plan.steps[0].kwargs["url"] == "/urlCategories/CUSTOM_01"
+    assert plan.steps[0].kwargs["payload"]["urls"] == ["a.example"]
+
+
+def test_removals_run_before_creates_and_adds():
+    desired = {
+        "url_categories": [
+            {"configuredName": "New", "urls": ["n.example"]},
+            {"configuredName": "Partners", "urls": ["a.example", "d.example"]},
+        ],
+        "security_blacklisted_urls": ["bad2.example", "bad3.example"],
+        "security_whitelisted_urls": ["good.example"],
+    }
+    plan = SyncPlanner(prune=True).plan(desired, LIVE)
+    assert [step.stage for step in plan.steps] == ["remove", "remove", "create", "add", "add", "delete"]
+    assert [step.method for step in plan.steps] == [
+        "update_url_categories",
+        "remove_security_blacklist_urls",
+        "add_raw_url_categories",
+        "update_url_categories",
+        "add_security_blacklist_urls",
+        "delete_url_categories",
+    ]
+    talker = FakeTalker()
+    assert plan.execute(talker) == [step.method for step in plan.steps]
+    assert talker.calls[-1] == ("delete_url_categories", {"category_id": "CUSTOM_02"})
+
+
+def test_deltas_are_batched():
+    desired = {"security_blacklisted_urls": [f"{i}.example" for i in range(25)]}
+    plan = SyncPlanner(batch_size=10).plan(desired, {"security_blacklisted_urls": []})
+    assert [len(step.kwargs["urls"]) for step in plan.steps] == [10, 10, 5]
+
+
+def test_white_list_is_replaced_only_when_it_differs():
+    assert len(SyncPlanner().plan({"security_whitelisted_urls": ["good.example"]}, LIVE)) == 0
+    plan = SyncPlanner().plan({"security_whitelisted_urls": ["other.example"]}, LIVE)
+    assert [step.method for step in plan.steps] == ["update_security_whitelisted_urls"]
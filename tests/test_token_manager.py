@@ -0,0 +1,118 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tests.mock_server import MockServer
+from zscaler_api_talkers.helpers.page_size import PageSizePolicy
+from zscaler_api_talkers.helpers.rate_limiter import RateLimiter
+from zscaler_api_talkers.zpa.talker import ZpaTalker
+
+CUSTOMER = "/mgmtconfig/v1/admin/customers/1234"
+
+
+class Tenant(object):
+    """ZPA sign-in and one application segment, accepting only the last issued token"""
+
+    def __init__(self, expires_in: list = None, login_seconds: float = 0.2):
+        self.expires_in = list(expires_in or [])
+        self.login_seconds = login_seconds
+        self.logins = 0
+        self.valid = None
+        self._lock = threading.Lock()
+
+    def signin(self, query, body):
+        assert body == {"client_id": "client", "client_secret": "secret"}
+        time.sleep(self.login_seconds)
+        with self._lock:
+            self.logins += 1
+            self.valid = f"token-{self.logins}"
+            expires_in = self.expires_in.pop(0) if self.expires_in else 3600
+        return 200, {"token_type": "Bearer", "access_token": self.valid, "expires_in": str(expires_in)}
+
+    def routes(self, server: MockServer) -> dict:
+        def segment(query, body):
+            sent = server.current.headers.get("Authorization")
+            if sent != f"Bearer {self.valid}":
+                return 401, {"message": "Invalid token"}
+            return 200, {"id": "1", "token": sent}
+
+        return {
+            ("POST", "/signin"): self.signin,
+            ("GET", f"{CUSTOMER}/application/1"): segment,
+            ("GET", f"{CUSTOMER}/application/2"): lambda query, body: (401, {"message": "Forbidden"}),
+        }
+
+
+def _talker(server: MockServer) -> ZpaTalker:
+    return ZpaTalker(
+        1234,
+        cloud=server.url,
+        client_id="client",
+        client_secret="secret",
+        rate_limiter=RateLimiter([]),
+        page_size_policy=PageSizePolicy(),
+    )
+
+
+def _start(tenant: Tenant) -> MockServer:
+    server = MockServer()
+    server.routes.update(tenant.routes(server))
+    return server
+
+
+def _concurrent_lookups(talker: ZpaTalker, calls: int = 8) -> list:
+    with ThreadPoolExecutor(calls) as executor:
+        return list(executor.map(lambda _: talker.list_application_segments(application_id=1), range(calls)))
+
+
+def test_revoked_token_is_replaced_by_a_single_login():
+    tenant = Tenant()
+    with _start(tenant) as server:
+        talker = _talker(server)
+        assert tenant.logins == 1
+        tenant.valid = "revoked"
+        segments = _concurrent_lookups(talker)
+        assert tenant.logins == 2
+        assert {segment["token"] for segment in segments} == {"Bearer token-2"}
+        assert talker.header == {"Authorization": "Bearer token-2"}
+        talker.hp_http.close()
+
+
+def test_a_401_is_retried_once():
+    tenant = Tenant()
+    with _start(tenant) as server:
+        talker = _talker(server)
+        with pytest.raises(ValueError):
+            talker.list_application_segments(application_id=2)
+        assert [path for _, path, _, _ in server.requests].count(f"{CUSTOMER}/application/2") == 2
+        assert tenant.logins == 2
+        talker.hp_http.close()
+
+
+def test_expired_token_is_refreshed_once():
+    tenant = Tenant(expires_in=[0])
+    with _start(tenant) as server:
+        talker = _talker(server)
+        segments = _concurrent_lookups(talker)
+        assert tenant.logins == 2
+        assert {segment["token"] for segment in segments} == {"Bearer token-2"}
+        # Calls wait for the refresh of an expired token instead of being rejected first
+        assert len(server.requests) == 2 + 8
+        talker.hp_http.close()
+
+
+def test_expiring_token_is_refreshed_once_in_the_background():
+    tenant = Tenant(expires_in=[120], login_seconds=0.5)
+    with _start(tenant) as server:
+        talker = _talker(server)
+        start = time.perf_counter()
+        segments = _concurrent_lookups(talker, calls=16)
+        # The calls did not wait for the login running in the background
+        assert time.perf_counter() - start < 0.5
+        assert {segment["token"] for segment in segments} == {"Bearer token-1"}
+        time.sleep(0.7)
+        assert tenant.logins == 2
+        assert talker.header == {"Authorization": "Bearer token-2"}
+        talker.hp_http.close()
@@ -0,0 +1,77 @@
+import threading
+
+from tests.mock_server import MockServer
+from zscaler_api_talkers.helpers.page_size import PageSizePolicy
+from zscaler_api_talkers.helpers.rate_limiter import RateLimiter
+from zscaler_api_talkers.zia.talker import ZiaTalker
+from zscaler_api_talkers.zia.url_classifier import UrlClassifier
+
+# 1500 distinct URLs, each 200th repeated, in mixed case and with schemes
+URLS = [f"https://Site-{i}.example/" if i % 3 else f"site-{i}.example" for i in range(1500)]
+SOURCE = [url for i, url in enumerate(URLS) for _ in range(2 if i % 200 == 0 else 1)]
+
+
+class Lookups(object):
+    """/urlLookup route recording every URL it was sent"""
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def __call__(self, query, body):
+        assert len(body) <= 100
+        with self._lock:
+            self.sent.extend(body)
+        return 200, [{"url": url, "urlClassifications": ["NEWS"]} for url in body]
+
+
+def _talkers(server: MockServer, count: int = 2) -> list:
+    talkers = []
+    for _ in range(count):
+        talker = ZiaTalker(
+            "zscaler.net",
+            bearer="token",
+            rate_limiter=RateLimiter([]),
+            page_size_policy=PageSizePolicy(),
+        )
+        talker.hp_http.host = f"{server.url}/api/v1"
+        talkers.append(talker)
+    return talkers
+
+
+def test_resume_looks_up_every_url_once(tmp_path):
+    checkpoint = str(tmp_path / "job.sqlite")
+    lookups = Lookups()
+    expected = {f"site-{i}.example" for i in range(1500)}
+    with MockServer({("POST", "/api/v1/urlLookup"): lookups}) as server:
+        first = UrlClassifier(_talkers(server), checkpoint=checkpoint, read_size=250)
+        delivered = []
+        results = first.classify(iter(SOURCE))
+        for result in results:
+            delivered.append(result["url"])
+            if len(delivered) == 730:
+                break
+        # Stopped mid-batch, with the next batches in flight on the other talker
+        results.close()
+        assert len(lookups.sent) > len(delivered)
+        second = UrlClassifier(_talkers(server), checkpoint=checkpoint, read_size=250)
+        resumed = [result["url"] for result in second.classify(iter(SOURCE))]
+        assert 0 < second.skipped < len(SOURCE)
+        # None is skipped, none is looked up twice, and only the batch in progress is delivered again
+        assert set(delivered) | set(resumed) == expected
+        assert sorted(lookups.sent) == sorted(expected)
+        assert len(delivered) + len(resumed) - len(expected) < 100
+        # A finished job has nothing left to do
+        third = UrlClassifier(_talkers(server), checkpoint=checkpoint)
+        assert list(third.classify(iter(SOURCE))) == []
+        assert len(lookups.sent) == len(expected)
+
+
+def test_without_checkpoint_duplicates_are_classified_once():
+    lookups = Lookups()
+    with MockServer({("POST", "/api/v1/urlLookup"): lookups}) as server:
+        classifier = UrlClassifier(_talkers(server, 3), read_size=100)
+        results = list(classifier.classify(iter(SOURCE)))
+        assert len(results) == len(URLS) == len(lookups.sent)
+        assert classifier.duplicates == len(SOURCE) - len(URLS)
+        assert classifier.looked_up == len(URLS)
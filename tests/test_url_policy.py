@@ -0,0 +1,87 @@
+from zscaler_api_talkers.zia.url_policy import UNKNOWN_CATEGORY, UrlPolicyEngine
+
+CATEGORIES = [
+    {"id": "CUSTOM_01", "urls": ["foo.com/path", ".partner.example"], "keywords": ["casino"]},
+    {"id": "CUSTOM_02", "dbCategorizedUrls": ["news.example"]},
+]
+RULES = [
+    {"id": 1, "name": "Sales", "order": 1, "urlCategories": ["CUSTOM_01"], "groups": [{"id": 10}], "departments": [20]},
+    {"id": 2, "order": 2, "urlCategories": ["NEWS_AND_MEDIA"], "locations": [1], "locationGroups": [5]},
+    {"id": 3, "name": "Disabled", "order": 3, "state": "DISABLED"},
+    {"id": 4, "name": "Posts", "order": 4, "requestMethods": ["POST"]},
+    {"id": 5, "name": "Any", "order": 5},
+]
+LOOKUPS = {
+    "news.example": {"url": "news.example", "urlClassifications": ["NEWS_AND_MEDIA"]},
+    "shop.example": {"url": "shop.example", "urlClassifications": ["ONLINE_SHOPPING"]},
+}
+
+
+class FakeCache(object):
+    def __init__(self):
+        self.calls = 0
+
+    def get_many(self, urls):
+        self.calls += 1
+        return {url: LOOKUPS[url] for url in urls if url in LOOKUPS}
+
+
+class FakeTalker(object):
+    def __init__(self):
+        self.looked_up = []
+
+    def url_lookup_batch(self, urls):
+        assert len(urls) <= 100
+        self.looked_up.extend(urls)
+        return {url: {"url": url, "urlClassifications": ["GAMBLING"]} for url in urls if url.startswith("bet")}
+
+
+def test_custom_paths_match_whole_segments():
+    engine = UrlPolicyEngine([], CATEGORIES)
+    assert engine.categorize("https://foo.com/path") == {"CUSTOM_01"}
+    assert engine.categorize("foo.com/path/sub?q=1") == {"CUSTOM_01"}
+    assert engine.categorize("foo.com/path?q=1") == {"CUSTOM_01"}
+    assert engine.categorize("foo.com/pathology") == {UNKNOWN_CATEGORY}
+    assert engine.categorize("www.partner.example/a") == {"CUSTOM_01"}
+    assert engine.categorize("partner.example") == {"CUSTOM_01"}
+    assert engine.categorize("play-casino.example") == {"CUSTOM_01"}
+
+
+def test_retained_categories_add_to_predefined_ones():
+    engine = UrlPolicyEngine([], CATEGORIES, lookup_cache=FakeCache())
+    assert engine.categorize("news.example") == {"CUSTOM_02", "NEWS_AND_MEDIA"}
+    assert engine.categorize("shop.example") == {"ONLINE_SHOPPING"}
+
+
+def test_identity_and_location_criteria_match_any_value_of_their_family():
+    engine = UrlPolicyEngine(RULES, CATEGORIES, lookup_cache=FakeCache())
+    assert engine.evaluate("foo.com/path", groups=[10])["id"] == 1
+    assert engine.evaluate("foo.com/path", department=20)["id"] == 1
+    assert engine.evaluate("foo.com/path", groups=[11], department=21)["id"] == 5
+    assert engine.evaluate("news.example", location=1)["id"] == 2
+    assert engine.evaluate("news.example", location=2, location_groups=[5])["id"] == 2
+    assert engine.evaluate("news.example", location=2)["id"] == 5
+    assert engine.evaluate("shop.example", request_method="POST")["id"] == 4
+
+
+def test_validity_period():
+    rules = [
+        {"id": 1, "order": 1, "enforceTimeValidity": True, "validityStartTime": 100, "validityEndTime": 200},
+        {"id": 2, "order": 2},
+    ]
+    engine = UrlPolicyEngine(rules, [])
+    assert engine.evaluate("a.example", at=150)["id"] == 1
+    assert engine.evaluate("a.example", at=250)["id"] == 2
+
+
+def test_prefetch_reads_the_cache_once_per_batch_then_the_talker():
+    cache, talker = FakeCache(), FakeTalker()
+    engine = UrlPolicyEngine(RULES, CATEGORIES, lookup_cache=cache, talker=talker)
+    requests = [{"url": url} for url in ("news.example", "shop.example", "bet.example", "other.example")] * 600
+    results = [rule["id"] for _, rule in engine.evaluate_many(requests)]
+    assert results[:4] == [5, 5, 5, 5]
+    assert cache.calls == 1
+    assert sorted(talker.looked_up) == ["bet.example", "other.example"]
+    assert engine.categorize("bet.example") == {"GAMBLING"}
+    assert engine.categorize("other.example") == {UNKNOWN_CATEGORY}
+    assert cache.calls == 1
@@ -1,7 +1,11 @@
-from .client_connector.talker import ClientConnectorTalker, ZccTalker
-from .zia.talker import ZiaTalker
-from .zpa.talker import ZpaTalker
-from .cloud_connector.talker import CloudConnectorTalker
+from .client_connector.talker import (
+    AsyncClientConnectorTalker,
+    ClientConnectorTalker,
+    ZccTalker,
+)
+from .zia.talker import AsyncZiaTalker, ZiaTalker
+from .zpa.talker import AsyncZpaTalker, ZpaTalker
+from .cloud_connector.talker import AsyncCloudConnectorTalker, CloudConnectorTalker
 
 __all__ = [
     "ZccTalker",  # Deprecated on 20230705.
@@ -9,4 +13,8 @@ __all__ = [
     "ZiaTalker",
     "ZpaTalker",
     "CloudConnectorTalker",
+    "AsyncClientConnectorTalker",
+    "AsyncZiaTalker",
+    "AsyncZpaTalker",
+    "AsyncCloudConnectorTalker",
 ]
@@ -2,8 +2,17 @@ import json
 import pdb
 import time
 import requests
+from zscaler_api_talkers.helpers.async_calls import AsyncTalker
+from zscaler_api_talkers.helpers.bulk import BulkExecutor, BulkResult
+from zscaler_api_talkers.helpers.credential_cache import CredentialCache, jwt_expiry
 from zscaler_api_talkers.helpers.http_calls import HttpCalls
+from zscaler_api_talkers.helpers.journal import MutationJournal
 from zscaler_api_talkers.helpers.logger import setup_logger
+from zscaler_api_talkers.helpers.page_size import CLIENT_CONNECTOR_PAGE_SIZES, PageMeter, PageSizePolicy
+from zscaler_api_talkers.helpers.pagination import iter_pages
+from zscaler_api_talkers.helpers.rate_limiter import CLIENT_CONNECTOR_RATE_LIMITS, RateLimiter
+from zscaler_api_talkers.helpers.retry import RetryPolicy
+from zscaler_api_talkers.helpers.token_manager import TokenManager
 
 logger = setup_logger(name=__name__)
 
@@ -20,17 +29,47 @@ class ClientConnectorTalker(object):
             cloud: str,
             client_id: str = "",
             secret_key: str = "",
+            session: requests.Session = None,
+            rate_limiter: RateLimiter = None,
+            retry_policy: RetryPolicy = None,
+            prefetch: int = 0,
+            page_size_policy: PageSizePolicy = None,
+            credential_cache: CredentialCache = None,
+            journal: MutationJournal = None,
     ):
         """
         :param cloud: (str) Top Level Domain (TLD) of the Zscaler cloud where tenant resides.
         :param client_id: (str) Client ID
         :param secret_key: (str) Secret Key
+        :param session: (requests.Session) Optional pooled session shared with other talkers
+        :param rate_limiter: (RateLimiter) Optional scheduler shared with other talkers of the same tenant. Default is
+            a new RateLimiter with CLIENT_CONNECTOR_RATE_LIMITS
+        :param retry_policy: (RetryPolicy) Optional policy to retry throttled and failed calls. Default is a new
+            RetryPolicy, retrying up to 5 times with backoff. RetryPolicy(max_retries=0) sends every call once
+        :param prefetch: (int) Number of pages requested ahead of the current one when listing. Default 0 (serial)
+        :param page_size_policy: (PageSizePolicy) Optional policy choosing the page size of list methods, shared with
+            other talkers. Default is a new PageSizePolicy keeping its measures in memory
+        :param credential_cache: (CredentialCache) Optional cache to reuse the JWT of this client across talkers
+            and processes
+        :param journal: (MutationJournal) Optional write-ahead journal of the add_*, update_*, delete_* and remove_*
+            calls, to resume interrupted jobs
         """
         self.base_uri = f"https://api-mobile.{cloud}/papi"
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(CLIENT_CONNECTOR_RATE_LIMITS, name=f"api-mobile.{cloud}")
         self.hp_http = HttpCalls(
             host=self.base_uri,
             verify=True,
+            session=session,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy or RetryPolicy(),
         )
+        self.prefetch = prefetch
+        self.tenant = f"api-mobile.{cloud}"
+        self.page_size_policy = page_size_policy or PageSizePolicy()
+        self.credential_cache = credential_cache
+        if journal:
+            journal.attach(self)
         self.jsession_id = None
         self.version = "beta 0.1"
         self.header = {}
@@ -46,11 +85,37 @@ class ClientConnectorTalker(object):
             secret_key: str,
     ):
         """
-        Method to authenticate.
+        Method to authenticate. With a credential cache, a cached JWT of this client is reused when still valid.
+        The JWT is refreshed in the background shortly before it expires, and right away when it is rejected with a
+        401.
 
         :param client_id: (str) Client id
         :param secret_key: (str) Client secret, obtained from portal.
         """
+        self.hp_http.token_manager = TokenManager(
+            login=lambda: self._login(client_id, secret_key),
+            target=self,
+            attribute="header",
+            kwarg="headers",
+            credential_cache=self.credential_cache,
+            cloud=self.base_uri,
+            user=client_id,
+        )
+        self.hp_http.token_manager.refresh()
+
+    def _login(
+            self,
+            client_id: str,
+            secret_key: str,
+    ) -> tuple:
+        """
+        Internal method to obtain a new JWT
+
+        :param client_id: (str) Client id
+        :param secret_key: (str) Client secret, obtained from portal.
+
+        :return: (tuple) (header, epoch of expiry)
+        """
         payload = {
             "apiKey": client_id,
             "secretKey": secret_key,
@@ -61,7 +126,9 @@ class ClientConnectorTalker(object):
             headers={"Accept": "*/*"},
             payload=payload,
         )
-        self.header = {"auth-token": response.json()["jwtToken"]}
+        token = response.json()["jwtToken"]
+
+        return {"auth-token": token}, jwt_expiry(token) or time.time() + 3600
 
     def _obtain_all(
             self,
@@ -69,60 +136,125 @@ class ClientConnectorTalker(object):
             cookies: dict = None,
             params: dict = None,
             headers: dict = None,
+            page_size: int = None,
     ) -> json:
         """
         Internal method that queries all pages
 
-        :param url: (str) URL
+        :param url: (str) URL, without pageSize
         :param cookies: (dict?) Cookies
         :param params: (dict) Parameters to pass in request
         :param headers: (dict) Headers to pass in request
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (json) JSON of results
         """
-        page = 1
-        result = []
-        while True:
-            response = self.hp_http.get_call(
-                f"{url}&page={page}",
+        return list(
+            self._iter_all(
+                url,
                 cookies=cookies,
                 params=params,
                 headers=headers,
-                error_handling=True,
+                page_size=page_size,
             )
-            if response.json():
-                result += response.json()
-                page += 1
-                time.sleep(0.5)
-            else:
-                break
+        )
+
+    def _iter_all(
+            self,
+            url: str,
+            cookies: dict = None,
+            params: dict = None,
+            headers: dict = None,
+            page_size: int = None,
+    ):
+        """
+        Internal generator that queries all pages and yields the records of each page as it arrives
 
-        return result
+        :param url: (str) URL, without pageSize
+        :param cookies: (dict?) Cookies
+        :param params: (dict) Parameters to pass in request
+        :param headers: (dict) Headers to pass in request
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Records
+        """
+        endpoint = url.split("?")[0]
+        max_page_size = CLIENT_CONNECTOR_PAGE_SIZES.get(endpoint, 500)
+        if page_size is None:
+            page_size = self.page_size_policy.page_size(self.tenant, endpoint, max_page_size)
+        url = f"{url}{'&' if '?' in url else '?'}pageSize={page_size}"
+        meter = PageMeter(self.page_size_policy, self.tenant, endpoint, page_size, max_page_size)
+        pages = iter_pages(
+            meter.wrap(
+                lambda page: self.hp_http.get_call(
+                    f"{url}&page={page}",
+                    cookies=cookies,
+                    params=params,
+                    headers=headers,
+                    error_handling=True,
+                )
+            ),
+            prefetch=self.prefetch,
+        )
+        try:
+            for page in pages:
+                meter.count(len(page))
+                yield from page
+        except Exception:
+            meter.record(failed=True)
+            raise
+        meter.record()
 
     def list_devices(
             self,
             username: str = None,
             os_type: str = None,
+            page_size: int = None,
     ) -> json:
         """
         Gets the list of all enrolled devices of your organization and their basic details.
         :param username: (str) Username in email format
         :param os_type: (str)  1 - iOS, 2 - Android, 3 - Windows, 4 - macOS, 5 - Linux
+        :param page_size: (int) Page size. Default is chosen by the page size policy
         :return: (json) JSON of results
         """
-        url = "/public/v1/getDevices?pageSize=500"
+        return list(
+            self.iter_devices(
+                username=username,
+                os_type=os_type,
+                page_size=page_size,
+            )
+        )
+
+    def iter_devices(
+            self,
+            username: str = None,
+            os_type: str = None,
+            page_size: int = None,
+    ):
+        """
+        Generator version of list_devices. Yields devices page by page as they arrive, so large tenants can be
+        processed with constant memory.
+        :param username: (str) Username in email format
+        :param os_type: (str)  1 - iOS, 2 - Android, 3 - Windows, 4 - macOS, 5 - Linux
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+        :return: (generator) Devices
+        """
+        url = "/public/v1/getDevices"
+        parameters = []
         if username:
-            url += f'&username={username}'
+            parameters.append(f"username={username}")
         if os_type:
-            url += f'&osType={os_type}'
+            parameters.append(f"osType={os_type}")
+        if parameters:
+            url += f"?{'&'.join(parameters)}"
 
-        response = self._obtain_all(
+        return self._iter_all(
             url=url,
             headers=self.header,
+            page_size=page_size,
         )
 
-        return response
-
     def list_otp(
             self,
             ud_id: int,
@@ -234,6 +366,37 @@ class ClientConnectorTalker(object):
 
         return response.json()
 
+    def bulk_remove_devices(
+            self,
+            ud_ids: list,
+            force: bool = False,
+            username: str = None,
+            client_connector_version: str = None,
+            os_type: int = 0,
+            concurrency: int = 1,
+    ) -> BulkResult:
+        """
+        Method to remove any number of devices, 30 per call
+        :param ud_ids: (list) List of user devices ids
+        :param force: (bool) True to force remove, see force_remove_devices
+        :param username: (str) Username
+        :param client_connector_version: (str) ZCC version
+        :param os_type: (int) 0 ALL OS types, 1 IOS, 2 Android, 3 Windows, 4 macOS, 5 Linux
+        :param concurrency: (int) Maximum number of calls sent at the same time
+        :return: (BulkResult) Device ids removed and ids that failed, with the reason
+        """
+        remove = self.force_remove_devices if force else self.remove_devices
+
+        return BulkExecutor(chunk_size=30, concurrency=concurrency).run(
+            lambda chunk: remove(
+                username=username,
+                client_connector_version=client_connector_version,
+                ud_ids=chunk,
+                os_type=os_type,
+            ),
+            ud_ids,
+        )
+
     def list_download_service_status(
             self,
     ) -> requests.Response.content:
@@ -266,3 +429,12 @@ class ZccTalker(ClientConnectorTalker):
             client_id,
             secret_key,
         )
+
+
+class AsyncClientConnectorTalker(AsyncTalker):
+    """
+    asyncio version of ClientConnectorTalker. Every public ClientConnectorTalker method is available as a coroutine
+    with the same name and parameters.
+    """
+
+    talker_class = ClientConnectorTalker
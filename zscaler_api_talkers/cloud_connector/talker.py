@@ -2,8 +2,16 @@ import json
 import pdb
 import time
 import requests
+from zscaler_api_talkers.helpers.async_calls import AsyncTalker
+from zscaler_api_talkers.helpers.credential_cache import SESSION_TTL, CredentialCache
 from zscaler_api_talkers.helpers.http_calls import HttpCalls
+from zscaler_api_talkers.helpers.journal import MutationJournal
 from zscaler_api_talkers.helpers.logger import setup_logger
+from zscaler_api_talkers.helpers.page_size import ZIA_PAGE_SIZES, PageMeter, PageSizePolicy
+from zscaler_api_talkers.helpers.pagination import iter_pages
+from zscaler_api_talkers.helpers.rate_limiter import ZIA_RATE_LIMITS, RateLimiter
+from zscaler_api_talkers.helpers.retry import RetryPolicy
+from zscaler_api_talkers.helpers.token_manager import TokenManager
 
 from zscaler_api_talkers.zia.helpers import _obfuscate_api_key
 
@@ -22,18 +30,49 @@ class CloudConnectorTalker(object):
         api_key: str = "",
         username: str = "",
         password: str = "",
+        session: requests.Session = None,
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        prefetch: int = 0,
+        page_size_policy: PageSizePolicy = None,
+        credential_cache: CredentialCache = None,
+        journal: MutationJournal = None,
     ):
         """
         Method to start the class
 
         :param cloud_name: (str) Example: zscalerbeta.net, zscalerone.net, zscalertwo.net, zscalerthree.net,
             zscaler.net, zscloud.net
+        :param session: (requests.Session) Optional pooled session shared with other talkers
+        :param rate_limiter: (RateLimiter) Optional scheduler shared with other talkers of the same tenant. Default is
+            a new RateLimiter with ZIA_RATE_LIMITS
+        :param retry_policy: (RetryPolicy) Optional policy to retry throttled and failed calls. Default is a new
+            RetryPolicy, retrying up to 5 times with backoff. RetryPolicy(max_retries=0) sends every call once
+        :param prefetch: (int) Number of pages requested ahead of the current one when listing. Default 0 (serial)
+        :param page_size_policy: (PageSizePolicy) Optional policy choosing the page size of list methods, shared with
+            other talkers. Default is a new PageSizePolicy keeping its measures in memory
+        :param credential_cache: (CredentialCache) Optional cache to reuse the JSESSIONID of this user across
+            talkers and processes
+        :param journal: (MutationJournal) Optional write-ahead journal of the add_*, update_*, delete_* and remove_*
+            calls, to resume interrupted jobs
         """
         self.base_uri = f"https://connector.{cloud_name}/api/v1"
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(ZIA_RATE_LIMITS, name=f"connector.{cloud_name}")
         self.hp_http = HttpCalls(
             host=self.base_uri,
             verify=True,
+            session=session,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy or RetryPolicy(),
         )
+        self.prefetch = prefetch
+        self.tenant = f"connector.{cloud_name}"
+        self.page_size_policy = page_size_policy or PageSizePolicy()
+        self.credential_cache = credential_cache
+        if journal:
+            journal.attach(self)
+        self._username = None
         self.cookies = None
         self.headers = None
         self.authenticate(
@@ -47,13 +86,42 @@ class CloudConnectorTalker(object):
         api_key: str,
         username: str,
         password: str = None,
-    ):   
+    ):
+        """
+        Method to authenticate. With a credential cache, a cached session of this user is reused when still valid.
+        The session is opened again when it times out or is rejected with a 401.
+
+        :param api_key: (str) API key
+        :param username: (str) A string that contains the email ID of the API admin
+        :param password: (str) A string that contains the password for the API admin
+        """
+        self._username = username
+        self.hp_http.token_manager = TokenManager(
+            login=lambda: self._login(api_key, username, password),
+            target=self,
+            attribute="cookies",
+            kwarg="cookies",
+            credential_cache=self.credential_cache,
+            cloud=self.base_uri,
+            user=username,
+            background=False,
+        )
+        self.hp_http.token_manager.refresh()
+
+    def _login(
+        self,
+        api_key: str,
+        username: str,
+        password: str = None,
+    ) -> tuple:
         """
-        Method to authenticate.
+        Internal method to open a new session
 
         :param api_key: (str) API key
         :param username: (str) A string that contains the email ID of the API admin
         :param password: (str) A string that contains the password for the API admin
+
+        :return: (tuple) (cookies, epoch of expiry)
         """
         timestamp, key = _obfuscate_api_key(api_key)
         payload = {
@@ -67,7 +135,8 @@ class CloudConnectorTalker(object):
             url=url,
             payload=payload,
         )
-        self.cookies = {"JSESSIONID": response.cookies["JSESSIONID"]}    
+
+        return {"JSESSIONID": response.cookies["JSESSIONID"]}, time.time() + SESSION_TTL
 
     def authenticated_session(self) -> json:
         """
@@ -97,37 +166,64 @@ class CloudConnectorTalker(object):
             error_handling=True,
             payload={},
         )
+        if self.credential_cache:
+            self.credential_cache.delete(self.base_uri, self._username)
 
         return response.json()         
 
     def _obtain_all(
         self,
         url: str,
+        page_size: int = None,
     ) -> list:
         """
         Internal method that queries all pages
 
-        :param url: (str) URL
+        :param url: (str) URL, without pageSize
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (list) List of results
         """
-        page = 1
-        result = []
-        while True:
-            response = self.hp_http.get_call(
-                url=f"{url}&page={page}",
-                cookies=self.cookies,
-                error_handling=True,
-                headers=self.headers,
-            )
-            if response.json():
-                result += response.json()
-                page += 1
-                time.sleep(1)
-            else:
-                break
+        return list(self._iter_all(url, page_size=page_size))
 
-        return result    
+    def _iter_all(
+        self,
+        url: str,
+        page_size: int = None,
+    ):
+        """
+        Internal generator that queries all pages and yields the records of each page as it arrives
+
+        :param url: (str) URL, without pageSize
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Records
+        """
+        endpoint = url.split("?")[0]
+        max_page_size = ZIA_PAGE_SIZES.get(endpoint, 1000)
+        if page_size is None:
+            page_size = self.page_size_policy.page_size(self.tenant, endpoint, max_page_size)
+        url = f"{url}{'&' if '?' in url else '?'}pageSize={page_size}"
+        meter = PageMeter(self.page_size_policy, self.tenant, endpoint, page_size, max_page_size)
+        pages = iter_pages(
+            meter.wrap(
+                lambda page: self.hp_http.get_call(
+                    url=f"{url}&page={page}",
+                    cookies=self.cookies,
+                    error_handling=True,
+                    headers=self.headers,
+                )
+            ),
+            prefetch=self.prefetch,
+        )
+        try:
+            for page in pages:
+                meter.count(len(page))
+                yield from page
+        except Exception:
+            meter.record(failed=True)
+            raise
+        meter.record()
 
     def get_status(self) -> json:
         """
@@ -165,12 +261,14 @@ class CloudConnectorTalker(object):
         self,
         user_id: int = None,
         query: str = None,
+        page_size: int = None,
     ) -> json:
         """
         Gets a list of admin users. By default, auditor user information is not included.
 
         :param user_id: (int) user ID
         :param query: (str) HTTP query  # TODO: What is this?  Looks like it is just parameters
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (json) JSON of results
         """
@@ -184,11 +282,31 @@ class CloudConnectorTalker(object):
             ).json()
         else:
             if query:
-                url = f"/adminUsers?{query}?pageSize=1000"
+                url = f"/adminUsers?{query}"
             else:
-                url = "/adminUsers?pageSize=1000"
+                url = "/adminUsers"
+
+        return self._obtain_all(url, page_size=page_size)
+
+    def iter_admin_users(
+        self,
+        query: str = None,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_admin_users. Yields admin users page by page as they arrive.
 
-        return self._obtain_all(url)
+        :param query: (str) HTTP query
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Admin users
+        """
+        if query:
+            url = f"/adminUsers?{query}"
+        else:
+            url = "/adminUsers"
+
+        return self._iter_all(url, page_size=page_size)
 
     def add_admin_users(self, loginName: str, userName: str, email: str, password: str, role: dict, comments: str = '',
         adminScopeType: str ='ORGANIZATION',
@@ -475,4 +593,13 @@ class CloudConnectorTalker(object):
             headers=self.headers,               
         )
 
-        return response
\ No newline at end of file
+        return response
+
+
+class AsyncCloudConnectorTalker(AsyncTalker):
+    """
+    asyncio version of CloudConnectorTalker. Every public CloudConnectorTalker method is available as a coroutine
+    with the same name and parameters.
+    """
+
+    talker_class = CloudConnectorTalker
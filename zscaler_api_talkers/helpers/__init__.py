@@ -1,5 +1,43 @@
-from .http_calls import HttpCalls
+from .async_calls import AsyncHttpCalls, AsyncTalker
+from .bulk import BulkExecutor, BulkResult
+from .credential_cache import (
+    CredentialCache,
+    FileCredentialBackend,
+    MemoryCredentialBackend,
+)
+from .diff import VOLATILE_FIELDS, ConfigDiff, DiffEngine, read_export
+from .export import ConfigExporter
+from .http_calls import HttpCalls, new_session
+from .intervals import (
+    BitIndex,
+    IntervalIndex,
+    IntervalMap,
+    IntervalSet,
+    address_range,
+    address_value,
+)
+from .journal import JournaledResponse, MutationJournal
 from .logger import setup_logger
+from .lookup_cache import UrlLookupCache, normalize_url
+from .page_size import (
+    CLIENT_CONNECTOR_PAGE_SIZES,
+    ZIA_PAGE_SIZES,
+    ZPA_PAGE_SIZE,
+    PageSizePolicy,
+)
+from .rate_limiter import (
+    CLIENT_CONNECTOR_HOURLY_LIMITS,
+    CLIENT_CONNECTOR_RATE_LIMITS,
+    ZIA_RATE_LIMITS,
+    ZPA_RATE_LIMITS,
+    MemoryBucketStore,
+    RateLimiter,
+    SqliteBucketStore,
+)
+from .resolver import NameResolver
+from .retry import RetryPolicy
+from .snapshot import SnapshotStore
+from .token_manager import TokenManager
 from .utilities import get_user_agent, request_
 
 __all__ = [
@@ -7,4 +45,42 @@ __all__ = [
     "request_",
     "get_user_agent",
     "HttpCalls",
+    "new_session",
+    "AsyncHttpCalls",
+    "AsyncTalker",
+    "RateLimiter",
+    "RetryPolicy",
+    "MemoryBucketStore",
+    "SqliteBucketStore",
+    "ZIA_RATE_LIMITS",
+    "ZPA_RATE_LIMITS",
+    "CLIENT_CONNECTOR_RATE_LIMITS",
+    "CLIENT_CONNECTOR_HOURLY_LIMITS",
+    "PageSizePolicy",
+    "ZIA_PAGE_SIZES",
+    "ZPA_PAGE_SIZE",
+    "CLIENT_CONNECTOR_PAGE_SIZES",
+    "CredentialCache",
+    "FileCredentialBackend",
+    "MemoryCredentialBackend",
+    "TokenManager",
+    "UrlLookupCache",
+    "normalize_url",
+    "BulkExecutor",
+    "BulkResult",
+    "JournaledResponse",
+    "MutationJournal",
+    "SnapshotStore",
+    "NameResolver",
+    "ConfigExporter",
+    "ConfigDiff",
+    "DiffEngine",
+    "VOLATILE_FIELDS",
+    "read_export",
+    "BitIndex",
+    "IntervalIndex",
+    "IntervalMap",
+    "IntervalSet",
+    "address_range",
+    "address_value",
 ]
@@ -0,0 +1,254 @@
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .http_calls import HttpCalls, new_session
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+
+class AsyncHttpCalls(object):
+    """
+    asyncio front end of HttpCalls. Every call is run by the blocking HttpCalls method on a bounded thread pool, so
+    error_handling and the Zscaler HTTP code mapping behave exactly as in the sync API while one event loop awaits
+    many calls at once.
+    """
+
+    def __init__(
+        self,
+        host: str = None,
+        header: dict = None,
+        verify: bool = True,
+        http: HttpCalls = None,
+        max_concurrency: int = 10,
+        session: requests.Session = None,
+    ):
+        """
+        :param host: (str) IP address or fqdn. Ignored when http is given
+        :param header: (dict) HTTP header. Ignored when http is given
+        :param verify: (bool) True to verify ssl cert with in HTTP call. Ignored when http is given
+        :param http: (HttpCalls) Existing HttpCalls to run calls with
+        :param max_concurrency: (int) Maximum number of calls in flight at the same time
+        :param session: (requests.Session) Existing session to share its connection pool
+        """
+        if http is None:
+            if session is None:
+                session = new_session(
+                    pool_connections=max_concurrency,
+                    pool_maxsize=max_concurrency,
+                )
+            http = HttpCalls(
+                host=host,
+                header=header,
+                verify=verify,
+                session=session,
+            )
+        self.http = http
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    async def run(
+        self,
+        func,
+        *args,
+        **kwargs,
+    ):
+        """
+        Method to run a blocking callable on the thread pool of this instance
+
+        :param func: (callable) Blocking callable
+        :param args: Positional arguments of func
+        :param kwargs: Keyword arguments of func
+
+        :return: Whatever func returns
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(func, *args, **kwargs),
+        )
+
+    async def get_call(
+        self,
+        url: str,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Method to perform a GET HTTP call. Takes the same parameters as HttpCalls.get_call
+
+        :return: (requests.Response Object)
+        """
+        return await self.run(self.http.get_call, url, **kwargs)
+
+    async def post_call(
+        self,
+        url: str,
+        payload: dict,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Method to perform an HTTP POST call. Takes the same parameters as HttpCalls.post_call
+
+        :return: (requests.Response Object)
+        """
+        return await self.run(self.http.post_call, url, payload, **kwargs)
+
+    async def patch_call(
+        self,
+        url: str,
+        payload: dict,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Method to perform an HTTP PATCH call. Takes the same parameters as HttpCalls.patch_call
+
+        :return: (requests.Response Object)
+        """
+        return await self.run(self.http.patch_call, url, payload, **kwargs)
+
+    async def put_call(
+        self,
+        url: str,
+        payload: dict,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Method to perform an HTTP PUT call. Takes the same parameters as HttpCalls.put_call
+
+        :return: (requests.Response Object)
+        """
+        return await self.run(self.http.put_call, url, payload, **kwargs)
+
+    async def delete_call(
+        self,
+        url: str,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Method to perform an HTTP DELETE call. Takes the same parameters as HttpCalls.delete_call
+
+        :return: (requests.Response Object)
+        """
+        return await self.run(self.http.delete_call, url, **kwargs)
+
+    def close(self):
+        """
+        Method to stop the thread pool and close the pooled connections
+        """
+        self._executor.shutdown(wait=False)
+        self.http.close()
+
+
+class AsyncTalker(object):
+    """
+    Base class of the async talkers. It builds the sync talker given by talker_class and exposes each of its public
+    methods as a coroutine with the same name and parameters, run on a shared AsyncHttpCalls. The iter_* generators
+    are exposed as async generators: records are pulled from the sync generator on the thread pool, iter_chunk_size
+    at a time, so the page fetches never block the event loop.
+    """
+
+    talker_class = None
+
+    def __init__(
+        self,
+        *args,
+        max_concurrency: int = 10,
+        iter_chunk_size: int = 100,
+        **kwargs,
+    ):
+        """
+        Takes the same parameters as talker_class, plus:
+
+        :param max_concurrency: (int) Maximum number of calls in flight at the same time for this talker
+        :param iter_chunk_size: (int) Maximum number of records an iter_* async generator pulls per thread pool call
+        """
+        self.iter_chunk_size = iter_chunk_size
+        if kwargs.get("session") is None:
+            kwargs["session"] = new_session(
+                pool_connections=max_concurrency,
+                pool_maxsize=max_concurrency,
+            )
+        self.talker = self.talker_class(*args, **kwargs)
+        self.hp_http = AsyncHttpCalls(
+            http=self.talker.hp_http,
+            max_concurrency=max_concurrency,
+        )
+
+    @classmethod
+    async def create(
+        cls,
+        *args,
+        **kwargs,
+    ):
+        """
+        Method to build the talker without blocking the event loop while it authenticates. Takes the same parameters
+        as the constructor.
+
+        :return: (AsyncTalker)
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            functools.partial(cls, *args, **kwargs),
+        )
+
+    def __getattr__(
+        self,
+        name: str,
+    ):
+        if name == "talker":
+            raise AttributeError(name)
+        attribute = getattr(self.talker, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+        if name.startswith("iter_"):
+            return self._async_generator(attribute)
+
+        @functools.wraps(attribute)
+        async def method(*args, **kwargs):
+            return await self.hp_http.run(attribute, *args, **kwargs)
+
+        return method
+
+    def _async_generator(
+        self,
+        attribute,
+    ):
+        """
+        Internal method to expose a generator method of the sync talker as an async generator
+        """
+
+        @functools.wraps(attribute)
+        async def method(*args, **kwargs):
+            iterator = iter(await self.hp_http.run(attribute, *args, **kwargs))
+            try:
+                while True:
+                    chunk = await self.hp_http.run(list, itertools.islice(iterator, self.iter_chunk_size))
+                    if not chunk:
+                        return
+                    for record in chunk:
+                        yield record
+            finally:
+                # Stops the pages still requested when the caller leaves the loop early
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    try:
+                        await self.hp_http.run(close)
+                    except ValueError:
+                        # Still running in a worker thread after a cancellation, it stops at its next record
+                        logger.debug(f"{attribute.__name__} could not be closed while running")
+
+        return method
+
+    def __dir__(self):
+        return sorted(set(dir(type(self)) + list(self.__dict__) + dir(self.talker)))
+
+    def close(self):
+        """
+        Method to stop the thread pool and close the pooled connections
+        """
+        self.hp_http.close()
@@ -0,0 +1,127 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+
+class BulkResult(object):
+    """
+    Outcome of a bulk mutation, per ID
+    """
+
+    def __init__(self):
+        self.succeeded = []
+        self.failed = {}
+        self.responses = []
+        self._lock = threading.Lock()
+
+    @property
+    def ok(self) -> bool:
+        """
+        True when every ID succeeded
+        """
+        return not self.failed
+
+    def add(
+        self,
+        succeeded: list,
+        failed: dict,
+        response: object = None,
+    ):
+        """
+        Method to merge the outcome of a chunk
+
+        :param succeeded: (list) IDs that succeeded
+        :param failed: (dict) id: reason, for the IDs that failed
+        :param response: (json) Response of the chunk call, if any
+        """
+        with self._lock:
+            self.succeeded.extend(succeeded)
+            self.failed.update(failed)
+            if response is not None:
+                self.responses.append(response)
+
+    def __repr__(self) -> str:
+        return f"BulkResult(succeeded={len(self.succeeded)}, failed={len(self.failed)})"
+
+
+class BulkExecutor(object):
+    """
+    Runs a bulk API call on inputs of any size: the IDs are split in chunks of the largest size the API accepts and
+    the chunks are sent with bounded concurrency. Calls still go through the rate limiter of the talker, so the
+    executor never sends faster than the endpoint allows. A failing chunk does not stop the others.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        concurrency: int = 1,
+    ):
+        """
+        :param chunk_size: (int) Maximum number of IDs the API accepts per call
+        :param concurrency: (int) Maximum number of chunks sent at the same time
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.chunk_size = chunk_size
+        self.concurrency = max(concurrency, 1)
+
+    def chunks(
+        self,
+        ids: list,
+    ) -> list:
+        """
+        Method to split IDs in chunks of at most chunk_size, duplicates removed
+
+        :param ids: (list) IDs
+
+        :return: (list) List of lists of IDs
+        """
+        ids = list(dict.fromkeys(ids))
+
+        return [ids[i : i + self.chunk_size] for i in range(0, len(ids), self.chunk_size)]
+
+    def run(
+        self,
+        call,
+        ids: list,
+        succeeded=None,
+    ) -> BulkResult:
+        """
+        Method to run a bulk call on all the IDs
+
+        :param call: (callable) Called with a chunk of IDs, returns the JSON response of the API
+        :param ids: (list) IDs
+        :param succeeded: (callable) Optional, called with (chunk, response), returns the IDs of the chunk that
+            succeeded. By default every ID of a chunk whose call did not raise succeeded
+
+        :return: (BulkResult)
+        """
+        result = BulkResult()
+
+        def run_chunk(chunk):
+            try:
+                response = call(chunk)
+            except Exception as e:
+                logger.warning(f"Bulk call failed for {len(chunk)} IDs: {e}")
+                result.add([], {item: str(e) for item in chunk})
+                return
+            done = list(succeeded(chunk, response)) if succeeded else list(chunk)
+            done_set = set(done)
+            result.add(
+                done,
+                {item: "Not reported as done by the API" for item in chunk if item not in done_set},
+                response,
+            )
+
+        chunks = self.chunks(ids)
+        if self.concurrency == 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                run_chunk(chunk)
+        else:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                list(executor.map(run_chunk, chunks))
+
+        return result
@@ -0,0 +1,272 @@
+import base64
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import appdirs
+
+from .logger import setup_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = setup_logger(name=__name__)
+
+# ZIA and Cloud Connector do not tell when a JSESSIONID expires. Sessions time out after 30 minutes of inactivity, so
+# cached ones are given 30 minutes from login.
+SESSION_TTL = 1800
+
+
+def jwt_expiry(
+    token: str,
+) -> float:
+    """
+    Method to read the expiry of a JWT without verifying it
+
+    :param token: (str) JWT, with or without the "Bearer " prefix
+
+    :return: (float) Epoch of the exp claim, or None if the token has none
+    """
+    try:
+        payload = token.split()[-1].split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class MemoryCredentialBackend(object):
+    """
+    Credentials kept in memory. Shared by the talkers of the process that use it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._state = {}
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager that yields the credentials, a dict of key: entry, under an exclusive lock
+        """
+        with self._lock:
+            yield self._state
+
+
+class FileCredentialBackend(object):
+    """
+    Credentials kept in a JSON file readable by its owner only, so processes of the same user share sessions and
+    tokens. An exclusive lock on a companion .lock file serializes the processes.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+    ):
+        """
+        :param path: (str) Path of the JSON file. Default is credentials.json in the user cache directory
+        """
+        if not path:
+            path = os.path.join(appdirs.user_cache_dir("zscaler_api_talkers"), "credentials.json")
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+
+    @contextmanager
+    def _file_lock(self):
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            os.close(fd)
+
+    def _read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable credential cache {self.path}: {e}")
+            return {}
+
+    def _write(
+        self,
+        state: dict,
+    ):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager that yields the credentials, a dict of key: entry, under an exclusive lock shared by threads
+        and processes. Changes are written back when the context exits.
+        """
+        with self._lock, self._file_lock():
+            state = self._read()
+            before = json.dumps(state, sort_keys=True)
+            yield state
+            if json.dumps(state, sort_keys=True) != before:
+                self._write(state)
+
+
+class CredentialCache(object):
+    """
+    Cache of sessions and tokens keyed by cloud and user. An entry is served only while it has more than margin
+    seconds left before its expiry. When it has to log in, the cache keeps its backend locked so concurrent threads
+    and processes wait for that login instead of starting their own.
+
+    The backend is any object with a transaction() context manager yielding a dict that is saved when the context
+    exits, such as MemoryCredentialBackend and FileCredentialBackend.
+    """
+
+    def __init__(
+        self,
+        backend: object = None,
+        margin: float = 60,
+    ):
+        """
+        :param backend: (MemoryCredentialBackend|FileCredentialBackend) Where credentials are kept. Default is a
+            FileCredentialBackend in the user cache directory
+        :param margin: (float) Seconds before expiry from which an entry is no longer served
+        """
+        self.backend = backend or FileCredentialBackend()
+        self.margin = margin
+
+    @staticmethod
+    def _key(
+        cloud: str,
+        user: str,
+    ) -> str:
+        return f"{cloud}|{user}"
+
+    def _valid(
+        self,
+        entry: dict,
+    ) -> bool:
+        return bool(entry) and entry.get("expires_at", 0) - self.margin > time.time()
+
+    def get(
+        self,
+        cloud: str,
+        user: str,
+    ) -> dict:
+        """
+        Method to get a cached credential
+
+        :param cloud: (str) API base url
+        :param user: (str) Username, API key id or client id
+
+        :return: (dict) Credential, or None if there is no valid entry
+        """
+        with self.backend.transaction() as state:
+            entry = state.get(self._key(cloud, user))
+            if not self._valid(entry):
+                return None
+
+        return entry["credential"]
+
+    def set(
+        self,
+        cloud: str,
+        user: str,
+        credential: dict,
+        expires_at: float,
+    ):
+        """
+        Method to cache a credential
+
+        :param cloud: (str) API base url
+        :param user: (str) Username, API key id or client id
+        :param credential: (dict) Cookies or headers to send with each call
+        :param expires_at: (float) Epoch from which the credential is no longer valid
+        """
+        with self.backend.transaction() as state:
+            state[self._key(cloud, user)] = {
+                "credential": credential,
+                "expires_at": expires_at,
+            }
+
+    def delete(
+        self,
+        cloud: str,
+        user: str,
+    ):
+        """
+        Method to forget a credential, e.g. after ending its session
+
+        :param cloud: (str) API base url
+        :param user: (str) Username, API key id or client id
+        """
+        with self.backend.transaction() as state:
+            state.pop(self._key(cloud, user), None)
+
+    def get_or_login(
+        self,
+        cloud: str,
+        user: str,
+        login,
+    ) -> dict:
+        """
+        Method to get a valid credential, logging in only if the cache has none
+
+        :param cloud: (str) API base url
+        :param user: (str) Username, API key id or client id
+        :param login: (callable) Called without parameters, returns (credential, expires_at)
+
+        :return: (dict) Credential
+        """
+        credential, _ = self.login(cloud, user, login)
+
+        return credential
+
+    def login(
+        self,
+        cloud: str,
+        user: str,
+        login,
+        stale: dict = None,
+    ) -> tuple:
+        """
+        Method to get a valid credential and its expiry, logging in only if the cache has none other than stale
+
+        :param cloud: (str) API base url
+        :param user: (str) Username, API key id or client id
+        :param login: (callable) Called without parameters, returns (credential, expires_at)
+        :param stale: (dict) Credential rejected by the API, never served even if it has not expired
+
+        :return: (tuple) (credential, expires_at)
+        """
+        key = self._key(cloud, user)
+        with self.backend.transaction() as state:
+            entry = state.get(key)
+            if self._valid(entry) and entry["credential"] != stale:
+                logger.debug(f"Reusing cached credential of {user} on {cloud}")
+                return entry["credential"], entry["expires_at"]
+            credential, expires_at = login()
+            state[key] = {
+                "credential": credential,
+                "expires_at": expires_at,
+            }
+            # Purge expired entries so the cache does not keep dead sessions
+            for other_key in [k for k, v in state.items() if v.get("expires_at", 0) <= time.time()]:
+                del state[other_key]
+
+        return credential, expires_at
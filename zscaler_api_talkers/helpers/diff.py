@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+# Fields that change without a configuration change, ignored by default
+VOLATILE_FIELDS = (
+    "lastModifiedTime",
+    "lastModifiedBy",
+    "modifiedTime",
+    "modifiedBy",
+    "creationTime",
+    "createdTime",
+    "lastModifiedTimestamp",
+    "lastSyncStartTime",
+    "lastSyncEndTime",
+    "lastBrokerConnectTime",
+    "lastBrokerDisconnectTime",
+    "lastUpgradeTime",
+    "upgradeAttempt",
+    "currentVersion",
+    "expectedVersion",
+    "runtimeOS",
+    "privateIp",
+    "publicIp",
+    "ctrlBrokerName",
+    "applicationStartTime",
+)
+
+
+def _canonical(
+    value,
+    ignore: frozenset,
+    ordered_lists: bool,
+):
+    """
+    Internal method to bring a record to a canonical form: ignored fields removed at any depth and, unless
+    ordered_lists, list items sorted, so that equal configurations give equal JSON
+
+    :param value: (json) Record or part of it
+    :param ignore: (frozenset) Field names to remove
+    :param ordered_lists: (bool) True if the order of list items matters
+
+    :return: (json) Canonical value
+    """
+    if isinstance(value, dict):
+        # Keys in order, so that the repr of equal records is equal too
+        return {k: _canonical(value[k], ignore, ordered_lists) for k in sorted(value) if k not in ignore}
+    if isinstance(value, list):
+        items = [_canonical(item, ignore, ordered_lists) for item in value]
+        if not ordered_lists and len(items) > 1:
+            items.sort(key=repr)
+        return items
+
+    return value
+
+
+def _changes(
+    old,
+    new,
+    path: str = "",
+) -> dict:
+    """
+    Internal method to list the paths that differ between two canonical records
+
+    :return: (dict) path: (old value, new value). Missing values are None
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = {}
+        for key in sorted(set(old) | set(new), key=str):
+            if old.get(key) != new.get(key):
+                changes.update(_changes(old.get(key), new.get(key), f"{path}.{key}" if path else str(key)))
+        return changes
+
+    return {path: (old, new)}
+
+
+def read_export(
+    directory: str,
+) -> dict:
+    """
+    Method to open an export written by export_all. Collections are read lazily, file by file.
+
+    :param directory: (str) Export directory
+
+    :return: (dict) Collection name: callable returning a generator of its records
+    """
+
+    def reader(path: str):
+        def read():
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+        return read
+
+    return {
+        name[: -len(".ndjson")]: reader(os.path.join(directory, name))
+        for name in sorted(os.listdir(directory))
+        if name.endswith(".ndjson")
+    }
+
+
+class ConfigDiff(object):
+    """
+    Structural difference between two configurations, per collection: keys of the added and removed records, and the
+    changed paths of the records found on both sides
+    """
+
+    def __init__(self):
+        self.collections = {}
+
+    def add(
+        self,
+        collection: str,
+        added: dict,
+        removed: dict,
+        changed: dict,
+    ):
+        """
+        :param collection: (str) Collection name
+        :param added: (dict) key: record, records of the new configuration only
+        :param removed: (dict) key: record, records of the old configuration only
+        :param changed: (dict) key: {path: (old value, new value)}
+        """
+        if added or removed or changed:
+            self.collections[collection] = {"added": added, "removed": removed, "changed": changed}
+
+    @property
+    def is_empty(self) -> bool:
+        """
+        True when both configurations are the same
+        """
+        return not self.collections
+
+    def summary(self) -> dict:
+        """
+        :return: (dict) Collection: {"added": count, "removed": count, "changed": count}
+        """
+        return {
+            collection: {kind: len(entries) for kind, entries in diff.items()}
+            for collection, diff in self.collections.items()
+        }
+
+    def __repr__(self) -> str:
+        return f"ConfigDiff({self.summary()})"
+
+
+class DiffEngine(object):
+    """
+    Compares two configurations, e.g. two exports of the same tenant at different times, or of two tenants. Records
+    are matched by key, id by default or name across tenants, and compared through a hash of their canonical JSON,
+    so the cost is linear in the number of records. Only the records whose hash differs are compared field by field.
+    """
+
+    def __init__(
+        self,
+        key: str = "id",
+        keys: dict = None,
+        ignore_fields: tuple = VOLATILE_FIELDS,
+        ignore: dict = None,
+        ordered_lists: bool = False,
+    ):
+        """
+        :param key: (str) Field records are matched by. A tuple means the first field present, e.g.
+            ("configuredName", "name", "id")
+        :param keys: (dict) Optional collection: key field, overriding key
+        :param ignore_fields: (tuple) Fields ignored in every collection, at any depth
+        :param ignore: (dict) Optional collection: tuple of fields also ignored in that collection
+        :param ordered_lists: (bool) True if the order of list items is significant. By default [a, b] equals [b, a]
+        """
+        self.key = key
+        self.keys = keys or {}
+        self.ignore_fields = frozenset(ignore_fields)
+        self.ignore = {
+            collection: frozenset(fields) | self.ignore_fields for collection, fields in (ignore or {}).items()
+        }
+        self.ordered_lists = ordered_lists
+
+    @staticmethod
+    def _records(
+        source,
+    ):
+        return source() if callable(source) else source
+
+    def _key_of(
+        self,
+        record: dict,
+        key,
+    ):
+        if isinstance(key, tuple):
+            for field in key:
+                if record.get(field) is not None:
+                    return record[field]
+            return None
+
+        return record.get(key)
+
+    def _digests(
+        self,
+        collection: str,
+        source,
+    ) -> dict:
+        """
+        Internal method to hash the records of a collection
+
+        :return: (dict) key: digest. Records sharing a key are told apart by their rank, e.g. ("name", 2)
+        """
+        key_field = self.keys.get(collection, self.key)
+        ignore = self.ignore.get(collection, self.ignore_fields)
+        digests = {}
+        for record in self._records(source):
+            canonical = _canonical(record, ignore, self.ordered_lists)
+            key = self._key_of(record, key_field)
+            if key in digests or (key, 2) in digests:
+                rank = 2
+                while (key, rank) in digests:
+                    rank += 1
+                key = (key, rank)
+            digests[key] = hashlib.blake2b(
+                repr(canonical).encode(),
+                digest_size=16,
+            ).digest()
+
+        return digests
+
+    def _pick(
+        self,
+        collection: str,
+        source,
+        wanted: set,
+    ) -> dict:
+        """
+        Internal method to read again the records of some keys
+
+        :return: (dict) key: canonical record
+        """
+        key_field = self.keys.get(collection, self.key)
+        ignore = self.ignore.get(collection, self.ignore_fields)
+        picked = {}
+        seen = set()
+        for record in self._records(source):
+            key = self._key_of(record, key_field)
+            if key in seen:
+                rank = 2
+                while (key, rank) in seen:
+                    rank += 1
+                key = (key, rank)
+            seen.add(key)
+            if key in wanted:
+                picked[key] = _canonical(record, ignore, self.ordered_lists)
+
+        return picked
+
+    def diff(
+        self,
+        old: dict,
+        new: dict,
+    ) -> ConfigDiff:
+        """
+        Method to compare two configurations
+
+        :param old: (dict) Collection name: records, as a list or a callable returning an iterable, e.g. the result
+            of read_export
+        :param new: (dict) Same as old
+
+        :return: (ConfigDiff)
+        """
+        result = ConfigDiff()
+        for collection in sorted(set(old) | set(new)):
+            old_source = old.get(collection, [])
+            new_source = new.get(collection, [])
+            old_digests = self._digests(collection, old_source)
+            new_digests = self._digests(collection, new_source)
+            added_keys = new_digests.keys() - old_digests.keys()
+            removed_keys = old_digests.keys() - new_digests.keys()
+            changed_keys = {
+                key for key in old_digests.keys() & new_digests.keys() if old_digests[key] != new_digests[key]
+            }
+            if not (added_keys or removed_keys or changed_keys):
+                continue
+            old_records = self._pick(collection, old_source, removed_keys | changed_keys)
+            new_records = self._pick(collection, new_source, added_keys | changed_keys)
+            result.add(
+                collection,
+                added={key: new_records[key] for key in added_keys},
+                removed={key: old_records[key] for key in removed_keys},
+                changed={key: _changes(old_records[key], new_records[key]) for key in changed_keys},
+            )
+            logger.debug(
+                f"{collection}: {len(added_keys)} added, {len(removed_keys)} removed, {len(changed_keys)} changed"
+            )
+
+        return result
+
+    def diff_exports(
+        self,
+        old_directory: str,
+        new_directory: str,
+    ) -> ConfigDiff:
+        """
+        Method to compare two exports written by export_all
+
+        :param old_directory: (str) Export directory of the old configuration
+        :param new_directory: (str) Export directory of the new configuration
+
+        :return: (ConfigDiff)
+        """
+        return self.diff(read_export(old_directory), read_export(new_directory))
@@ -0,0 +1,285 @@
+EXACT = "exact"
+# "*.example.com", the subdomains of example.com only
+WILDCARD = "wildcard"
+# ".example.com", example.com and its subdomains, as in ZIA
+DOT = "dot"
+
+
+def parse_domain(
+    domain: str,
+) -> tuple:
+    """
+    Method to split a domain pattern into its reversed labels and kind
+
+    :param domain: (str) e.g. "www.example.com", "*.example.com" or ".example.com"
+
+    :return: (tuple) (labels, kind), e.g. (("com", "example"), "wildcard")
+    """
+    domain = domain.strip().lower().rstrip(".")
+    if domain.startswith("*."):
+        kind, domain = WILDCARD, domain[2:]
+    elif domain.startswith("."):
+        kind, domain = DOT, domain[1:]
+    else:
+        kind = EXACT
+
+    return tuple(reversed(domain.split("."))), kind
+
+
+def covers(
+    pattern: str,
+    other: str,
+) -> bool:
+    """
+    Method to tell if a domain pattern matches all that another one matches
+
+    :param pattern: (str) Domain pattern, e.g. "*.example.com"
+    :param other: (str) Domain pattern, e.g. "www.example.com"
+
+    :return: (bool) True if pattern covers other, including when they are the same
+    """
+    labels, kind = parse_domain(pattern)
+    other_labels, other_kind = parse_domain(other)
+    if other_labels[: len(labels)] != labels:
+        return False
+    if len(other_labels) > len(labels):
+        return kind != EXACT
+
+    return len(other_labels) == len(labels) and (kind == other_kind or kind == DOT)
+
+
+class _Node(object):
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children = {}
+        # kind: list of values
+        self.entries = None
+
+
+class DomainTrie(object):
+    """
+    Trie of domain patterns on their reversed labels, com -> example -> www, each node holding the values of the
+    exact, wildcard and dot patterns of its domain. Finding the patterns matching a host walks one node per label,
+    whatever the number of patterns, and the deepest match is the most specific one. Values are kept in insertion
+    order and a pattern can hold several values.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(
+        self,
+        domain: str,
+        value,
+    ):
+        """
+        :param domain: (str) Domain pattern, e.g. "www.example.com", "*.example.com" or ".example.com"
+        :param value: Value stored with the pattern, e.g. the ID of an application segment
+        """
+        labels, kind = parse_domain(domain)
+        node = self._root
+        for label in labels:
+            node = node.children.setdefault(label, _Node())
+        if node.entries is None:
+            node.entries = {}
+        node.entries.setdefault(kind, []).append(value)
+        self._count += 1
+
+    def remove(
+        self,
+        domain: str,
+        value,
+    ) -> bool:
+        """
+        Method to remove a value of a pattern, and the nodes left empty
+
+        :param domain: (str) Domain pattern
+        :param value: Value stored with the pattern
+
+        :return: (bool) False if the pattern did not hold the value
+        """
+        labels, kind = parse_domain(domain)
+        path = [self._root]
+        for label in labels:
+            node = path[-1].children.get(label)
+            if node is None:
+                return False
+            path.append(node)
+        node = path[-1]
+        values = (node.entries or {}).get(kind)
+        if not values or value not in values:
+            return False
+        values.remove(value)
+        if not values:
+            del node.entries[kind]
+            if not node.entries:
+                node.entries = None
+        self._count -= 1
+        for depth in range(len(labels), 0, -1):
+            node = path[depth]
+            if node.children or node.entries:
+                break
+            del path[depth - 1].children[labels[depth - 1]]
+
+        return True
+
+    @staticmethod
+    def _pattern(
+        labels: tuple,
+        kind: str,
+    ) -> str:
+        domain = ".".join(reversed(labels))
+
+        return {EXACT: domain, WILDCARD: f"*.{domain}", DOT: f".{domain}"}[kind]
+
+    def _values(
+        self,
+        node: _Node,
+        labels: tuple,
+        kinds: tuple,
+    ) -> list:
+        return [(self._pattern(labels, kind), value) for kind in kinds for value in node.entries.get(kind, ())]
+
+    def lookup(
+        self,
+        host: str,
+    ) -> list:
+        """
+        Method to find the patterns matching a host
+
+        :param host: (str) Host name, e.g. "www.example.com"
+
+        :return: (list) (pattern, value), the most specific first: exact patterns, then the wildcards of the closest
+            parent domain
+        """
+        labels = parse_domain(host)[0]
+        node = self._root
+        found = []
+        for depth, label in enumerate(labels, start=1):
+            node = node.children.get(label)
+            if node is None:
+                break
+            if not node.entries:
+                continue
+            kinds = (EXACT, DOT) if depth == len(labels) else (WILDCARD, DOT)
+            found.append(self._values(node, labels[:depth], kinds))
+
+        return [match for matches in reversed(found) for match in matches]
+
+    def best(
+        self,
+        host: str,
+    ) -> list:
+        """
+        Method to find the values of the most specific pattern matching a host
+
+        :param host: (str) Host name
+
+        :return: (list) (pattern, value) of the most specific pattern, several if it holds several values
+        """
+        found = self.lookup(host)
+        if not found:
+            return []
+        pattern = found[0][0]
+
+        return [(matched, value) for matched, value in found if matched == pattern]
+
+    def exact(
+        self,
+        domain: str,
+    ) -> list:
+        """
+        Method to get the values of one pattern
+
+        :param domain: (str) Domain pattern, e.g. "*.example.com"
+
+        :return: (list) Values
+        """
+        labels, kind = parse_domain(domain)
+        node = self._root
+        for label in labels:
+            node = node.children.get(label)
+            if node is None:
+                return []
+
+        return list((node.entries or {}).get(kind, ()))
+
+    def covering(
+        self,
+        domain: str,
+    ) -> list:
+        """
+        Method to find the broader patterns covering all that a pattern matches, e.g. "*.example.com" covers
+        "www.example.com" and "*.www.example.com". The pattern itself is not included.
+
+        :param domain: (str) Domain pattern
+
+        :return: (list) (pattern, value), the closest first
+        """
+        labels, kind = parse_domain(domain)
+        node = self._root
+        found = []
+        for depth, label in enumerate(labels, start=1):
+            node = node.children.get(label)
+            if node is None:
+                break
+            if not node.entries:
+                continue
+            if depth < len(labels):
+                kinds = (DOT, WILDCARD)
+            else:
+                # On the same domain, only a dot pattern covers an exact or wildcard pattern
+                kinds = () if kind == DOT else (DOT,)
+            found.append(self._values(node, labels[:depth], kinds))
+
+        return [match for matches in reversed(found) for match in matches]
+
+    def under(
+        self,
+        domain: str,
+    ) -> list:
+        """
+        Method to find the patterns at or below a domain, e.g. the patterns a wildcard may overlap
+
+        :param domain: (str) Domain, e.g. "example.com". A wildcard or dot prefix is ignored
+
+        :return: (list) (pattern, value)
+        """
+        labels = parse_domain(domain)[0]
+        node = self._root
+        for label in labels:
+            node = node.children.get(label)
+            if node is None:
+                return []
+        found = []
+        stack = [(labels, node)]
+        while stack:
+            node_labels, node = stack.pop()
+            for kind, values in (node.entries or {}).items():
+                pattern = self._pattern(node_labels, kind)
+                found.extend((pattern, value) for value in values)
+            for label, child in node.children.items():
+                stack.append((node_labels + (label,), child))
+
+        return found
+
+    def items(self):
+        """
+        Generator of all the patterns and their values
+
+        :return: (generator) (pattern, value)
+        """
+        stack = [((), self._root)]
+        while stack:
+            labels, node = stack.pop()
+            for kind, values in (node.entries or {}).items():
+                pattern = self._pattern(labels, kind)
+                for value in values:
+                    yield pattern, value
+            for label, child in node.children.items():
+                stack.append((labels + (label,), child))
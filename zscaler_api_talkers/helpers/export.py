@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+
+def _records(
+    result,
+):
+    if result is None:
+        return []
+    if isinstance(result, dict):
+        return [result]
+
+    return result
+
+
+class ConfigExporter(object):
+    """
+    Exports tenant collections to a directory, one NDJSON file per collection written as the records arrive, plus a
+    manifest.json with the count, duration and error of each collection. Collections are fetched at the same time,
+    the rate limiter of the talker keeping the calls within the quotas. Fan-out collections, fetched once per record
+    of a parent collection such as the sub-locations of each location, are fetched once their parent is written, the
+    calls for each parent record running at the same time as well.
+
+    A file is only moved in place once its collection is complete, so a failed collection never leaves a truncated
+    file behind.
+    """
+
+    def __init__(
+        self,
+        collections: dict,
+        fan_outs: dict = None,
+        concurrency: int = 8,
+    ):
+        """
+        :param collections: (dict) Collection name: callable returning its records, a list or a generator
+        :param fan_outs: (dict) Optional collection name: (parent collection name, callable taking the id of a parent
+            record and returning records)
+        :param concurrency: (int) Maximum number of calls in flight
+        """
+        self.collections = collections
+        self.fan_outs = fan_outs or {}
+        self.concurrency = max(concurrency, 1)
+        self._parent_ids = {}
+        self._lock = threading.Lock()
+
+    def _write(
+        self,
+        directory: str,
+        name: str,
+        records,
+    ) -> dict:
+        """
+        Internal method to write a collection
+
+        :param directory: (str) Export directory
+        :param name: (str) Collection name
+        :param records: (iterable) Records
+
+        :return: (dict) Manifest entry
+        """
+        started = time.time()
+        path = os.path.join(directory, f"{name}.ndjson")
+        tmp_path = f"{path}.tmp"
+        count = 0
+        keep_ids = any(parent == name for parent, _ in self.fan_outs.values())
+        ids = []
+        try:
+            with open(tmp_path, "w") as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(",", ":")))
+                    f.write("\n")
+                    count += 1
+                    if keep_ids and isinstance(record, dict) and "id" in record:
+                        ids.append(record["id"])
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Export of {name} failed after {count} records: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return {"error": str(e), "seconds": round(time.time() - started, 3)}
+        if keep_ids:
+            with self._lock:
+                self._parent_ids[name] = ids
+        logger.debug(f"Exported {count} {name}")
+
+        return {"file": f"{name}.ndjson", "count": count, "seconds": round(time.time() - started, 3)}
+
+    def _fetch(
+        self,
+        name: str,
+    ):
+        for record in _records(self.collections[name]()):
+            yield record
+
+    def _fan_out(
+        self,
+        executor: ThreadPoolExecutor,
+        fetch,
+        parent_ids: list,
+    ):
+        for records in executor.map(lambda parent_id: list(_records(fetch(parent_id))), parent_ids):
+            yield from records
+
+    def export(
+        self,
+        directory: str,
+    ) -> dict:
+        """
+        Method to export all the collections
+
+        :param directory: (str) Export directory, created if missing
+
+        :return: (dict) Manifest, also written to manifest.json
+        """
+        os.makedirs(directory, exist_ok=True)
+        started = time.time()
+        manifest = {"started_at": started, "collections": {}}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {
+                name: executor.submit(self._write, directory, name, self._fetch(name)) for name in self.collections
+            }
+            for name, future in futures.items():
+                manifest["collections"][name] = future.result()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for name, (parent, fetch) in self.fan_outs.items():
+                if parent not in self._parent_ids:
+                    manifest["collections"][name] = {"error": f"Parent collection {parent} was not exported"}
+                    continue
+                manifest["collections"][name] = self._write(
+                    directory,
+                    name,
+                    self._fan_out(executor, fetch, self._parent_ids[parent]),
+                )
+        manifest["seconds"] = round(time.time() - started, 3)
+        manifest["errors"] = sorted(name for name, entry in manifest["collections"].items() if "error" in entry)
+        with open(os.path.join(directory, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        logger.info(
+            f"Exported {len(manifest['collections'])} collections to {directory} in {manifest['seconds']} seconds, "
+            f"{len(manifest['errors'])} errors"
+        )
+
+        return manifest
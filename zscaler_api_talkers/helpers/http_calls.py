@@ -1,10 +1,46 @@
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
 
 from .logger import setup_logger
 
 logger = setup_logger(name=__name__)
 
 
+def new_session(
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    pool_block: bool = False,
+    keep_alive: bool = True,
+) -> requests.Session:
+    """
+    Build a requests.Session with a pooled HTTPAdapter. The same session can be handed to several HttpCalls (and
+    therefore several talkers) so that they all reuse the same TCP+TLS connections.
+
+    :param pool_connections: (int) Number of per-host connection pools to cache
+    :param pool_maxsize: (int) Maximum number of connections kept open per host
+    :param pool_block: (bool) When True, never open more than pool_maxsize connections per host; callers wait for a
+        free connection instead
+    :param keep_alive: (bool) When False, send "Connection: close" so every call uses a fresh connection
+
+    :return: (requests.Session Object)
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers.update({"Connection": "close"})
+
+    return session
+
+
 def _zia_http_codes(response: requests.Response):
     """
     Internal method to display HTTP error handling and response codes. For more information, please refer to
@@ -51,6 +87,14 @@ class HttpCalls(object):
         host: str,
         header: dict = None,
         verify: bool = True,
+        session: requests.Session = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        rate_limiter: object = None,
+        retry_policy: object = None,
+        token_manager: object = None,
     ):
         """
         to start this instance, host IP address or fqdn is required
@@ -58,14 +102,115 @@ class HttpCalls(object):
         :param host: (str) IP address or fqdn
         :param header: (dict) HTTP header
         :param verify: (bool) True to verify ssl cert with in HTTP call
+        :param session: (requests.Session) Existing session to share its connection pool. If None, a new pooled
+            session is created with the pool options below
+        :param pool_connections: (int) Number of per-host connection pools to cache
+        :param pool_maxsize: (int) Maximum number of connections kept open per host
+        :param pool_block: (bool) When True, never open more than pool_maxsize connections per host
+        :param keep_alive: (bool) When False, connections are closed after every call
+        :param rate_limiter: (RateLimiter) Optional scheduler that every call waits on before it is sent
+        :param retry_policy: (RetryPolicy) Optional policy to retry throttled and failed calls
+        :param token_manager: (TokenManager) Optional manager that refreshes the credential of the calls and retries
+            them once after a 401
         """
-        self.version = "1.1"
+        self.version = "1.2"
         self.host = host
         self.headers = {"Content-type": "application/json", "Cache-Control": "no-cache"}
         if header:
             self.headers.update(header)
         self.cookies = None
         self.verify = verify
+        if session is None:
+            session = new_session(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+                keep_alive=keep_alive,
+            )
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.token_manager = token_manager
+        self._headers_lock = threading.Lock()
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Internal method that sends every HTTP call through the pooled session, waiting on the rate limiter,
+        retrying as the retry policy decides and logging in again once when the credential is rejected
+
+        :param method: (str) HTTP method
+        :param url: (str) url relative to host
+        :param kwargs: Options passed to requests.Session.request
+
+        :return: (requests.Response Object)
+        """
+        attempt = 0
+        reauthenticated = False
+        while True:
+            # Before every attempt, as a retry may come after a wait longer than the credential lifetime
+            if self.token_manager:
+                self.token_manager.before_request(kwargs)
+            if self.rate_limiter:
+                self.rate_limiter.acquire(method, url)
+            try:
+                response = self.session.request(
+                    method=method,
+                    url=f"{self.host}{url}",
+                    verify=self.verify,
+                    **kwargs,
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not self.retry_policy:
+                    raise
+                delay = self.retry_policy.next_delay(method, attempt, error=e)
+                if delay is None:
+                    raise
+                logger.info(f"{method} {url} failed with {e}, retrying in {delay:.2f}s")
+            else:
+                if (
+                    response.status_code == 401
+                    and self.token_manager
+                    and not reauthenticated
+                    and self.token_manager.after_unauthorized(kwargs)
+                ):
+                    reauthenticated = True
+                    continue
+                if not self.retry_policy:
+                    return response
+                delay = self.retry_policy.next_delay(method, attempt, response=response)
+                if delay is None:
+                    return response
+                logger.info(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def _headers(
+        self,
+        headers: dict = None,
+    ) -> dict:
+        """
+        Internal method to add headers to the headers of the instance, which later calls keep sending, and get a copy
+        for one call, so that calls sent from several threads never share the dict requests reads
+
+        :param headers: (dict) Additional HTTP headers
+
+        :return: (dict) Headers of the call
+        """
+        with self._headers_lock:
+            if headers:
+                self.headers.update(headers)
+            return dict(self.headers)
+
+    def close(self):
+        """
+        Method to close the pooled connections of this instance
+        """
+        self.session.close()
 
     def get_call(
         self,
@@ -86,16 +231,14 @@ class HttpCalls(object):
 
         :return: (requests.Response Object)
         """
-        full_url = f"{self.host}{url}"
-        if headers:
-            self.headers.update(headers)
+        request_headers = self._headers(headers)
         try:
-            response = requests.get(
-                url=full_url,
-                headers=self.headers,
+            response = self._request(
+                "GET",
+                url,
+                headers=request_headers,
                 cookies=cookies,
                 params=params,
-                verify=self.verify,
             )
             if error_handling:
                 _zia_http_codes(response)
@@ -129,28 +272,26 @@ class HttpCalls(object):
 
         :return: (requests.Response Object)
         """
-        full_url = f"{self.host}{url}"
         try:
             if urlencoded:
                 url_encoded_headers = headers
-                response = requests.post(
-                    url=full_url,
+                response = self._request(
+                    "POST",
+                    url,
                     params=params,
                     headers=url_encoded_headers,
                     cookies=cookies,
                     data=payload,
-                    verify=self.verify,
                 )
             else:
-                if headers:
-                    self.headers.update(headers)
-                response = requests.post(
-                    url=full_url,
+                request_headers = self._headers(headers)
+                response = self._request(
+                    "POST",
+                    url,
                     params=params,
-                    headers=self.headers,
+                    headers=request_headers,
                     cookies=cookies,
                     json=payload,
-                    verify=self.verify,
                 )
             if error_handling:
                 _zia_http_codes(response)
@@ -176,14 +317,13 @@ class HttpCalls(object):
 
         :return: (requests.Response Object)
         """
-        full_url = f"{self.host}{url}"
         try:
-            response = requests.patch(
-                url=full_url,
-                headers=self.headers,
+            response = self._request(
+                "PATCH",
+                url,
+                headers=self._headers(),
                 cookies=cookies,
                 json=payload,
-                verify=self.verify,
             )
             if response.status_code not in [200, 201, 204]:
                 raise ValueError(response.status_code)
@@ -212,17 +352,15 @@ class HttpCalls(object):
 
         :return: (requests.Response Object)
         """
-        full_url = f"{self.host}{url}"
-        if headers:
-            self.headers.update(headers)
+        request_headers = self._headers(headers)
         try:
-            response = requests.put(
-                url=full_url,
+            response = self._request(
+                "PUT",
+                url,
                 params=params,
-                headers=self.headers,
+                headers=request_headers,
                 cookies=cookies,
                 json=payload,
-                verify=self.verify,
             )
             if error_handling:
                 _zia_http_codes(response)
@@ -257,16 +395,14 @@ class HttpCalls(object):
 
         :return: (requests.Response Object)
         """
-        full_url = f"{self.host}{url}"
-        if headers:
-            self.headers.update(headers)
+        request_headers = self._headers(headers)
         try:
-            response = requests.delete(
-                url=full_url,
-                headers=self.headers,
+            response = self._request(
+                "DELETE",
+                url,
+                headers=request_headers,
                 cookies=cookies,
                 json=payload,
-                verify=self.verify,
             )
             if error_handling:
                 _zia_http_codes(response)
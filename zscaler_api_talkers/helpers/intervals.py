@@ -0,0 +1,366 @@
+import bisect
+import ipaddress
+import socket
+
+# IPv4 addresses are mapped into the IPv6 space (::ffff:0:0/96), so that both families share one index
+_IPV4_MAPPED = 0xFFFF00000000
+
+
+def address_range(
+    address: str,
+) -> tuple:
+    """
+    Method to convert an IP address, CIDR or range to an interval of integers. IPv4 and IPv6 share the same space.
+
+    :param address: (str) e.g. "10.0.0.1", "10.0.0.0/8", "10.0.0.1-10.0.0.9" or "2001:db8::/32"
+
+    :return: (tuple) (first, last), both included. None if address is not an IP address, e.g. an FQDN
+    """
+    address = address.strip()
+    host, _, prefix = address.partition("/")
+    try:
+        # Much faster than ipaddress for the common case of IPv4 addresses and CIDRs
+        value = int.from_bytes(socket.inet_pton(socket.AF_INET, host), "big")
+        host_bits = 32 - int(prefix) if prefix else 0
+        if 0 <= host_bits <= 32:
+            first = value >> host_bits << host_bits
+            return first + _IPV4_MAPPED, first + (1 << host_bits) - 1 + _IPV4_MAPPED
+    except (OSError, ValueError):
+        pass
+    try:
+        if "-" in address:
+            first, last = (ipaddress.ip_address(part.strip()) for part in address.split("-", 1))
+        else:
+            network = ipaddress.ip_network(address, strict=False)
+            first, last = network.network_address, network.broadcast_address
+    except ValueError:
+        return None
+    offset = _IPV4_MAPPED if first.version == 4 else 0
+
+    return int(first) + offset, int(last) + offset
+
+
+def address_value(
+    address: str,
+) -> int:
+    """
+    Method to convert an IP address to an integer in the space of address_range
+
+    :param address: (str) IPv4 or IPv6 address
+
+    :return: (int)
+    """
+    address = address.strip()
+    try:
+        # Much faster than ipaddress for the common case of IPv4
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big") + _IPV4_MAPPED
+    except OSError:
+        ip = ipaddress.ip_address(address)
+
+    return int(ip) + (_IPV4_MAPPED if ip.version == 4 else 0)
+
+
+class BitIndex(object):
+    """
+    Rules matching each value of one criterion, as bit sets: bit i is set for the rule evaluated in position i.
+    Rules without the criterion match any value.
+    """
+
+    __slots__ = ("any", "by_value")
+
+    def __init__(self):
+        self.any = 0
+        self.by_value = {}
+
+    def add(
+        self,
+        position: int,
+        values: list,
+    ):
+        """
+        :param position: (int) Position of the rule
+        :param values: (list) Values the rule matches. Empty for any value
+        """
+        bit = 1 << position
+        if not values:
+            self.any |= bit
+            return
+        for value in values:
+            self.by_value[value] = self.by_value.get(value, 0) | bit
+
+    def match(
+        self,
+        values,
+    ) -> int:
+        """
+        :param values: (iterable) Values of a request
+
+        :return: (int) Bit set of the rules matching any of the values
+        """
+        matched = self.any
+        for value in values:
+            matched |= self.by_value.get(value, 0)
+
+        return matched
+
+
+class IntervalIndex(object):
+    """
+    Stabbing index of integer intervals carrying bit sets, e.g. the rules of each address range. Intervals are cut
+    into elementary segments carrying the union of the bit sets covering them, so a point is matched with one binary
+    search whatever the number of intervals and however they overlap. The segments are built at the first match
+    after an add.
+    """
+
+    def __init__(self):
+        self._intervals = []
+        self._bounds = None
+        self._bits = None
+
+    def add(
+        self,
+        first: int,
+        last: int,
+        bits: int,
+    ):
+        """
+        :param first: (int) First value of the interval
+        :param last: (int) Last value of the interval, included
+        :param bits: (int) Bit set carried by the interval
+        """
+        self._intervals.append((first, last, bits))
+        self._bounds = None
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def _build(self):
+        events = {}
+        for first, last, bits in self._intervals:
+            events.setdefault(first, []).append((bits, 1))
+            events.setdefault(last + 1, []).append((bits, -1))
+        self._bounds, self._bits = [], []
+        counts = {}
+        current = 0
+        for point in sorted(events):
+            for bits, delta in events[point]:
+                # Count the intervals covering each bit, the bit flips when its count goes from or to 0
+                while bits:
+                    bit = bits & -bits
+                    bits ^= bit
+                    count = counts.get(bit, 0) + delta
+                    if (count == 0) != (counts.get(bit, 0) == 0):
+                        current ^= bit
+                    counts[bit] = count
+            if self._bits and self._bits[-1] == current:
+                continue
+            self._bounds.append(point)
+            self._bits.append(current)
+
+    def match(
+        self,
+        value: int,
+    ) -> int:
+        """
+        :param value: (int) Point
+
+        :return: (int) Union of the bit sets of the intervals containing value
+        """
+        if self._bounds is None:
+            self._build()
+        position = bisect.bisect_right(self._bounds, value) - 1
+
+        return self._bits[position] if position >= 0 else 0
+
+
+class IntervalSet(object):
+    """
+    Set of integers stored as sorted, merged intervals, e.g. port ranges or address ranges. Membership and overlap
+    tests are binary searches.
+    """
+
+    def __init__(
+        self,
+        intervals=(),
+    ):
+        """
+        :param intervals: (iterable) (first, last) intervals, last included
+        """
+        self._firsts = []
+        self._lasts = []
+        for first, last in intervals:
+            self.add(first, last)
+
+    def add(
+        self,
+        first: int,
+        last: int,
+    ):
+        """
+        Method to add an interval, merged with the ones it overlaps or touches
+
+        :param first: (int) First value
+        :param last: (int) Last value, included
+        """
+        start = bisect.bisect_left(self._lasts, first - 1)
+        end = bisect.bisect_right(self._firsts, last + 1)
+        if start < end:
+            first = min(first, self._firsts[start])
+            last = max(last, self._lasts[end - 1])
+        self._firsts[start:end] = [first]
+        self._lasts[start:end] = [last]
+
+    def __contains__(
+        self,
+        value: int,
+    ) -> bool:
+        position = bisect.bisect_right(self._firsts, value) - 1
+
+        return position >= 0 and value <= self._lasts[position]
+
+    def overlaps(
+        self,
+        first: int,
+        last: int,
+    ) -> bool:
+        """
+        :param first: (int) First value
+        :param last: (int) Last value, included
+
+        :return: (bool) True if any value of the interval is in the set
+        """
+        position = bisect.bisect_left(self._lasts, first)
+
+        return position < len(self._firsts) and self._firsts[position] <= last
+
+    def intersection(
+        self,
+        other: "IntervalSet",
+    ) -> "IntervalSet":
+        """
+        :param other: (IntervalSet) Other set
+
+        :return: (IntervalSet) Values in both sets
+        """
+        result = IntervalSet()
+        mine, theirs = list(self), list(other)
+        i = j = 0
+        while i < len(mine) and j < len(theirs):
+            first = max(mine[i][0], theirs[j][0])
+            last = min(mine[i][1], theirs[j][1])
+            if first <= last:
+                result._firsts.append(first)
+                result._lasts.append(last)
+            if mine[i][1] < theirs[j][1]:
+                i += 1
+            else:
+                j += 1
+
+        return result
+
+    def __iter__(self):
+        return iter(zip(self._firsts, self._lasts))
+
+    def __len__(self) -> int:
+        return len(self._firsts)
+
+    def size(self) -> int:
+        """
+        :return: (int) Number of values in the set
+        """
+        return sum(last - first + 1 for first, last in self)
+
+
+class IntervalMap(object):
+    """
+    Integer intervals carrying values, e.g. the segment of each address range, updated one interval at a time.
+    Intervals are bucketed by size class, the bit length of last - first, and each bucket is sorted by first value:
+    an interval of class k containing a point starts less than 2 ** k before it, so the intervals containing a point
+    or overlapping an interval are found with one binary search per class, about 130 at most, without rebuilding
+    anything after an add or a remove.
+    """
+
+    def __init__(self):
+        # Size class: (sorted first values, (first, last, value) in the same order)
+        self._buckets = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(
+        self,
+        first: int,
+        last: int,
+        value,
+    ):
+        """
+        :param first: (int) First value of the interval
+        :param last: (int) Last value of the interval, included
+        :param value: Value carried by the interval
+        """
+        firsts, entries = self._buckets.setdefault((last - first).bit_length(), ([], []))
+        position = bisect.bisect_right(firsts, first)
+        firsts.insert(position, first)
+        entries.insert(position, (first, last, value))
+        self._count += 1
+
+    def remove(
+        self,
+        first: int,
+        last: int,
+        value,
+    ) -> bool:
+        """
+        Method to remove an interval added with the same values
+
+        :param first: (int) First value of the interval
+        :param last: (int) Last value of the interval, included
+        :param value: Value carried by the interval
+
+        :return: (bool) False if there was no such interval
+        """
+        size_class = (last - first).bit_length()
+        if size_class not in self._buckets:
+            return False
+        firsts, entries = self._buckets[size_class]
+        for position in range(bisect.bisect_left(firsts, first), bisect.bisect_right(firsts, first)):
+            if entries[position] == (first, last, value):
+                del firsts[position]
+                del entries[position]
+                if not firsts:
+                    del self._buckets[size_class]
+                self._count -= 1
+                return True
+
+        return False
+
+    def overlapping(
+        self,
+        first: int,
+        last: int,
+    ) -> list:
+        """
+        :param first: (int) First value
+        :param last: (int) Last value, included
+
+        :return: (list) (first, last, value) of the intervals sharing any value with first..last
+        """
+        found = []
+        for size_class, (firsts, entries) in self._buckets.items():
+            start = bisect.bisect_right(firsts, first - (1 << size_class))
+            end = bisect.bisect_right(firsts, last)
+            found.extend(entry for entry in entries[start:end] if entry[1] >= first)
+
+        return found
+
+    def match(
+        self,
+        value: int,
+    ) -> list:
+        """
+        :param value: (int) Point
+
+        :return: (list) (first, last, value) of the intervals containing the point
+        """
+        return self.overlapping(value, value)
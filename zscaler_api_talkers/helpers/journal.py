@@ -0,0 +1,294 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import requests
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+# Talker methods that change the tenant. add_call and update_call are covered by the prefixes.
+WRITE_PREFIXES = ("add_", "update_", "delete_", "remove_", "force_remove_")
+# Methods matching the prefixes that do not change the configuration, e.g. requests for reports. Skipping them on
+# resume would lose their side effect.
+NOT_JOURNALED = ("add_auditlog_entry_report",)
+# Values of these parameters and keys are never written to the journal, matched without case or underscores so that
+# the camelCase keys of the API responses, e.g. apiKey, are found too
+REDACTED = ("password", "api_key", "client_secret", "secret")
+
+
+def _secret(
+    key,
+) -> bool:
+    key = str(key).lower().replace("_", "")
+
+    return any(word.replace("_", "") in key for word in REDACTED)
+
+
+def _redact(
+    value,
+):
+    if isinstance(value, dict):
+        return {k: "***" if _secret(k) else _redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_redact(item) for item in value]
+
+    return value
+
+
+def _serializable(
+    value,
+) -> tuple:
+    """
+    Internal method to convert the result of a call to what the journal stores
+
+    :param value: Result of the call
+    :return: (tuple) (True, stored value), or (False, None) if the result cannot be stored
+    """
+    if isinstance(value, requests.Response):
+        try:
+            body = value.json()
+        except ValueError:
+            body = None
+        # The text only when the body is not JSON, as only JSON is redacted
+        text = value.text if body is None else ""
+        return True, {"__response__": {"status_code": value.status_code, "body": body, "text": text}}
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return False, None
+
+    return True, value
+
+
+class JournaledResponse(object):
+    """
+    Stand-in for the requests.Response of a call skipped on resume, as recorded in the journal
+    """
+
+    def __init__(
+        self,
+        status_code: int,
+        body=None,
+        text: str = "",
+    ):
+        """
+        :param status_code: (int) HTTP status code
+        :param body: JSON body, None if the body was not JSON
+        :param text: (str) Body
+        """
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = text or (json.dumps(body) if body is not None else "")
+        self.content = self.text.encode()
+        self._body = body
+
+    def json(self):
+        if self._body is None:
+            return json.loads(self.text)
+
+        return self._body
+
+
+def _replay(
+    value,
+):
+    """
+    Internal method to convert a stored result back to what the call returned
+    """
+    if isinstance(value, dict) and set(value) == {"__response__"}:
+        return JournaledResponse(**value["__response__"])
+
+    return value
+
+
+class MutationJournal(object):
+    """
+    Write-ahead journal of the calls that change a tenant. Once attached to a talker, each add_*, update_*, delete_*
+    and remove_* call is appended to a JSON lines file before it is sent, then its outcome once it returns. Lines are
+    flushed to disk one by one and never rewritten, so the file tells what was applied even after a crash.
+
+    In resume mode, calls whose entry is done in the file are not sent again: the recorded result is returned, a
+    JournaledResponse for the calls returning a requests.Response. Calls whose result cannot be recorded, or holds
+    secrets that are redacted in the file, are sent again. Methods in NOT_JOURNALED, such as report requests, are
+    always sent. A job that failed on item 3,127 can be started again as is and only goes on from there. Calls are
+    matched on the method, the parameters and how many identical calls came before, so a job that makes the same call
+    twice on purpose still makes it twice. Calls started but without outcome, e.g. killed in flight, are sent again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        resume: bool = True,
+        prefixes: tuple = WRITE_PREFIXES,
+    ):
+        """
+        :param path: (str) Path of the journal file, created if missing
+        :param resume: (bool) True to skip the calls already done in the file. False to journal a new run only
+        :param prefixes: (tuple) Prefixes of the names of the methods journaled
+        """
+        self.path = path
+        self.resume = resume
+        self.prefixes = prefixes
+        self.applied = 0
+        self.skipped = 0
+        self.failed = 0
+        self._done = {}
+        self._pending = {}
+        self._seen = Counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if resume and os.path.exists(path):
+            self._load()
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        self._file = os.fdopen(fd, "a")
+
+    def _load(self):
+        with open(self.path) as f:
+            for number, line in enumerate(f, start=1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash
+                    logger.warning(f"Ignoring unreadable line {number} of {self.path}")
+                    continue
+                key = entry.get("key")
+                if entry.get("status") == "started":
+                    self._pending[key] = entry
+                elif entry.get("status") == "done":
+                    self._pending.pop(key, None)
+                    if entry.get("replayable", True):
+                        self._done[key] = entry.get("result")
+                else:
+                    self._pending.pop(key, None)
+        if self._done or self._pending:
+            logger.info(
+                f"Resuming from {self.path}: {len(self._done)} calls done, {len(self._pending)} without outcome"
+            )
+
+    def _write(
+        self,
+        entry: dict,
+    ):
+        entry["at"] = time.time()
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _key(
+        self,
+        name: str,
+        params: dict,
+    ) -> str:
+        call = json.dumps([name, params], sort_keys=True, default=str)
+        with self._lock:
+            self._seen[call] += 1
+            occurrence = self._seen[call]
+
+        return hashlib.sha256(f"{occurrence}:{call}".encode()).hexdigest()
+
+    def pending(self) -> list:
+        """
+        Method to list the calls of the previous runs that were started but have no outcome. Whether they were
+        applied is unknown.
+
+        :return: (list) Journal entries
+        """
+        return list(self._pending.values())
+
+    def wrap(
+        self,
+        name: str,
+        method,
+    ):
+        """
+        Method to journal a talker method
+
+        :param name: (str) Name of the method
+        :param method: (callable) Bound method
+
+        :return: (callable) Journaled method, with the same parameters
+        """
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def journaled(*args, **kwargs):
+            # Write methods that call other write methods are journaled once, at the outer call
+            if getattr(self._local, "depth", 0):
+                return method(*args, **kwargs)
+            # Parameters by name, so positional and keyword calls match and secrets are found
+            try:
+                params = dict(signature.bind(*args, **kwargs).arguments)
+            except TypeError:
+                return method(*args, **kwargs)
+            key = self._key(name, params)
+            if key in self._done:
+                self.skipped += 1
+                logger.info(f"Skipping {name}, done in {self.path}")
+                return _replay(self._done[key])
+            self._write(
+                {
+                    "key": key,
+                    "status": "started",
+                    "method": name,
+                    "params": _redact(params),
+                }
+            )
+            self._local.depth = 1
+            try:
+                result = method(*args, **kwargs)
+            except Exception as e:
+                self.failed += 1
+                self._write({"key": key, "status": "failed", "method": name, "error": str(e)})
+                raise
+            finally:
+                self._local.depth = 0
+            self.applied += 1
+            replayable, stored = _serializable(result)
+            redacted = _redact(stored)
+            entry = {"key": key, "status": "done", "method": name, "result": redacted}
+            if not replayable:
+                logger.warning(f"Result of {name} cannot be journaled, the call will be sent again on resume")
+                entry["replayable"] = False
+            elif redacted != stored:
+                # Replaying "***" would hand the caller a broken secret
+                logger.info(f"Result of {name} holds secrets, the call will be sent again on resume")
+                entry["replayable"] = False
+            self._write(entry)
+
+            return result
+
+        return journaled
+
+    def attach(
+        self,
+        talker: object,
+    ):
+        """
+        Method to journal the write methods of a talker. Only this talker instance is affected.
+
+        :param talker: (object) ZiaTalker, ZpaTalker, ClientConnectorTalker or CloudConnectorTalker
+        """
+        for name in dir(type(talker)):
+            if (
+                name.startswith(self.prefixes)
+                and name not in NOT_JOURNALED
+                and callable(getattr(type(talker), name))
+            ):
+                setattr(talker, name, self.wrap(name, getattr(talker, name)))
+
+    def close(self):
+        """
+        Method to close the journal file
+        """
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+DEFAULT_PORTS = {
+    "http": "80",
+    "https": "443",
+}
+
+
+def normalize_url(
+    url: str,
+) -> str:
+    """
+    Method to normalize a URL before it is looked up: no surrounding blanks, scheme, credentials, fragment, default
+    port of the scheme or lone trailing slash, and a lower case host. The path and query keep their case. Without a
+    scheme, the port is kept as there is no default to compare it with.
+
+    :param url: (str) URL, e.g. "HTTPS://Www.Example.com:443/"
+
+    :return: (str) Normalized URL, e.g. "www.example.com"
+    """
+    url = url.strip()
+    scheme = None
+    if "://" in url:
+        scheme, url = url.split("://", 1)
+        scheme = scheme.lower()
+    url = url.split("#", 1)[0]
+    for separator in ("/", "?"):
+        if separator in url:
+            index = url.index(separator)
+            host, rest = url[:index], url[index:]
+            break
+    else:
+        host, rest = url, ""
+    host = host.rsplit("@", 1)[-1].lower()
+    name, separator, port = host.rpartition(":")
+    if not port.isdigit():
+        name, separator, port = host, "", ""
+    if scheme in DEFAULT_PORTS and port == DEFAULT_PORTS[scheme]:
+        separator = port = ""
+    host = f"{name.rstrip('.')}{separator}{port}"
+    if rest == "/":
+        rest = ""
+
+    return f"{host}{rest}"
+
+
+class UrlLookupCache(object):
+    """
+    Cache of url_lookup results. A bounded LRU in memory answers first, then, when a path is given, a SQLite file
+    shared by processes. Entries older than ttl are never served. Hits and misses are counted per URL.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100000,
+        ttl: float = 86400,
+        path: str = None,
+        max_disk_entries: int = 10000000,
+    ):
+        """
+        :param max_entries: (int) Maximum number of URLs kept in memory, least recently used are evicted first
+        :param ttl: (float) Seconds a categorization is served for
+        :param path: (str) Optional path of a SQLite file used as second tier
+        :param max_disk_entries: (int) Maximum number of URLs kept in the SQLite file, oldest are evicted first
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS lookups (url TEXT PRIMARY KEY, result TEXT, stored_at REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS lookups_stored_at ON lookups (stored_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Share of URLs answered by the cache since it was created
+
+        :return: (float) Between 0 and 1
+        """
+        total = self.hits + self.misses
+
+        return self.hits / total if total else 0.0
+
+    def get_many(
+        self,
+        urls: list,
+    ) -> dict:
+        """
+        Method to get the cached categorizations of normalized URLs
+
+        :param urls: (list) Normalized URLs
+
+        :return: (dict) url: categorization, for the URLs found
+        """
+        now = time.time()
+        found = {}
+        with self._lock:
+            for url in urls:
+                entry = self._memory.get(url)
+                if entry and now - entry[1] < self.ttl:
+                    self._memory.move_to_end(url)
+                    found[url] = entry[0]
+        missing = [url for url in urls if url not in found]
+        if self.path and missing:
+            from_disk = {}
+            with self._connect() as conn:
+                for i in range(0, len(missing), 500):
+                    chunk = missing[i : i + 500]
+                    rows = conn.execute(
+                        f"SELECT url, result, stored_at FROM lookups WHERE url IN ({','.join('?' * len(chunk))})"
+                        " AND stored_at > ?",
+                        chunk + [now - self.ttl],
+                    )
+                    for url, result, stored_at in rows:
+                        from_disk[url] = (json.loads(result), stored_at)
+            self._remember(from_disk)
+            found.update({url: result for url, (result, _) in from_disk.items()})
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(urls) - len(found)
+
+        return found
+
+    def _remember(
+        self,
+        entries: dict,
+    ):
+        with self._lock:
+            for url, entry in entries.items():
+                self._memory[url] = entry
+                self._memory.move_to_end(url)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def set_many(
+        self,
+        results: dict,
+    ):
+        """
+        Method to cache categorizations
+
+        :param results: (dict) Normalized url: categorization
+        """
+        now = time.time()
+        self._remember({url: (result, now) for url, result in results.items()})
+        if not self.path or not results:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO lookups (url, result, stored_at) VALUES (?, ?, ?)",
+                [(url, json.dumps(result), now) for url, result in results.items()],
+            )
+            conn.execute("DELETE FROM lookups WHERE stored_at <= ?", (now - self.ttl,))
+            # INSERT OR REPLACE gives the row a new rowid, so rowids follow the order entries were stored in
+            conn.execute(
+                "DELETE FROM lookups WHERE rowid <= (SELECT MAX(rowid) FROM lookups) - ?",
+                (self.max_disk_entries,),
+            )
+
+    def clear(self):
+        """
+        Method to empty both tiers and reset the counters
+        """
+        with self._lock:
+            self._memory.clear()
+            self.hits = 0
+            self.misses = 0
+        if self.path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM lookups")
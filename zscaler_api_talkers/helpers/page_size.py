@@ -0,0 +1,267 @@
+import json
+import os
+import threading
+import time
+
+import appdirs
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+# Largest page size accepted by each endpoint, keyed by the path of the endpoint without its query. Endpoints not
+# listed use the max_page_size given by the talker.
+ZIA_PAGE_SIZES = {
+    "/adminUsers": 1000,
+    "/departments": 10000,
+    "/groups": 10000,
+    "/users": 1000,
+}
+ZPA_PAGE_SIZE = 500
+CLIENT_CONNECTOR_PAGE_SIZES = {
+    "/public/v1/getDevices": 500,
+}
+
+
+class PageSizePolicy(object):
+    """
+    Chooses the page size of paginated list calls. It starts from the largest size accepted by the endpoint and,
+    after each complete enumeration, records the time spent per record with that size. When pages are slower than
+    target_page_seconds or an enumeration fails, the next enumeration of that tenant and endpoint halves the page
+    size, down to min_page_size. When pages stay under target_page_seconds and the double of the size was never
+    tried, the next one explores that double, up to the endpoint maximum. Otherwise the next one uses the size with
+    the lowest time per record among the sizes whose pages were not slower than target_page_seconds and that
+    succeeded at least as often as they failed.
+
+    The page size never changes during an enumeration, because the APIs number pages for a given page size. Measures
+    are kept in memory, or with persist in a JSON file so later runs start from the best known size.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        persist: bool = False,
+        min_page_size: int = 100,
+        target_page_seconds: float = 30,
+        smoothing: float = 0.5,
+    ):
+        """
+        :param path: (str) Path of the JSON file, used with persist. Default is page_sizes.json in the user cache
+            directory
+        :param persist: (bool) True to keep the measures in a JSON file across runs. Default False, in memory only
+        :param min_page_size: (int) Smallest page size the policy falls back to
+        :param target_page_seconds: (float) Average seconds per page above which the page size is halved
+        :param smoothing: (float) Weight of the latest measure in the moving average of seconds per record
+        """
+        if persist and not path:
+            path = os.path.join(appdirs.user_cache_dir("zscaler_api_talkers"), "page_sizes.json")
+        self.path = path if persist else None
+        self.min_page_size = min_page_size
+        self.target_page_seconds = target_page_seconds
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    def _load(self) -> dict:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring page size measures in {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._state, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Unable to save page size measures to {self.path}: {e}")
+
+    @staticmethod
+    def _key(
+        tenant: str,
+        endpoint: str,
+    ) -> str:
+        return f"{tenant}|{endpoint}"
+
+    def page_size(
+        self,
+        tenant: str,
+        endpoint: str,
+        max_page_size: int,
+    ) -> int:
+        """
+        Method to get the page size of the next enumeration of an endpoint
+
+        :param tenant: (str) Tenant identifier
+        :param endpoint: (str) Path of the endpoint, without query
+        :param max_page_size: (int) Largest page size accepted by the endpoint
+
+        :return: (int) Page size
+        """
+        with self._lock:
+            entry = self._state.get(self._key(tenant, endpoint), {})
+        size = entry.get("next", max_page_size)
+
+        return max(min(size, max_page_size), min(self.min_page_size, max_page_size))
+
+    def record(
+        self,
+        tenant: str,
+        endpoint: str,
+        page_size: int,
+        max_page_size: int,
+        pages: int = 0,
+        records: int = 0,
+        seconds: float = 0.0,
+        payload_bytes: int = 0,
+        failed: bool = False,
+    ):
+        """
+        Method to record the measures of an enumeration and choose the page size of the next one
+
+        :param tenant: (str) Tenant identifier
+        :param endpoint: (str) Path of the endpoint, without query
+        :param page_size: (int) Page size used
+        :param max_page_size: (int) Largest page size accepted by the endpoint
+        :param pages: (int) Number of pages fetched
+        :param records: (int) Number of records received
+        :param seconds: (float) Seconds spent fetching the pages, rate limit waits included
+        :param payload_bytes: (int) Size of the response bodies
+        :param failed: (bool) True if the enumeration stopped on an error
+        """
+        smaller = max(page_size // 2, min(self.min_page_size, max_page_size))
+        with self._lock:
+            key = self._key(tenant, endpoint)
+            entry = self._state.setdefault(key, {"sizes": {}})
+            stats = entry["sizes"].setdefault(str(page_size), {})
+            if failed:
+                stats["failures"] = stats.get("failures", 0) + 1
+                entry["next"] = smaller
+                logger.info(f"Enumeration of {endpoint} failed with pageSize={page_size}, next one uses {smaller}")
+            else:
+                stats["runs"] = stats.get("runs", 0) + 1
+                per_record = seconds / max(records, 1)
+                if "seconds_per_record" in stats:
+                    per_record = (
+                        self.smoothing * per_record + (1 - self.smoothing) * stats["seconds_per_record"]
+                    )
+                stats["seconds_per_record"] = per_record
+                stats["seconds_per_page"] = seconds / max(pages, 1)
+                stats["bytes_per_record"] = payload_bytes / max(records, 1)
+                sizes = [
+                    int(size)
+                    for size, size_stats in entry["sizes"].items()
+                    if int(size) <= max_page_size
+                    and "seconds_per_page" in size_stats
+                    and size_stats["seconds_per_page"] <= self.target_page_seconds
+                    and size_stats.get("failures", 0) <= size_stats["runs"]
+                ]
+                larger = min(page_size * 2, max_page_size)
+                if stats["seconds_per_page"] > self.target_page_seconds and smaller < page_size:
+                    entry["next"] = smaller
+                elif larger > page_size and str(larger) not in entry["sizes"]:
+                    entry["next"] = larger
+                    logger.debug(f"Pages of {endpoint} under {self.target_page_seconds}s, trying pageSize={larger}")
+                elif sizes:
+                    entry["next"] = min(sizes, key=lambda size: entry["sizes"][str(size)]["seconds_per_record"])
+                else:
+                    entry["next"] = page_size
+            self._save()
+
+
+class PageMeter(object):
+    """
+    Measures one enumeration for a PageSizePolicy: time spent in each page call, payload size and number of records
+    """
+
+    def __init__(
+        self,
+        policy: PageSizePolicy,
+        tenant: str,
+        endpoint: str,
+        page_size: int,
+        max_page_size: int,
+    ):
+        """
+        :param policy: (PageSizePolicy) Policy the measures are recorded in
+        :param tenant: (str) Tenant identifier
+        :param endpoint: (str) Path of the endpoint, without query
+        :param page_size: (int) Page size of the enumeration. None when the caller's query sets it, nothing is recorded
+        :param max_page_size: (int) Largest page size accepted by the endpoint
+        """
+        self.policy = policy
+        self.tenant = tenant
+        self.endpoint = endpoint
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        self.pages = 0
+        self.records = 0
+        self.seconds = 0.0
+        self.payload_bytes = 0
+        self._lock = threading.Lock()
+
+    def wrap(
+        self,
+        fetch_response,
+    ):
+        """
+        Method to measure a page call
+
+        :param fetch_response: (callable) Called with a page number, returns the requests.Response of that page
+
+        :return: (callable) Called with a page number, returns the decoded JSON of that page
+        """
+
+        def fetch(page):
+            start = time.monotonic()
+            response = fetch_response(page)
+            with self._lock:
+                self.pages += 1
+                self.seconds += time.monotonic() - start
+                self.payload_bytes += len(response.content)
+
+            return response.json()
+
+        return fetch
+
+    def count(
+        self,
+        records: int,
+    ):
+        """
+        Method to count records received
+
+        :param records: (int) Number of records of a page
+        """
+        self.records += records
+
+    def record(
+        self,
+        failed: bool = False,
+    ):
+        """
+        Method to record the enumeration in the policy
+
+        :param failed: (bool) True if the enumeration stopped on an error
+        """
+        if self.page_size is None:
+            return
+        self.policy.record(
+            tenant=self.tenant,
+            endpoint=self.endpoint,
+            page_size=self.page_size,
+            max_page_size=self.max_page_size,
+            pages=self.pages,
+            records=self.records,
+            seconds=self.seconds,
+            payload_bytes=self.payload_bytes,
+            failed=failed,
+        )
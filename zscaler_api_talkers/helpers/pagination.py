@@ -0,0 +1,84 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+
+def fetch_pages(
+    fetch_page,
+    pages,
+    concurrency: int = 1,
+):
+    """
+    Generator that fetches known page numbers with at most concurrency calls in flight and yields every page in the
+    order of pages, as soon as it and all the pages before it have arrived
+
+    :param fetch_page: (callable) Called with a page number, returns the records of that page
+    :param pages: (iterable) Page numbers to fetch
+    :param concurrency: (int) Maximum number of pages fetched at the same time. 1 fetches serially
+
+    :return: (generator) Records of each page, in order
+    """
+    if concurrency <= 1:
+        for page in pages:
+            yield fetch_page(page)
+        return
+
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for page in pages:
+            pending.append(executor.submit(fetch_page, page))
+            if len(pending) >= concurrency:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def iter_pages(
+    fetch_page,
+    start: int = 1,
+    prefetch: int = 0,
+):
+    """
+    Generator for APIs that do not tell the number of pages: fetches page after page and stops at the first empty
+    one. With prefetch, up to prefetch pages after the current one are already requested while the current one is
+    consumed. Requests still pending once the first empty page is found are cancelled.
+
+    :param fetch_page: (callable) Called with a page number, returns the records of that page
+    :param start: (int) First page number
+    :param prefetch: (int) Number of pages requested ahead of the current one. 0 fetches serially
+
+    :return: (generator) Records of each non empty page, in order
+    """
+    page = start
+    if prefetch <= 0:
+        while True:
+            records = fetch_page(page)
+            if not records:
+                return
+            yield records
+            page += 1
+
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=prefetch + 1)
+    try:
+        while True:
+            while len(pending) <= prefetch:
+                pending.append(executor.submit(fetch_page, page))
+                page += 1
+            records = pending.popleft().result()
+            if not records:
+                logger.debug(f"Empty page found, cancelling {len(pending)} prefetched pages")
+                return
+            yield records
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -0,0 +1,244 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import appdirs
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+# Each family is (name, HTTP methods or None for any, url regex or None for any, [(calls, period in seconds), ...]).
+# Families are matched in order, the first match wins. Override them with the limits of your tenant when needed.
+# ZIA: per-endpoint quotas of "Understanding Rate Limiting" in the ZIA API documentation
+# (https://help.zscaler.com/zia/understanding-rate-limiting). /urlLookup allows 1 call per second and 400 per hour.
+ZIA_RATE_LIMITS = [
+    ("url_lookup", ["POST"], r"^/urlLookup", [(1, 1), (400, 3600)]),
+    ("bulk_delete", ["POST"], r"/bulkDelete", [(1, 60)]),
+    ("write", ["POST", "PUT", "PATCH", "DELETE"], None, [(1, 1)]),
+    ("read", ["GET"], None, [(2, 1)]),
+]
+# ZPA: 20 GET calls and 10 POST, PUT or DELETE calls per 10 seconds, "Understanding Rate Limiting" in the ZPA API
+# documentation (https://help.zscaler.com/zpa/understanding-rate-limiting)
+ZPA_RATE_LIMITS = [
+    ("write", ["POST", "PUT", "PATCH", "DELETE"], None, [(10, 10)]),
+    ("read", ["GET"], None, [(20, 10)]),
+]
+# Client Connector: the download endpoints allow 3 calls per day. The hourly quota of the other endpoints is not
+# enforced by default, as waiting for it would pause a large enumeration for up to an hour: a 429 is retried by
+# RetryPolicy after its Retry-After instead. Add CLIENT_CONNECTOR_HOURLY_LIMITS to enforce it on the client side.
+CLIENT_CONNECTOR_RATE_LIMITS = [
+    ("download", ["GET"], r"^/public/v1/download", [(3, 86400)]),
+]
+CLIENT_CONNECTOR_HOURLY_LIMITS = [
+    ("public", None, r"^/public/", [(100, 3600)]),
+]
+
+
+class MemoryBucketStore(object):
+    """
+    Token bucket state kept in memory. Shared by every thread and async task of the process that uses it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager that yields the bucket state, a dict of key: (tokens, updated), under an exclusive lock
+        """
+        with self._lock:
+            yield self._state
+
+
+class SqliteBucketStore(object):
+    """
+    Token bucket state kept in a SQLite file, so processes that point to the same file share the same quotas.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+    ):
+        """
+        :param path: (str) Path of the SQLite file. Default is rate_limits.sqlite in the user cache directory
+        """
+        if not path:
+            cache_dir = appdirs.user_cache_dir("zscaler_api_talkers")
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, "rate_limits.sqlite")
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager that yields the bucket state, a dict of key: (tokens, updated), under an exclusive SQLite
+        lock. Changes are written back when the context exits.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            state = {
+                key: (tokens, updated)
+                for key, tokens, updated in conn.execute(
+                    "SELECT key, tokens, updated FROM buckets"
+                )
+            }
+            yield state
+            conn.executemany(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                [(key, tokens, updated) for key, (tokens, updated) in state.items()],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+
+class RateLimiter(object):
+    """
+    Token bucket scheduler. Every HTTP call takes one token from each bucket of its endpoint family and waits only
+    as long as needed for the tokens to refill.
+    """
+
+    def __init__(
+        self,
+        families: list,
+        store: object = None,
+        name: str = "default",
+    ):
+        """
+        :param families: (list) Endpoint families, see ZIA_RATE_LIMITS for the format
+        :param store: (MemoryBucketStore|SqliteBucketStore) Where bucket state is kept. Default is in memory
+        :param name: (str) Prefix of the bucket keys. Limiters with the same name and store share their quotas
+        """
+        self.families = [
+            (
+                family,
+                set(methods) if methods else None,
+                re.compile(pattern) if pattern else None,
+                limits,
+            )
+            for family, methods, pattern, limits in families
+        ]
+        self.store = store or MemoryBucketStore()
+        self.name = name
+        self.calls = {}
+        self.wait_seconds = 0.0
+        self._stats_lock = threading.Lock()
+
+    def family(
+        self,
+        method: str,
+        url: str,
+    ) -> tuple:
+        """
+        Method to find the endpoint family of a call
+
+        :param method: (str) HTTP method
+        :param url: (str) url relative to the API host
+
+        :return: (tuple) (family name, limits), or (None, []) when no family matches
+        """
+        for family, methods, pattern, limits in self.families:
+            if methods and method.upper() not in methods:
+                continue
+            if pattern and not pattern.search(url):
+                continue
+            return family, limits
+
+        return None, []
+
+    def reserve(
+        self,
+        method: str,
+        url: str,
+    ) -> float:
+        """
+        Method to take a token for a call without waiting
+
+        :param method: (str) HTTP method
+        :param url: (str) url relative to the API host
+
+        :return: (float) 0 if the token was taken, otherwise the seconds to wait before trying again
+        """
+        family, limits = self.family(method, url)
+        if not limits:
+            return 0
+        now = time.time()
+        wait = 0
+        with self.store.transaction() as state:
+            buckets = []
+            for calls, period in limits:
+                key = f"{self.name}:{family}:{calls}/{period}"
+                tokens, updated = state.get(key, (calls, now))
+                tokens = min(calls, tokens + (now - updated) * calls / period)
+                # Rounding can leave a refilled bucket a hair under one token, for a wait too short to move the clock
+                if tokens < 1 - 1e-9:
+                    wait = max(wait, (1 - tokens) * period / calls)
+                buckets.append((key, tokens))
+            if wait:
+                return wait
+            for key, tokens in buckets:
+                state[key] = (tokens - 1, now)
+        with self._stats_lock:
+            self.calls[family] = self.calls.get(family, 0) + 1
+
+        return 0
+
+    def _waited(
+        self,
+        seconds: float,
+    ):
+        with self._stats_lock:
+            self.wait_seconds += seconds
+
+    def acquire(
+        self,
+        method: str,
+        url: str,
+    ):
+        """
+        Method to block until a call is allowed
+
+        :param method: (str) HTTP method
+        :param url: (str) url relative to the API host
+        """
+        wait = self.reserve(method, url)
+        while wait:
+            logger.debug(f"Rate limit reached for {method} {url}, waiting {wait:.2f}s")
+            time.sleep(wait)
+            self._waited(wait)
+            wait = self.reserve(method, url)
+
+    async def acquire_async(
+        self,
+        method: str,
+        url: str,
+    ):
+        """
+        Method to wait, without blocking the event loop, until a call is allowed
+
+        :param method: (str) HTTP method
+        :param url: (str) url relative to the API host
+        """
+        wait = self.reserve(method, url)
+        while wait:
+            await asyncio.sleep(wait)
+            self._waited(wait)
+            wait = self.reserve(method, url)
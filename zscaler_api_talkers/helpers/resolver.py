@@ -0,0 +1,166 @@
+import threading
+import time
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+
+class NameResolver(object):
+    """
+    Resolves names of tenant objects (locations, groups, departments, IP groups, app segments, SAML attributes...) to
+    the name-ID pairs the rule methods take. Each collection is loaded at its first use only, kept for ttl seconds,
+    and shared by all the callers, threads included, so building thousands of rules loads each collection once.
+
+    A name missing from a collection older than miss_reload_age triggers one reload of the collection, for objects
+    created since it was loaded.
+    """
+
+    def __init__(
+        self,
+        collections: dict,
+        ttl: float = 3600,
+        miss_reload_age: float = 60,
+    ):
+        """
+        :param collections: (dict) Collection name: callable returning its objects, e.g. {"groups": talker.list_groups}.
+            The value can also be (callable, name field), the name field being "name" by default. A tuple of fields
+            means the first one present
+        :param ttl: (float) Seconds a collection is kept for
+        :param miss_reload_age: (float) Age in seconds from which a missing name reloads its collection. None to
+            never reload on misses
+        """
+        self.collections = {}
+        for collection, loader in collections.items():
+            if not isinstance(loader, tuple):
+                loader = (loader, "name")
+            self.collections[collection] = loader
+        self.ttl = ttl
+        self.miss_reload_age = miss_reload_age
+        self.loads = 0
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._locks = {collection: threading.Lock() for collection in self.collections}
+
+    @staticmethod
+    def _name_of(
+        item: dict,
+        name_field,
+    ):
+        if isinstance(name_field, tuple):
+            for field in name_field:
+                if item.get(field):
+                    return item[field]
+            return None
+
+        return item.get(name_field)
+
+    def _load(
+        self,
+        collection: str,
+    ):
+        loader, name_field = self.collections[collection]
+        index = {}
+        for item in loader() or []:
+            name = self._name_of(item, name_field)
+            if name is not None:
+                index.setdefault(name, []).append({"id": item["id"], "name": name})
+        with self._lock:
+            self._indexes[collection] = (index, time.time())
+            self.loads += 1
+        logger.debug(f"Loaded {len(index)} names of {collection}")
+
+    def _index(
+        self,
+        collection: str,
+        older_than: float = None,
+    ) -> dict:
+        """
+        Internal method to get the index of a collection, loading it when missing, expired or older than older_than
+
+        :param collection: (str) Collection name
+        :param older_than: (float) Optional age in seconds from which the collection is reloaded
+
+        :return: (dict) name: list of name-ID pairs
+        """
+        if collection not in self.collections:
+            raise ValueError(f"Unknown collection {collection}. Valid: {', '.join(sorted(self.collections))}")
+        max_age = self.ttl if older_than is None else min(self.ttl, older_than)
+        # One load per collection at a time, the other callers wait for it and use its result
+        with self._locks[collection]:
+            entry = self._indexes.get(collection)
+            if entry is None or time.time() - entry[1] >= max_age:
+                self._load(collection)
+
+            return self._indexes[collection][0]
+
+    def resolve(
+        self,
+        collection: str,
+        name: str,
+    ) -> dict:
+        """
+        Method to resolve one name
+
+        :param collection: (str) Collection name, e.g. "groups"
+        :param name: (str) Name of the object
+
+        :return: (dict) Name-ID pair, e.g. {"id": 1234, "name": "Sales"}
+        """
+        return self.resolve_many(collection, [name])[0]
+
+    def resolve_many(
+        self,
+        collection: str,
+        names: list,
+    ) -> list:
+        """
+        Method to resolve names of the same collection, in order
+
+        :param collection: (str) Collection name, e.g. "groups"
+        :param names: (list) Names of the objects
+
+        :return: (list) Name-ID pairs, e.g. [{"id": 1234, "name": "Sales"}]
+        """
+        index = self._index(collection)
+        missing = [name for name in names if name not in index]
+        if missing and self.miss_reload_age is not None:
+            index = self._index(collection, older_than=self.miss_reload_age)
+            missing = [name for name in names if name not in index]
+        if missing:
+            raise ValueError(f"Not found in {collection}: {', '.join(map(str, missing))}")
+        ambiguous = [name for name in names if len(index[name]) > 1]
+        if ambiguous:
+            raise ValueError(f"Several objects of {collection} have the names: {', '.join(map(str, ambiguous))}")
+
+        return [index[name][0] for name in names]
+
+    def ids(
+        self,
+        collection: str,
+        names: list,
+    ) -> list:
+        """
+        Method to resolve names to IDs only
+
+        :param collection: (str) Collection name, e.g. "groups"
+        :param names: (list) Names of the objects
+
+        :return: (list) IDs
+        """
+        return [ref["id"] for ref in self.resolve_many(collection, names)]
+
+    def invalidate(
+        self,
+        collection: str = None,
+    ):
+        """
+        Method to reload a collection, or all of them, at their next use
+
+        :param collection: (str) Collection name. None for all
+        """
+        with self._lock:
+            if collection is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(collection, None)
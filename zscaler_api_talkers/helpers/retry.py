@@ -0,0 +1,155 @@
+import email.utils
+import random
+import re
+import threading
+import time
+
+import requests
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+IDEMPOTENT_METHODS = ["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]
+
+
+def _retry_after(
+    response: requests.Response,
+) -> float:
+    """
+    Internal method to read how long the server asked us to wait, from the Retry-After header or, as ZIA does on
+    429, from a "Retry-After" key in the JSON body ("Retry-After": "2 seconds")
+
+    :param response: (requests.Response Object)
+
+    :return: (float) Seconds to wait, or None if the server did not say
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        try:
+            value = response.json().get("Retry-After")
+        except (ValueError, AttributeError):
+            value = None
+    if value is None:
+        return None
+    value = str(value).strip()
+    match = re.match(r"^(\d+(\.\d+)?)", value)
+    if match:
+        return float(match.group(1))
+    try:
+        retry_date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_date.timestamp() - time.time())
+
+
+class RetryPolicy(object):
+    """
+    Retry policy for HttpCalls. Throttled (429) calls are retried for every method because the server rejected them
+    before processing. Server errors and connection errors are retried only for idempotent methods, unless
+    retry_non_idempotent is set. Waits honor Retry-After and otherwise use jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        backoff_factor: float = 1.0,
+        max_backoff: float = 60,
+        jitter: bool = True,
+        retry_budget: float = None,
+        throttle_statuses: list = None,
+        server_error_statuses: list = None,
+        retry_non_idempotent: bool = False,
+    ):
+        """
+        :param max_retries: (int) Maximum number of retries of a single call
+        :param backoff_factor: (float) Base of the exponential backoff in seconds: factor * 2 ** attempt
+        :param max_backoff: (float) Maximum seconds to wait between two attempts
+        :param jitter: (bool) When True, wait a random time between 0 and the exponential backoff
+        :param retry_budget: (float) Maximum seconds this policy may spend waiting across all calls. None for no limit
+        :param throttle_statuses: (list) Status codes retried for any method. Default [429]
+        :param server_error_statuses: (list) Status codes retried for idempotent methods. Default [502, 503, 504]
+        :param retry_non_idempotent: (bool) When True, also retry POST and PATCH on server and connection errors
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_budget = retry_budget
+        self.throttle_statuses = throttle_statuses or [429]
+        self.server_error_statuses = server_error_statuses or [502, 503, 504]
+        self.retry_non_idempotent = retry_non_idempotent
+        self.retries = 0
+        self.wait_seconds = 0.0
+        self.retries_by_status = {}
+        self.budget_exhausted = 0
+        self._lock = threading.Lock()
+
+    def backoff(
+        self,
+        attempt: int,
+    ) -> float:
+        """
+        Method to compute the exponential backoff of an attempt
+
+        :param attempt: (int) Number of retries already made for the call
+
+        :return: (float) Seconds
+        """
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** attempt)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+
+        return delay
+
+    def next_delay(
+        self,
+        method: str,
+        attempt: int,
+        response: requests.Response = None,
+        error: Exception = None,
+    ) -> float:
+        """
+        Method to decide whether a call must be retried and how long to wait before it. When it returns a delay, the
+        wait is counted in the statistics of this policy.
+
+        :param method: (str) HTTP method
+        :param attempt: (int) Number of retries already made for the call
+        :param response: (requests.Response Object) Response of the last attempt
+        :param error: (Exception) Connection error of the last attempt, when there is no response
+
+        :return: (float) Seconds to wait before the next attempt, or None if the call must not be retried
+        """
+        if attempt >= self.max_retries:
+            return None
+        idempotent = method.upper() in IDEMPOTENT_METHODS or self.retry_non_idempotent
+        if response is not None:
+            status = response.status_code
+            if status in self.throttle_statuses:
+                pass
+            elif status in self.server_error_statuses and idempotent:
+                pass
+            else:
+                return None
+            delay = self.backoff(attempt)
+            retry_after = _retry_after(response)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            key = status
+        elif error is not None and idempotent:
+            delay = self.backoff(attempt)
+            key = type(error).__name__
+        else:
+            return None
+
+        with self._lock:
+            if self.retry_budget is not None and self.wait_seconds + delay > self.retry_budget:
+                self.budget_exhausted += 1
+                logger.warning(f"Retry budget of {self.retry_budget}s exhausted, not retrying {method} ({key})")
+                return None
+            self.retries += 1
+            self.wait_seconds += delay
+            self.retries_by_status[key] = self.retries_by_status.get(key, 0) + 1
+
+        return delay
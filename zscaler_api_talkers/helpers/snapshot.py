@@ -0,0 +1,264 @@
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import appdirs
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+# Returned by SnapshotStore._read when the collection must be fetched, as None is a valid result to serve
+_MISSING = object()
+
+
+class SnapshotStore(object):
+    """
+    Local SQLite snapshot of tenant collections, i.e. the results of list_* methods, with the time they were fetched.
+    A collection is served from the file while it is younger than its TTL and was not invalidated, and fetched again
+    otherwise. With ZIA, sync_audit_log() invalidates only the collections the audit log shows changed, so long TTLs
+    are safe and read-only scripts start from the file instead of paginating the API.
+
+    The file can be shared by processes. Collections are keyed by tenant, so one file can hold several tenants.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        ttl: float = 3600,
+        ttls: dict = None,
+    ):
+        """
+        :param path: (str) Path of the SQLite file. Default is snapshots.sqlite in the user cache directory
+        :param ttl: (float) Seconds a collection is served for
+        :param ttls: (dict) Optional collection: seconds, overriding ttl, e.g. {"list_users": 600}
+        """
+        self.path = path or os.path.join(appdirs.user_cache_dir("zscaler_api_talkers"), "snapshots.sqlite")
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS collections "
+                "(tenant TEXT, name TEXT, fetched_at REAL, is_list INTEGER, PRIMARY KEY (tenant, name))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS objects (tenant TEXT, name TEXT, position INTEGER, data TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS objects_collection ON objects (tenant, name, position)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state (tenant TEXT, key TEXT, value REAL, PRIMARY KEY (tenant, key))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _name(
+        collection: str,
+        kwargs: dict,
+    ) -> str:
+        # Parameters change the results, so each set of parameters is a collection of its own
+        if not kwargs:
+            return collection
+
+        return f"{collection}{json.dumps(kwargs, sort_keys=True)}"
+
+    def fetched_at(
+        self,
+        tenant: str,
+        collection: str,
+        **kwargs,
+    ) -> float:
+        """
+        Method to get when a collection was fetched
+
+        :param tenant: (str) Tenant identifier, the tenant attribute of the talker
+        :param collection: (str) Name of the list method, e.g. "list_users"
+        :param kwargs: Parameters of the list method
+
+        :return: (float) Epoch, or None if the collection is not in the snapshot
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT fetched_at FROM collections WHERE tenant = ? AND name = ?",
+                (tenant, self._name(collection, kwargs)),
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def _read(
+        self,
+        tenant: str,
+        name: str,
+        max_age: float,
+    ):
+        """
+        Internal method to read a collection that is in the snapshot and not expired
+
+        :return: (json) Stored result, or _MISSING
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT fetched_at, is_list FROM collections WHERE tenant = ? AND name = ?",
+                (tenant, name),
+            ).fetchone()
+            if row is None or time.time() - row[0] >= max_age:
+                return _MISSING
+            rows = conn.execute(
+                "SELECT data FROM objects WHERE tenant = ? AND name = ? ORDER BY position",
+                (tenant, name),
+            ).fetchall()
+        items = [json.loads(data) for data, in rows]
+        if not row[1]:
+            return items[0] if items else None
+
+        return items
+
+    def _write(
+        self,
+        tenant: str,
+        name: str,
+        result,
+        fetched_at: float,
+    ):
+        is_list = isinstance(result, list)
+        items = result if is_list else [result]
+        with self._connect() as conn:
+            conn.execute("DELETE FROM objects WHERE tenant = ? AND name = ?", (tenant, name))
+            conn.executemany(
+                "INSERT INTO objects (tenant, name, position, data) VALUES (?, ?, ?, ?)",
+                ((tenant, name, position, json.dumps(item)) for position, item in enumerate(items)),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO collections (tenant, name, fetched_at, is_list) VALUES (?, ?, ?, ?)",
+                (tenant, name, fetched_at, int(is_list)),
+            )
+
+    def get(
+        self,
+        talker: object,
+        collection: str,
+        max_age: float = None,
+        **kwargs,
+    ):
+        """
+        Method to get a collection from the snapshot, fetching it with the talker when missing, expired or
+        invalidated
+
+        :param talker: (object) ZiaTalker, ZpaTalker, ClientConnectorTalker or CloudConnectorTalker
+        :param collection: (str) Name of the list method, e.g. "list_users"
+        :param max_age: (float) Optional seconds overriding the TTL of the collection. 0 to always fetch
+        :param kwargs: Parameters of the list method
+
+        :return: (json) Result of the list method
+        """
+        name = self._name(collection, kwargs)
+        if max_age is None:
+            max_age = self.ttls.get(collection, self.ttl)
+        result = self._read(talker.tenant, name, max_age)
+        if result is not _MISSING:
+            return result
+        fetched_at = time.time()
+        result = getattr(talker, collection)(**kwargs)
+        self._write(talker.tenant, name, result, fetched_at)
+        logger.debug(f"Fetched {collection} of {talker.tenant} into {self.path}")
+
+        return result
+
+    def get_many(
+        self,
+        talker: object,
+        collections: list,
+        concurrency: int = 4,
+    ) -> dict:
+        """
+        Method to get several collections, the expired ones being fetched at the same time
+
+        :param talker: (object) ZiaTalker, ZpaTalker, ClientConnectorTalker or CloudConnectorTalker
+        :param collections: (list) Names of list methods, called without parameters
+        :param concurrency: (int) Maximum number of collections fetched at the same time
+
+        :return: (dict) collection: result
+        """
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            results = executor.map(lambda collection: self.get(talker, collection), collections)
+
+            return dict(zip(collections, results))
+
+    def invalidate(
+        self,
+        tenant: str,
+        collections: list = None,
+    ):
+        """
+        Method to mark collections to be fetched again at their next use
+
+        :param tenant: (str) Tenant identifier, the tenant attribute of the talker
+        :param collections: (list) Names of list methods, with any parameters. None for all the collections
+        """
+        with self._connect() as conn:
+            if collections is None:
+                conn.execute("UPDATE collections SET fetched_at = 0 WHERE tenant = ?", (tenant,))
+                return
+            for collection in collections:
+                conn.execute(
+                    "UPDATE collections SET fetched_at = 0 WHERE tenant = ? AND (name = ? OR name LIKE ?)",
+                    (tenant, collection, f"{collection}{{%"),
+                )
+
+    def sync_audit_log(
+        self,
+        talker: object,
+        timeout: float = 300,
+    ) -> set:
+        """
+        Method to invalidate the collections changed since the last sync, according to the audit log. The first
+        sync of a tenant only records the time. Only talkers with changed_collections(), i.e. ZiaTalker, are supported.
+
+        :param talker: (ZiaTalker) Authenticated talker
+        :param timeout: (float) Seconds to wait for the audit log report
+
+        :return: (set) Collections invalidated. None when all of them were
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM state WHERE tenant = ? AND key = 'audit_log'",
+                (talker.tenant,),
+            ).fetchone()
+        changed = set()
+        if row is not None:
+            changed = talker.changed_collections(start_time=row[0], end_time=now, timeout=timeout)
+            self.invalidate(talker.tenant, None if changed is None else sorted(changed))
+            logger.info(f"Audit log of {talker.tenant}: invalidated {'all' if changed is None else sorted(changed)}")
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO state (tenant, key, value) VALUES (?, 'audit_log', ?)",
+                (talker.tenant, now),
+            )
+
+        return changed
+
+    def clear(
+        self,
+        tenant: str = None,
+    ):
+        """
+        Method to delete the snapshot of a tenant, or of all tenants
+
+        :param tenant: (str) Tenant identifier. None for all
+        """
+        with self._connect() as conn:
+            for table in ("collections", "objects", "state"):
+                if tenant is None:
+                    conn.execute(f"DELETE FROM {table}")
+                else:
+                    conn.execute(f"DELETE FROM {table} WHERE tenant = ?", (tenant,))
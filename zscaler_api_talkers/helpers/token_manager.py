@@ -0,0 +1,191 @@
+import threading
+import time
+
+from .logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+
+class TokenManager(object):
+    """
+    Keeps the session or token of a talker valid. HttpCalls asks it before each call whether the credential is about
+    to expire, in which case it is refreshed in a background thread, or has expired, in which case the call waits for
+    the refresh. After a 401 the call is retried once with a new credential.
+
+    Refreshes are single flight: concurrent calls holding the same stale credential wait on one login, and a call
+    that finds the credential already replaced reuses the new one instead of logging in again.
+    """
+
+    def __init__(
+        self,
+        login,
+        target: object,
+        attribute: str,
+        kwarg: str,
+        credential_cache: object = None,
+        cloud: str = None,
+        user: str = None,
+        refresh_margin: float = 300,
+        background: bool = True,
+    ):
+        """
+        :param login: (callable) Called without parameters, returns (credential, epoch of expiry)
+        :param target: (object) Talker whose attribute holds the credential
+        :param attribute: (str) Name of that attribute, e.g. "header" or "cookies"
+        :param kwarg: (str) Option of the HTTP calls the credential is sent in, "headers" or "cookies"
+        :param credential_cache: (CredentialCache) Optional cache shared with other talkers and processes
+        :param cloud: (str) API base url, key of the credential cache
+        :param user: (str) Username or client id, key of the credential cache
+        :param refresh_margin: (float) Seconds before expiry from which the credential is refreshed in the background
+        :param background: (bool) False to refresh only once expired or rejected with a 401
+        """
+        self._login = login
+        self.target = target
+        self.attribute = attribute
+        self.kwarg = kwarg
+        self.credential_cache = credential_cache
+        self.cloud = cloud
+        self.user = user
+        self.refresh_margin = refresh_margin
+        self.background = background
+        self.credential = None
+        self.expires_at = None
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._local = threading.local()
+
+    def refresh(
+        self,
+        stale: dict = None,
+    ) -> dict:
+        """
+        Method to log in again, unless the credential was already replaced since stale was read
+
+        :param stale: (dict) Credential known to be expired or rejected. None to force a login
+
+        :return: (dict) Current credential
+        """
+        with self._lock:
+            if stale is not None and self.credential is not None and stale != self.credential:
+                return self.credential
+            # The login call itself goes through HttpCalls and may carry the stale credential in shared headers
+            self._local.logging_in = True
+            try:
+                if self.credential_cache:
+                    credential, expires_at = self.credential_cache.login(
+                        self.cloud,
+                        self.user,
+                        self._login,
+                        stale=stale,
+                    )
+                else:
+                    credential, expires_at = self._login()
+            finally:
+                self._local.logging_in = False
+            if self.credential is not None:
+                self.refreshes += 1
+                logger.info(f"Refreshed credential of {self.user}, valid until {time.ctime(expires_at)}")
+            self.credential = credential
+            self.expires_at = expires_at
+            setattr(self.target, self.attribute, credential)
+
+        return credential
+
+    def _background_refresh(
+        self,
+        stale: dict,
+    ):
+        try:
+            self.refresh(stale=stale)
+        except Exception as e:
+            logger.warning(f"Background refresh of the credential of {self.user} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _start_refresh(self) -> bool:
+        """
+        Internal method to claim the background refresh, checked and set under the lock so only one thread starts it
+
+        :return: (bool) True if the caller must start the refresh
+        """
+        # A held lock means a login is in flight: the call goes on with its credential instead of waiting for it
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            return True
+        finally:
+            self._lock.release()
+
+    def _sent(
+        self,
+        kwargs: dict,
+    ) -> dict:
+        """
+        Internal method to find the credential a call is sending
+
+        :param kwargs: (dict) Options of the call
+
+        :return: (dict) Credential, or None when the call does not authenticate with it, e.g. the login call
+        """
+        if getattr(self._local, "logging_in", False):
+            return None
+        sent = kwargs.get(self.kwarg)
+        if not sent or not self.credential or any(key not in sent for key in self.credential):
+            return None
+
+        return {key: sent[key] for key in self.credential}
+
+    def _swap(
+        self,
+        kwargs: dict,
+        credential: dict,
+    ):
+        kwargs[self.kwarg] = {**kwargs[self.kwarg], **credential}
+
+    def before_request(
+        self,
+        kwargs: dict,
+    ):
+        """
+        Method called by HttpCalls before each attempt of a call. Swaps in the call a credential replaced since the
+        call was built, refreshes an expired credential, or starts a background refresh when the credential expires
+        within refresh_margin.
+
+        :param kwargs: (dict) Options of the call, updated in place
+        """
+        sent = self._sent(kwargs)
+        if sent is None or self.expires_at is None:
+            return
+        if sent != self.credential:
+            self._swap(kwargs, self.credential)
+            sent = self.credential
+        remaining = self.expires_at - time.time()
+        if remaining <= 0:
+            self._swap(kwargs, self.refresh(stale=sent))
+        elif self.background and remaining <= self.refresh_margin and self._start_refresh():
+            threading.Thread(target=self._background_refresh, args=(sent,), daemon=True).start()
+
+    def after_unauthorized(
+        self,
+        kwargs: dict,
+    ) -> bool:
+        """
+        Method called by HttpCalls when a call returned 401. Logs in again, or reuses a credential refreshed
+        meanwhile, and swaps it in the call.
+
+        :param kwargs: (dict) Options of the call, updated in place
+
+        :return: (bool) True if the call must be retried
+        """
+        sent = self._sent(kwargs)
+        if sent is None:
+            return False
+        logger.info(f"Credential of {self.user} was rejected, logging in again")
+        self._swap(kwargs, self.refresh(stale=sent))
+
+        return True
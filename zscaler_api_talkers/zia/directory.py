@@ -0,0 +1,364 @@
+from zscaler_api_talkers.helpers.logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+
+class UserRecord(object):
+    """
+    User of a ZiaDirectory
+    """
+
+    __slots__ = ("id", "name", "email", "department_id", "group_ids", "admin_user", "comments")
+
+    def __init__(
+        self,
+        user: dict,
+    ):
+        """
+        :param user: (json) User as returned by list_users
+        """
+        self.id = user["id"]
+        self.name = user.get("name")
+        self.email = user.get("email")
+        self.department_id = (user.get("department") or {}).get("id")
+        self.group_ids = tuple(group["id"] for group in user.get("groups") or [])
+        self.admin_user = user.get("adminUser", False)
+        self.comments = user.get("comments")
+
+    def ref(self) -> dict:
+        """
+        :return: (dict) Name-ID pair, as expected by the rule methods
+        """
+        return {"id": self.id, "name": self.name}
+
+    def __repr__(self) -> str:
+        return f"UserRecord(id={self.id}, email={self.email!r})"
+
+
+class GroupRecord(object):
+    """
+    Group or department of a ZiaDirectory
+    """
+
+    __slots__ = ("id", "name", "idp_id", "comments")
+
+    def __init__(
+        self,
+        group: dict,
+    ):
+        """
+        :param group: (json) Group or department as returned by list_groups or list_departments
+        """
+        self.id = group["id"]
+        self.name = group.get("name")
+        self.idp_id = group.get("idpId")
+        self.comments = group.get("comments")
+
+    def ref(self) -> dict:
+        """
+        :return: (dict) Name-ID pair, as expected by the rule methods
+        """
+        return {"id": self.id, "name": self.name}
+
+    def __repr__(self) -> str:
+        return f"GroupRecord(id={self.id}, name={self.name!r})"
+
+
+class ZiaDirectory(object):
+    """
+    In-memory directory of the users, groups and departments of a ZIA tenant. Users are indexed by id, email and
+    name, groups and departments by id and name, and the members of each group and department are kept in inverted
+    indexes, so lookups take constant time instead of one API call or a scan of the users each. Records use
+    __slots__ to keep large tenants small in memory.
+
+    The directory is built from the streamed list results and kept current with upsert_* and remove_*.
+    Emails are matched case insensitively, names exactly.
+    """
+
+    def __init__(self):
+        self.users = {}
+        self.groups = {}
+        self.departments = {}
+        self._users_by_email = {}
+        self._users_by_name = {}
+        self._groups_by_name = {}
+        self._departments_by_name = {}
+        self._group_members = {}
+        self._department_members = {}
+
+    @classmethod
+    def from_talker(
+        cls,
+        talker: object,
+        page_size: int = None,
+    ):
+        """
+        Method to build the directory of a tenant, page by page
+
+        :param talker: (ZiaTalker) Authenticated talker
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (ZiaDirectory)
+        """
+        directory = cls()
+        for department in talker.iter_departments(page_size=page_size):
+            directory.upsert_department(department)
+        for group in talker.iter_groups(page_size=page_size):
+            directory.upsert_group(group)
+        for user in talker.iter_users(page_size=page_size):
+            directory.upsert_user(user)
+        logger.info(
+            f"Loaded {len(directory.users)} users, {len(directory.groups)} groups and "
+            f"{len(directory.departments)} departments of {talker.tenant}"
+        )
+
+        return directory
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    # Incremental updates
+
+    def upsert_user(
+        self,
+        user: dict,
+    ) -> UserRecord:
+        """
+        Method to add a user, or replace it if its id is known
+
+        :param user: (json) User as returned by list_users or add_users
+
+        :return: (UserRecord)
+        """
+        self.remove_user(user["id"])
+        record = UserRecord(user)
+        self.users[record.id] = record
+        if record.email:
+            self._users_by_email[record.email.lower()] = record
+        self._users_by_name.setdefault(record.name, set()).add(record.id)
+        for group_id in record.group_ids:
+            self._group_members.setdefault(group_id, set()).add(record.id)
+        if record.department_id is not None:
+            self._department_members.setdefault(record.department_id, set()).add(record.id)
+
+        return record
+
+    def remove_user(
+        self,
+        user_id: int,
+    ):
+        """
+        Method to remove a user, if known
+
+        :param user_id: (int) User ID
+        """
+        record = self.users.pop(user_id, None)
+        if record is None:
+            return
+        if record.email and self._users_by_email.get(record.email.lower()) is record:
+            del self._users_by_email[record.email.lower()]
+        self._discard(self._users_by_name, record.name, user_id)
+        for group_id in record.group_ids:
+            self._discard(self._group_members, group_id, user_id)
+        self._discard(self._department_members, record.department_id, user_id)
+
+    def upsert_group(
+        self,
+        group: dict,
+    ) -> GroupRecord:
+        """
+        Method to add a group, or replace it if its id is known. Members are kept.
+
+        :param group: (json) Group as returned by list_groups
+
+        :return: (GroupRecord)
+        """
+        return self._upsert(self.groups, self._groups_by_name, group)
+
+    def remove_group(
+        self,
+        group_id: int,
+    ):
+        """
+        Method to remove a group, if known. Its members stay in the directory.
+
+        :param group_id: (int) Group ID
+        """
+        self._remove(self.groups, self._groups_by_name, group_id)
+        self._group_members.pop(group_id, None)
+
+    def upsert_department(
+        self,
+        department: dict,
+    ) -> GroupRecord:
+        """
+        Method to add a department, or replace it if its id is known. Members are kept.
+
+        :param department: (json) Department as returned by list_departments
+
+        :return: (GroupRecord)
+        """
+        return self._upsert(self.departments, self._departments_by_name, department)
+
+    def remove_department(
+        self,
+        department_id: int,
+    ):
+        """
+        Method to remove a department, if known. Its members stay in the directory.
+
+        :param department_id: (int) Department ID
+        """
+        self._remove(self.departments, self._departments_by_name, department_id)
+        self._department_members.pop(department_id, None)
+
+    @staticmethod
+    def _discard(
+        index: dict,
+        key,
+        value,
+    ):
+        values = index.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del index[key]
+
+    @staticmethod
+    def _upsert(
+        by_id: dict,
+        by_name: dict,
+        item: dict,
+    ) -> GroupRecord:
+        previous = by_id.get(item["id"])
+        if previous is not None and by_name.get(previous.name) is previous:
+            del by_name[previous.name]
+        record = GroupRecord(item)
+        by_id[record.id] = record
+        by_name[record.name] = record
+
+        return record
+
+    @staticmethod
+    def _remove(
+        by_id: dict,
+        by_name: dict,
+        item_id: int,
+    ):
+        record = by_id.pop(item_id, None)
+        if record is not None and by_name.get(record.name) is record:
+            del by_name[record.name]
+
+    # Lookups
+
+    def user(
+        self,
+        user_id: int = None,
+        email: str = None,
+    ) -> UserRecord:
+        """
+        Method to find a user by id or email
+
+        :param user_id: (int) User ID
+        :param email: (str) Email address, any case
+
+        :return: (UserRecord) None if not found
+        """
+        if user_id is not None:
+            return self.users.get(user_id)
+        if email is not None:
+            return self._users_by_email.get(email.lower())
+        raise ValueError("user_id or email is required")
+
+    def users_named(
+        self,
+        name: str,
+    ) -> list:
+        """
+        Method to find the users with a name. Names are not unique.
+
+        :param name: (str) User name
+
+        :return: (list) UserRecords
+        """
+        return [self.users[user_id] for user_id in self._users_by_name.get(name, ())]
+
+    def group(
+        self,
+        group_id: int = None,
+        name: str = None,
+    ) -> GroupRecord:
+        """
+        Method to find a group by id or name
+
+        :param group_id: (int) Group ID
+        :param name: (str) Group name
+
+        :return: (GroupRecord) None if not found
+        """
+        if group_id is not None:
+            return self.groups.get(group_id)
+        if name is not None:
+            return self._groups_by_name.get(name)
+        raise ValueError("group_id or name is required")
+
+    def department(
+        self,
+        department_id: int = None,
+        name: str = None,
+    ) -> GroupRecord:
+        """
+        Method to find a department by id or name
+
+        :param department_id: (int) Department ID
+        :param name: (str) Department name
+
+        :return: (GroupRecord) None if not found
+        """
+        if department_id is not None:
+            return self.departments.get(department_id)
+        if name is not None:
+            return self._departments_by_name.get(name)
+        raise ValueError("department_id or name is required")
+
+    def group_members(
+        self,
+        group_id: int = None,
+        name: str = None,
+    ) -> list:
+        """
+        Method to list the users of a group
+
+        :param group_id: (int) Group ID
+        :param name: (str) Group name, if group_id is not given
+
+        :return: (list) UserRecords
+        """
+        if group_id is None:
+            group = self.group(name=name)
+            if group is None:
+                return []
+            group_id = group.id
+
+        return [self.users[user_id] for user_id in self._group_members.get(group_id, ())]
+
+    def department_members(
+        self,
+        department_id: int = None,
+        name: str = None,
+    ) -> list:
+        """
+        Method to list the users of a department
+
+        :param department_id: (int) Department ID
+        :param name: (str) Department name, if department_id is not given
+
+        :return: (list) UserRecords
+        """
+        if department_id is None:
+            department = self.department(name=name)
+            if department is None:
+                return []
+            department_id = department.id
+
+        return [self.users[user_id] for user_id in self._department_members.get(department_id, ())]
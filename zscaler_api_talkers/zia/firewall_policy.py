@@ -0,0 +1,344 @@
+from zscaler_api_talkers.helpers.intervals import BitIndex, IntervalIndex, IntervalSet, address_range, address_value
+from zscaler_api_talkers.helpers.logger import setup_logger
+from zscaler_api_talkers.zia.helpers import _ids
+
+logger = setup_logger(name=__name__)
+
+PROTOCOLS = {1: "ICMP", 6: "TCP", 17: "UDP"}
+
+
+def _port_ranges(
+    ports: list,
+) -> list:
+    """
+    Internal method to convert the port ranges of a network service, an end of 0 or missing meaning a single port
+    """
+    return [(port["start"], port.get("end") or port["start"]) for port in ports or []]
+
+
+class _AddressMatcher(object):
+    """
+    Rules matching destination or source addresses: IP addresses, CIDRs and ranges in an interval index, FQDNs by
+    name and wildcard domains by suffix, IP categories and countries by value
+    """
+
+    def __init__(self):
+        self.any = 0
+        # The interval index carries one bit per distinct list of IP addresses, mapped to the rules using the list:
+        # rules sharing IP groups share their intervals
+        self.ips = IntervalIndex()
+        self.ip_lists = {}
+        self.ip_list_rules = []
+        # address: interval, each address being parsed once however many rules use its group
+        self.ranges = {}
+        self.hosts = {}
+        self.domains = {}
+        self.categories = {}
+        self.countries = {}
+
+    @staticmethod
+    def _add_to(
+        index: dict,
+        key,
+        bit: int,
+    ):
+        index[key] = index.get(key, 0) | bit
+
+    def add(
+        self,
+        position: int,
+        addresses: list,
+        domains: list = (),
+        categories: list = (),
+        countries: list = (),
+    ):
+        bit = 1 << position
+        if not (addresses or domains or categories or countries):
+            self.any |= bit
+            return
+        intervals = {}
+        for address in addresses:
+            if address not in self.ranges:
+                self.ranges[address] = address_range(address)
+            interval = self.ranges[address]
+            if interval is not None:
+                intervals[address] = interval
+            elif address.startswith("*.") or address.startswith("."):
+                self._add_to(self.domains, address.lstrip("*.").lower(), bit)
+            else:
+                self._add_to(self.hosts, address.lower(), bit)
+        if intervals:
+            ip_list = tuple(sorted(intervals))
+            if ip_list not in self.ip_lists:
+                self.ip_lists[ip_list] = len(self.ip_list_rules)
+                self.ip_list_rules.append(0)
+                for interval in set(intervals.values()):
+                    self.ips.add(*interval, 1 << self.ip_lists[ip_list])
+            self.ip_list_rules[self.ip_lists[ip_list]] |= bit
+        for domain in domains:
+            self._add_to(self.domains, domain.lstrip("*.").lower(), bit)
+        for category in categories:
+            self._add_to(self.categories, category, bit)
+        for country in countries:
+            self._add_to(self.countries, country, bit)
+
+    def match(
+        self,
+        ip: str = None,
+        host: str = None,
+        categories: list = None,
+        country: str = None,
+    ) -> int:
+        matched = self.any
+        if ip:
+            ip_lists = self.ips.match(address_value(ip))
+            while ip_lists:
+                list_bit = ip_lists & -ip_lists
+                ip_lists ^= list_bit
+                matched |= self.ip_list_rules[list_bit.bit_length() - 1]
+        if host:
+            host = host.lower().rstrip(".")
+            matched |= self.hosts.get(host, 0)
+            labels = host.split(".")
+            for i in range(len(labels)):
+                matched |= self.domains.get(".".join(labels[i:]), 0)
+        for category in categories or ():
+            matched |= self.categories.get(category, 0)
+        if country:
+            matched |= self.countries.get(country, 0)
+
+        return matched
+
+
+class FirewallPolicyEngine(object):
+    """
+    Offline evaluation of the firewall filtering policy, to replay flows against a rule set before it is activated.
+
+    Enabled rules are compiled in evaluation order into bit sets: source and destination addresses, with the IP
+    groups expanded, in interval indexes searched in logarithmic time, FQDNs and wildcard domains by name, network
+    services by protocol and port range, and locations and identities by value. As in ZIA, a rule applies to a user
+    matching any of its users, groups or departments, and to a location matching any of its locations or location
+    groups. A flow matches the rules in the intersection of the bit sets of its values, and the first one is the
+    lowest bit, so each flow costs a few binary searches and dictionary lookups whatever the number of rules and
+    addresses. The default rule of the tenant is evaluated last, whatever its order.
+
+    Network applications and time windows are not known offline and are not evaluated. Network services without
+    TCP or UDP ports, such as ICMP_ANY, match the flows of the other protocols.
+    """
+
+    def __init__(
+        self,
+        rules: list,
+        ip_source_groups: list = None,
+        ip_destination_groups: list = None,
+        network_services: list = None,
+        network_service_groups: list = None,
+        directory: object = None,
+    ):
+        """
+        :param rules: (list) Firewall filtering rules, as returned by list_firewall_filtering_rules
+        :param ip_source_groups: (list) IP source groups, as returned by list_ip_source_groups
+        :param ip_destination_groups: (list) IP destination groups, as returned by list_ip_destination_groups
+        :param network_services: (list) Network services, as returned by list_network_services
+        :param network_service_groups: (list) Optional network service groups, each with its "services"
+        :param directory: (ZiaDirectory) Optional directory giving the groups and department of users
+        """
+        self.directory = directory
+        self._source_groups = {group["id"]: group for group in ip_source_groups or []}
+        self._destination_groups = {group["id"]: group for group in ip_destination_groups or []}
+        self._service_groups = {group["id"]: _ids(group.get("services")) for group in network_service_groups or []}
+        self._compile_services(network_services or [])
+        self._compile_rules(rules)
+
+    def _compile_services(
+        self,
+        services: list,
+    ):
+        self._service_positions = {}
+        self._service_ports = {"TCP": IntervalIndex(), "UDP": IntervalIndex()}
+        # position: {protocol: IntervalSet of source ports}, for the services restricting them
+        self._service_sources = {}
+        self._portless_services = 0
+        for position, service in enumerate(services):
+            self._service_positions[service["id"]] = position
+            bit = 1 << position
+            has_ports = False
+            for protocol in ("TCP", "UDP"):
+                name = protocol.capitalize()
+                destination = _port_ranges(service.get(f"dest{name}Ports"))
+                source = _port_ranges(service.get(f"src{name}Ports"))
+                if not (destination or source):
+                    continue
+                has_ports = True
+                for first, last in destination or [(0, 65535)]:
+                    self._service_ports[protocol].add(first, last, bit)
+                if source:
+                    self._service_sources.setdefault(position, {})[protocol] = IntervalSet(source)
+            if not has_ports:
+                self._portless_services |= bit
+
+    def _compile_rules(
+        self,
+        rules: list,
+    ):
+        self.rules = sorted(
+            (rule for rule in rules if rule.get("state", "ENABLED") == "ENABLED"),
+            key=lambda rule: (bool(rule.get("defaultRule")), rule.get("order", 0), rule.get("rank", 7)),
+        )
+        self._sources = _AddressMatcher()
+        self._destinations = _AddressMatcher()
+        self._indexes = {criterion: BitIndex() for criterion in ("locations", "identities")}
+        self._any_service = 0
+        self._service_rules = {}
+        for position, rule in enumerate(self.rules):
+            bit = 1 << position
+            sources = list(rule.get("srcIps") or [])
+            for group_id in _ids(rule.get("srcIpGroups")):
+                sources.extend(self._group(self._source_groups, group_id, rule).get("ipAddresses") or [])
+            self._sources.add(position, sources)
+            addresses, domains = list(rule.get("destAddresses") or []), []
+            categories = list(rule.get("destIpCategories") or [])
+            countries = list(rule.get("destCountries") or [])
+            for group_id in _ids(rule.get("destIpGroups")):
+                group = self._group(self._destination_groups, group_id, rule)
+                (domains if group.get("type") == "DSTN_DOMAIN" else addresses).extend(group.get("addresses") or [])
+                categories.extend(group.get("ipCategories") or [])
+                countries.extend(group.get("countries") or [])
+            self._destinations.add(position, addresses, domains, categories, countries)
+            service_ids = _ids(rule.get("nwServices"))
+            for group_id in _ids(rule.get("nwServiceGroups")):
+                service_ids.extend(self._group(self._service_groups, group_id, rule, default=[]))
+            if not (rule.get("nwServices") or rule.get("nwServiceGroups")):
+                self._any_service |= bit
+            for service_id in service_ids:
+                if service_id not in self._service_positions:
+                    logger.warning(f"Rule {rule.get('name')} uses the unknown network service {service_id}")
+                    continue
+                service_position = self._service_positions[service_id]
+                self._service_rules[service_position] = self._service_rules.get(service_position, 0) | bit
+            # Values of one family are tagged with their field, the rule matching any of them
+            self._indexes["locations"].add(
+                position,
+                [("location", i) for i in _ids(rule.get("locations"))]
+                + [("location_group", i) for i in _ids(rule.get("locationGroups"))],
+            )
+            self._indexes["identities"].add(
+                position,
+                [("user", i) for i in _ids(rule.get("users"))]
+                + [("group", i) for i in _ids(rule.get("groups"))]
+                + [("department", i) for i in _ids(rule.get("departments"))],
+            )
+        logger.debug(f"Compiled {len(self.rules)} firewall filtering rules")
+
+    @staticmethod
+    def _group(
+        groups: dict,
+        group_id: int,
+        rule: dict,
+        default=None,
+    ):
+        if group_id not in groups:
+            logger.warning(f"Rule {rule.get('name')} uses the unknown group {group_id}")
+            return {} if default is None else default
+
+        return groups[group_id]
+
+    def _match_services(
+        self,
+        protocol: str,
+        src_port: int = None,
+        dest_port: int = None,
+    ) -> int:
+        if protocol not in self._service_ports:
+            services = self._portless_services
+        elif dest_port is None:
+            services = 0
+        else:
+            services = self._service_ports[protocol].match(dest_port)
+        matched = self._any_service
+        while services:
+            bit = services & -services
+            services ^= bit
+            position = bit.bit_length() - 1
+            source = self._service_sources.get(position, {}).get(protocol)
+            if source is not None and (src_port is None or src_port not in source):
+                continue
+            matched |= self._service_rules.get(position, 0)
+
+        return matched
+
+    def evaluate(
+        self,
+        src_ip: str = None,
+        dest_ip: str = None,
+        protocol="TCP",
+        src_port: int = None,
+        dest_port: int = None,
+        dest_host: str = None,
+        dest_categories: list = None,
+        dest_country: str = None,
+        user: int = None,
+        groups: list = None,
+        department: int = None,
+        location: int = None,
+        location_groups: list = None,
+    ) -> dict:
+        """
+        Method to find the firewall filtering rule a flow matches
+
+        :param src_ip: (str) Source IP address
+        :param dest_ip: (str) Destination IP address
+        :param protocol: (str|int) TCP, UDP, ICMP... or the IP protocol number
+        :param src_port: (int) Source port
+        :param dest_port: (int) Destination port
+        :param dest_host: (str) Optional destination FQDN, for the rules on FQDNs and domains
+        :param dest_categories: (list) Optional IP categories of the destination, e.g. ["NEWS_AND_MEDIA"]
+        :param dest_country: (str) Optional country of the destination, e.g. "COUNTRY_US"
+        :param user: (int) User ID
+        :param groups: (list) Group IDs of the user. Default from the directory, if any
+        :param department: (int) Department ID of the user. Default from the directory, if any
+        :param location: (int) Location ID
+        :param location_groups: (list) Location group IDs of the location
+
+        :return: (json) First matching rule, None if no rule matches
+        """
+        if self.directory is not None and user is not None and (groups is None or department is None):
+            record = self.directory.user(user_id=user)
+            if record is not None:
+                groups = record.group_ids if groups is None else groups
+                department = record.department_id if department is None else department
+        protocol = PROTOCOLS.get(protocol, str(protocol)).upper()
+        places = [("location_group", i) for i in location_groups or ()]
+        if location is not None:
+            places.append(("location", location))
+        identities = [("group", i) for i in groups or ()]
+        if user is not None:
+            identities.append(("user", user))
+        if department is not None:
+            identities.append(("department", department))
+        matched = (
+            self._sources.match(ip=src_ip)
+            & self._destinations.match(ip=dest_ip, host=dest_host, categories=dest_categories, country=dest_country)
+            & self._match_services(protocol, src_port, dest_port)
+            & self._indexes["locations"].match(places)
+            & self._indexes["identities"].match(identities)
+        )
+        if not matched:
+            return None
+
+        return self.rules[(matched & -matched).bit_length() - 1]
+
+    def evaluate_many(
+        self,
+        flows,
+    ):
+        """
+        Generator of the rules matched by many flows
+
+        :param flows: (iterable) Dicts of the parameters of evaluate, e.g. {"src_ip": "10.0.0.1", "dest_ip":
+            "1.1.1.1", "protocol": "UDP", "dest_port": 53}
+
+        :return: (generator) (flow, matching rule or None)
+        """
+        for flow in flows:
+            yield flow, self.evaluate(**flow)
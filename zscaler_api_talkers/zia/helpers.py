@@ -53,3 +53,16 @@ def _get_seed(
             break
 
     return seed
+
+
+def _ids(
+    items: list,
+) -> list:
+    """
+    Internal method to get the IDs of name-ID pairs, or of plain IDs
+
+    :param items: (list) e.g. [{"id": 1234, "name": "Sales"}]
+
+    :return: (list) e.g. [1234]
+    """
+    return [item["id"] if isinstance(item, dict) else item for item in items or []]
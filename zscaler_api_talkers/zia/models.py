@@ -720,3 +720,34 @@ valid_countries = [
     "COUNTRY_BL",
     "COUNTRY_MF",
 ]
+
+# Keywords of the audit log categories and sub-categories, upper case with underscores, and the list methods whose
+# results change with them
+audit_log_collections = [
+    ("USER", ["list_users", "list_groups", "list_departments"]),
+    ("GROUP", ["list_groups"]),
+    ("DEPARTMENT", ["list_departments"]),
+    ("ADMIN", ["list_admin_users", "list_admin_roles"]),
+    ("ROLE", ["list_admin_roles"]),
+    ("LOCATION", ["list_locations", "list_sublocations", "list_locations_groups"]),
+    ("URL_CATEGOR", ["list_url_categories", "list_url_categories_lite", "list_url_categories_url_quota"]),
+    ("URL_FILTERING", ["list_url_filtering_rules"]),
+    ("FIREWALL", ["list_firewall_filtering_rules"]),
+    ("IP_SOURCE", ["list_ip_source_groups", "list_ip_source_groups_lite"]),
+    ("IP_DESTINATION", ["list_ip_destination_groups", "list_ip_destination_groups_lite"]),
+    ("NETWORK_SERVICE", ["list_network_services", "list_network_services_lite"]),
+    ("DLP", ["list_dlp_dictionaries", "list_dlp_dictionaries_lite", "list_dlp_engines", "list_web_dlp_rules"]),
+    ("NOTIFICATION", ["list_dlp_notification_templates"]),
+    ("ICAP", ["list_icap_server"]),
+    ("IDM", ["list_idm_profile"]),
+    ("GRE", ["list_gre_tunnels"]),
+    ("VPN", ["list_vpn_credentials"]),
+    ("STATIC_IP", ["list_static_ip"]),
+    ("SECURITY", ["list_security_whitelisted_urls", "list_security_blacklisted_urls"]),
+    ("ADVANCED", ["list_exempted_urls"]),
+    ("RULE_LABEL", ["list_rule_labels"]),
+    ("DEVICE", ["list_devices", "list_devices_groups"]),
+]
+
+# Audit log actions that do not change the configuration
+audit_log_read_actions = ["SIGN_IN", "SIGN_OUT", "LOGIN", "LOGOUT", "ACTIVATE", "DOWNLOAD", "REPORT"]
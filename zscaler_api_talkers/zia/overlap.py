@@ -0,0 +1,289 @@
+from zscaler_api_talkers.helpers.domain_trie import DomainTrie
+from zscaler_api_talkers.helpers.intervals import IntervalSet, address_range
+from zscaler_api_talkers.helpers.logger import setup_logger
+from zscaler_api_talkers.helpers.lookup_cache import normalize_url
+
+logger = setup_logger(name=__name__)
+
+# URL fields of a category, both counting against the URL quota
+URL_FIELDS = ("urls", "dbCategorizedUrls")
+# Types of the IP destination groups holding FQDNs and domains, e.g. "www.example.com" and "*.example.com". DSTN_IP
+# groups hold addresses, CIDRs and ranges, DSTN_OTHER groups countries and categories only
+DOMAIN_GROUP_TYPES = ("DSTN_FQDN", "DSTN_DOMAIN")
+
+
+def _url_pattern(
+    entry: str,
+) -> tuple:
+    """
+    Internal method to split a custom URL into a domain pattern and a path
+
+    :param entry: (str) e.g. ".example.com/docs"
+
+    :return: (tuple) e.g. (".example.com", "/docs")
+    """
+    entry = entry.strip().lower()
+    wildcard = entry.startswith(".")
+    host, separator, path = normalize_url(entry.lstrip(".")).partition("/")
+
+    return f".{host}" if wildcard else host, f"/{path.rstrip('/')}" if separator else ""
+
+
+def _path_prefixes(
+    path: str,
+) -> list:
+    """
+    Internal method to get the paths covering a path, e.g. ["", "/a"] for "/a/b"
+    """
+    parts = path.split("/")
+
+    return ["/".join(parts[:i]) for i in range(1, len(parts))]
+
+
+def _finding(
+    kind: str,
+    entry: tuple,
+    by: tuple,
+) -> dict:
+    return {
+        "type": kind,
+        "owner": entry[0],
+        "entry": entry[1],
+        "by_owner": by[0],
+        "by_entry": by[1],
+        "same_owner": entry[0] == by[0],
+    }
+
+
+def _pick(
+    owner,
+    candidates: list,
+) -> tuple:
+    """
+    Internal method to pick the candidate of the same owner if any, else the first one
+    """
+    for candidate in candidates:
+        if candidate[0] == owner:
+            return candidate
+
+    return candidates[0] if candidates else None
+
+
+def _domain_findings(
+    patterns: dict,
+) -> list:
+    """
+    Internal method to find the duplicate and covered entries of domain patterns, in a DomainTrie so that each
+    pattern only visits its parent domains
+
+    :param patterns: (dict) Domain pattern: list of (owner, path, entry)
+
+    :return: (list) One finding per redundant entry, a same-owner cause preferred
+    """
+    # Only wildcard patterns cover others
+    trie = DomainTrie()
+    for pattern in patterns:
+        if pattern.startswith(".") or pattern.startswith("*."):
+            trie.add(pattern, pattern)
+    findings = []
+    for pattern, entries in patterns.items():
+        by_path = {}
+        for owner, path, entry in entries:
+            by_path.setdefault(path, []).append((owner, entry))
+        broader = [
+            (owner, entry)
+            for covering_pattern, _ in (trie.covering(pattern) if len(trie) else ())
+            for owner, path, entry in patterns[covering_pattern]
+            if not path
+        ]
+        for path, holders in by_path.items():
+            coverers = [holder for prefix in _path_prefixes(path) for holder in by_path.get(prefix, ())] + broader
+            for position, holder in enumerate(holders):
+                covered_by = _pick(holder[0], coverers)
+                duplicate_of = _pick(holder[0], holders[:position])
+                if covered_by and (covered_by[0] == holder[0] or not duplicate_of or duplicate_of[0] != holder[0]):
+                    findings.append(_finding("covered", holder, covered_by))
+                elif duplicate_of:
+                    findings.append(_finding("duplicate", holder, duplicate_of))
+
+    return findings
+
+
+class OverlapAnalyzer(object):
+    """
+    Finds the redundant entries of custom URL categories and IP destination groups, to reclaim URL quota and keep
+    groups small:
+      - duplicate URLs, in one category or across categories
+      - URLs covered by a broader entry, a wildcard such as ".example.com" or a shorter path
+      - IP addresses, CIDRs and ranges duplicated, covered or overlapped by others, in one group or across groups
+      - FQDNs and domains duplicated or covered by a wildcard
+      - IP entries that merging into ranges would save
+
+    Wildcard domains are indexed in a DomainTrie and IP ranges swept in sorted order, so the cost grows with n log n
+    entries, about ten seconds per million entries, instead of comparing every pair. Each redundant entry is
+    reported once, with the entry it is redundant with, preferably of the same category or group. Only the
+    redundancies within one category or group are reclaimable without changing how URLs and addresses are
+    classified.
+    """
+
+    def __init__(
+        self,
+        url_categories: list = None,
+        ip_destination_groups: list = None,
+        url_quota: dict = None,
+    ):
+        """
+        :param url_categories: (list) URL categories, as returned by list_url_categories
+        :param ip_destination_groups: (list) IP destination groups of all types, as returned by
+            list_ip_destination_groups. Each group needs its "type" for its FQDNs and domains to be analyzed
+        :param url_quota: (dict) Optional URL quota, as returned by list_url_categories_url_quota
+        """
+        self.url_categories = url_categories or []
+        self.url_quota = url_quota
+        self.ip_destination_groups = ip_destination_groups or []
+        self._parsed_ip_entries = None
+
+    def url_findings(self) -> list:
+        """
+        Method to find the redundant URLs of the categories. Owners are category IDs.
+
+        :return: (list) Findings, each {"type": "duplicate" or "covered", "owner", "entry", "by_owner", "by_entry",
+            "same_owner"}
+        """
+        patterns = {}
+        for category in self.url_categories:
+            for field in URL_FIELDS:
+                for entry in category.get(field) or []:
+                    pattern, path = _url_pattern(entry)
+                    patterns.setdefault(pattern, []).append((category["id"], path, entry))
+
+        return _domain_findings(patterns)
+
+    def _ip_entries(self) -> list:
+        """
+        Internal method to parse the addresses of the groups once
+
+        :return: (list) (group ID, address, interval or None for the FQDNs and domains of DOMAIN_GROUP_TYPES groups)
+        """
+        if self._parsed_ip_entries is None:
+            self._parsed_ip_entries = []
+            for group in self.ip_destination_groups:
+                domains = group.get("type") in DOMAIN_GROUP_TYPES
+                for address in group.get("addresses") or []:
+                    interval = address_range(address)
+                    if interval is not None or domains:
+                        self._parsed_ip_entries.append((group["id"], address, interval))
+
+        return self._parsed_ip_entries
+
+    def ip_findings(self) -> list:
+        """
+        Method to find the redundant addresses of the IP destination groups. Owners are group IDs. Addresses are
+        compared as intervals, whatever the type of their group. Entries that are not addresses are compared as domain
+        patterns, "*.example.com" covering "www.example.com", only in the DSTN_FQDN and DSTN_DOMAIN groups, the types
+        that hold them. Other entries are ignored.
+
+        :return: (list) Findings, each {"type": "duplicate", "covered" or "overlap", "owner", "entry", "by_owner",
+            "by_entry", "same_owner"}
+        """
+        ranges = []
+        patterns = {}
+        for group_id, address, interval in self._ip_entries():
+            if interval is None:
+                patterns.setdefault(address.strip().lower(), []).append((group_id, "", address))
+            else:
+                ranges.append((interval[0], -interval[1], group_id, address))
+        ranges.sort(key=lambda item: item[:2])
+        findings = []
+        # Entries reaching the furthest so far: per group, and the two furthest of distinct groups
+        group_reach = {}
+        furthest = []
+        for first, negative_last, group_id, address in ranges:
+            last = -negative_last
+            entry = (group_id, address)
+            own = group_reach.get(group_id)
+            other = next((item for item in furthest if item[1][0] != group_id), None)
+            if own and own[0] >= last:
+                kind = "duplicate" if own[2] == (first, last) else "covered"
+                findings.append(_finding(kind, entry, own[1]))
+            elif other and other[0] >= last:
+                kind = "duplicate" if other[2] == (first, last) else "covered"
+                findings.append(_finding(kind, entry, other[1]))
+            elif own and own[0] >= first:
+                findings.append(_finding("overlap", entry, own[1]))
+            elif other and other[0] >= first:
+                findings.append(_finding("overlap", entry, other[1]))
+            if not own or last > own[0]:
+                group_reach[group_id] = (last, entry, (first, last))
+                others = [item for item in furthest if item[1][0] != group_id]
+                furthest = sorted(others + [group_reach[group_id]], key=lambda item: -item[0])[:2]
+        findings.extend(_domain_findings(patterns))
+
+        return findings
+
+    def mergeable_ip_entries(self) -> dict:
+        """
+        Method to count, per group, the IP entries that merging the overlapping and adjacent ones into ranges would
+        save
+
+        :return: (dict) Group ID: number of entries saved, for the groups where it is not 0
+        """
+        intervals = {}
+        for group_id, _, interval in self._ip_entries():
+            if interval is not None:
+                intervals.setdefault(group_id, []).append(interval)
+        mergeable = {}
+        for group_id, group_intervals in intervals.items():
+            saved = len(group_intervals) - len(IntervalSet(sorted(group_intervals)))
+            if saved:
+                mergeable[group_id] = saved
+
+        return mergeable
+
+    @staticmethod
+    def _summary(
+        findings: list,
+        entries: int,
+    ) -> dict:
+        summary = {"entries": entries, "reclaimable": 0}
+        for finding in findings:
+            summary[finding["type"]] = summary.get(finding["type"], 0) + 1
+            if finding["same_owner"] and finding["type"] != "overlap":
+                summary["reclaimable"] += 1
+
+        return summary
+
+    def report(
+        self,
+        url_quota: dict = None,
+    ) -> dict:
+        """
+        Method to summarize the findings
+
+        :param url_quota: (dict) Optional URL quota, as returned by list_url_categories_url_quota. Default the quota
+            the analyzer was created with
+
+        :return: (dict) {"url_categories": {"entries", "duplicate", "covered", "reclaimable"},
+            "ip_destination_groups": {"entries", "duplicate", "covered", "overlap", "reclaimable", "mergeable"},
+            "url_quota": url_quota with the remainingUrlsQuota after removing the reclaimable URLs}
+        """
+        url_entries = sum(len(category.get(field) or []) for category in self.url_categories for field in URL_FIELDS)
+        ip_entries = sum(len(group.get("addresses") or []) for group in self.ip_destination_groups)
+        report = {
+            "url_categories": self._summary(self.url_findings(), url_entries),
+            "ip_destination_groups": self._summary(self.ip_findings(), ip_entries),
+        }
+        report["ip_destination_groups"]["mergeable"] = sum(self.mergeable_ip_entries().values())
+        url_quota = self.url_quota if url_quota is None else url_quota
+        if url_quota is not None:
+            report["url_quota"] = {
+                **url_quota,
+                "remainingUrlsQuotaAfterCleanup": url_quota.get("remainingUrlsQuota", 0)
+                + report["url_categories"]["reclaimable"],
+            }
+        logger.info(
+            f"{report['url_categories']['reclaimable']} URLs and {report['ip_destination_groups']['reclaimable']} "
+            f"IP group entries are reclaimable"
+        )
+
+        return report
@@ -0,0 +1,316 @@
+import json
+
+from zscaler_api_talkers.helpers.logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+# Fields of custom URL categories that accept ADD_TO_LIST and REMOVE_FROM_LIST, and the matching parameters of
+# update_url_categories
+URL_CATEGORY_LISTS = {
+    "urls": "urls",
+    "dbCategorizedUrls": "db_categorized_urls",
+    "keywords": "keywords",
+    "keywordsRetainingParentCategory": "keywords_retaining_parent_category",
+}
+# Other fields of custom URL categories set by the user, a difference in any of them needs a full update. Fields
+# computed by the API, such as id, val, editable, urlKeywordCounts or customUrlsCount, are not compared.
+URL_CATEGORY_FIELDS = (
+    "configuredName",
+    "customCategory",
+    "superCategory",
+    "type",
+    "description",
+    "scopes",
+    "ipRanges",
+    "ipRangesRetainingParentCategory",
+    "regexPatterns",
+    "regexPatternsRetainingParentCategory",
+)
+
+# Stages of a plan, in the order they are run: entries are removed before anything is created or added to stay
+# within the URL quota, objects are created before lists refer to them, and objects are deleted last
+STAGES = ("remove", "create", "update", "add", "delete")
+
+
+def _size(
+    value,
+) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+def _chunks(
+    items: list,
+    size: int,
+) -> list:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+class SyncStep(object):
+    """
+    One write of a SyncPlan: a talker method and its parameters
+    """
+
+    __slots__ = ("stage", "description", "method", "kwargs", "payload_bytes")
+
+    def __init__(
+        self,
+        stage: str,
+        description: str,
+        method: str,
+        kwargs: dict,
+    ):
+        """
+        :param stage: (str) One of STAGES
+        :param description: (str) What the step does
+        :param method: (str) Name of the ZiaTalker method
+        :param kwargs: (dict) Parameters of the method
+        """
+        self.stage = stage
+        self.description = description
+        self.method = method
+        self.kwargs = kwargs
+        self.payload_bytes = _size(kwargs)
+
+    def __repr__(self) -> str:
+        return f"SyncStep({self.stage}: {self.description})"
+
+
+class SyncPlan(object):
+    """
+    Ordered writes that converge a tenant to a desired state, with their payload size and the size full
+    replacements of the same objects would have
+    """
+
+    def __init__(self):
+        self._stages = {stage: [] for stage in STAGES}
+        self.full_payload_bytes = 0
+
+    def add(
+        self,
+        step: SyncStep,
+    ):
+        """
+        :param step: (SyncStep) Step to add
+        """
+        self._stages[step.stage].append(step)
+
+    @property
+    def steps(self) -> list:
+        """
+        Steps in the order they are run
+        """
+        return [step for stage in STAGES for step in self._stages[stage]]
+
+    @property
+    def payload_bytes(self) -> int:
+        """
+        Total size of the payloads of the plan
+        """
+        return sum(step.payload_bytes for step in self.steps)
+
+    def __len__(self) -> int:
+        return sum(len(steps) for steps in self._stages.values())
+
+    def __repr__(self) -> str:
+        return (
+            f"SyncPlan({len(self)} writes, {self.payload_bytes} bytes instead of {self.full_payload_bytes} with "
+            f"full updates)"
+        )
+
+    def execute(
+        self,
+        talker: object,
+    ) -> list:
+        """
+        Method to run the steps in order. Stops at the first failure.
+
+        :param talker: (ZiaTalker) Authenticated talker. With a MutationJournal attached, an interrupted plan can be
+            run again and goes on where it stopped
+
+        :return: (list) Results of the steps
+        """
+        results = []
+        steps = self.steps
+        for number, step in enumerate(steps, start=1):
+            logger.info(f"Sync step {number}/{len(steps)}: {step.description}")
+            results.append(getattr(talker, step.method)(**step.kwargs))
+
+        return results
+
+
+class SyncPlanner(object):
+    """
+    Plans the smallest set of writes that converges custom URL categories and the security black and white lists to a
+    desired state. URL, keyword and retained-URL lists are updated with ADD_TO_LIST and REMOVE_FROM_LIST deltas
+    instead of resending whole categories, and the black list with add_security_blacklist_urls and
+    remove_security_blacklist_urls. A category is only fully replaced when another field of URL_CATEGORY_FIELDS changes.
+
+    The desired state is a dict with any of:
+      - "url_categories": list of custom categories, as returned by list_url_categories, matched by configuredName
+      - "security_blacklisted_urls": list of URLs
+      - "security_whitelisted_urls": list of URLs
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 1000,
+        prune: bool = False,
+    ):
+        """
+        :param batch_size: (int) Maximum number of list entries per write
+        :param prune: (bool) True to delete the custom categories missing from the desired state
+        """
+        self.batch_size = batch_size
+        self.prune = prune
+
+    @staticmethod
+    def live_state(
+        talker: object,
+        desired: dict,
+    ) -> dict:
+        """
+        Method to read the current state of the parts of the tenant a desired state covers
+
+        :param talker: (ZiaTalker) Authenticated talker
+        :param desired: (dict) Desired state
+
+        :return: (dict) Live state, in the format of the desired state
+        """
+        live = {}
+        if "url_categories" in desired:
+            live["url_categories"] = talker.list_url_categories(custom=True)
+        if "security_blacklisted_urls" in desired:
+            live["security_blacklisted_urls"] = talker.list_security_blacklisted_urls().get("blacklistUrls", [])
+        if "security_whitelisted_urls" in desired:
+            live["security_whitelisted_urls"] = talker.list_security_whitelisted_urls().get("whitelistUrls", [])
+
+        return live
+
+    def _delta_steps(
+        self,
+        plan: SyncPlan,
+        action: str,
+        label: str,
+        entries: list,
+        make_kwargs,
+    ):
+        stage = "add" if action == "ADD_TO_LIST" else "remove"
+        for chunk in _chunks(sorted(entries), self.batch_size):
+            plan.add(SyncStep(stage, f"{stage} {len(chunk)} entries of {label}", *make_kwargs(chunk)))
+
+    def _plan_category(
+        self,
+        plan: SyncPlan,
+        wanted: dict,
+        current: dict,
+    ):
+        name = wanted["configuredName"]
+        if current is None:
+            payload = {"customCategory": True, "type": "URL_CATEGORY", **wanted}
+            plan.add(SyncStep("create", f"create category {name}", "add_raw_url_categories", {"payload": payload}))
+            plan.full_payload_bytes += _size(payload)
+            return
+        plan.full_payload_bytes += _size({**current, **wanted})
+        if any(field in wanted and wanted[field] != current.get(field) for field in URL_CATEGORY_FIELDS):
+            # Only a full update changes these fields, and it carries the lists too
+            payload = {**current, **wanted}
+            plan.add(
+                SyncStep(
+                    "update",
+                    f"replace category {name}",
+                    "update_call",
+                    {"url": f"/urlCategories/{current['id']}", "payload": payload},
+                )
+            )
+            return
+        for field, parameter in URL_CATEGORY_LISTS.items():
+            if field not in wanted:
+                continue
+            wanted_entries = set(wanted[field] or [])
+            current_entries = set(current.get(field) or [])
+            for action, entries in (
+                ("REMOVE_FROM_LIST", current_entries - wanted_entries),
+                ("ADD_TO_LIST", wanted_entries - current_entries),
+            ):
+                self._delta_steps(
+                    plan,
+                    action,
+                    f"{field} of category {name}",
+                    list(entries),
+                    lambda chunk, action=action, parameter=parameter: (
+                        "update_url_categories",
+                        {
+                            "category_id": current["id"],
+                            "action": action,
+                            "configured_name": name,
+                            parameter: chunk,
+                        },
+                    ),
+                )
+
+    def plan(
+        self,
+        desired: dict,
+        live: dict,
+    ) -> SyncPlan:
+        """
+        Method to plan the writes from the live state to the desired state
+
+        :param desired: (dict) Desired state
+        :param live: (dict) Live state, see live_state
+
+        :return: (SyncPlan)
+        """
+        plan = SyncPlan()
+        if "url_categories" in desired:
+            current_by_name = {
+                category.get("configuredName"): category for category in live.get("url_categories", [])
+            }
+            wanted_names = set()
+            for wanted in desired["url_categories"]:
+                wanted_names.add(wanted["configuredName"])
+                self._plan_category(plan, wanted, current_by_name.get(wanted["configuredName"]))
+            if self.prune:
+                for name, current in current_by_name.items():
+                    if name not in wanted_names:
+                        plan.add(
+                            SyncStep(
+                                "delete",
+                                f"delete category {name}",
+                                "delete_url_categories",
+                                {"category_id": current["id"]},
+                            )
+                        )
+        if "security_blacklisted_urls" in desired:
+            wanted_entries = set(desired["security_blacklisted_urls"])
+            current_entries = set(live.get("security_blacklisted_urls", []))
+            plan.full_payload_bytes += _size({"blacklistUrls": sorted(wanted_entries)})
+            self._delta_steps(
+                plan,
+                "REMOVE_FROM_LIST",
+                "security black list",
+                list(current_entries - wanted_entries),
+                lambda chunk: ("remove_security_blacklist_urls", {"urls": chunk}),
+            )
+            self._delta_steps(
+                plan,
+                "ADD_TO_LIST",
+                "security black list",
+                list(wanted_entries - current_entries),
+                lambda chunk: ("add_security_blacklist_urls", {"urls": chunk}),
+            )
+        if "security_whitelisted_urls" in desired:
+            # The white list has no incremental API, it is replaced when it differs
+            wanted_entries = sorted(set(desired["security_whitelisted_urls"]))
+            plan.full_payload_bytes += _size({"whitelistUrls": wanted_entries})
+            if set(wanted_entries) != set(live.get("security_whitelisted_urls", [])):
+                plan.add(
+                    SyncStep(
+                        "update",
+                        f"replace security white list with {len(wanted_entries)} URLs",
+                        "update_security_whitelisted_urls",
+                        {"urls": wanted_entries},
+                    )
+                )
+
+        return plan
@@ -1,17 +1,44 @@
+import csv
+import io
 import json
 import pdb  # noqa
 import time
 
 import requests
 
-from zscaler_api_talkers.helpers import HttpCalls, setup_logger
+from zscaler_api_talkers.helpers import (
+    ZIA_RATE_LIMITS,
+    AsyncTalker,
+    BulkExecutor,
+    BulkResult,
+    ConfigExporter,
+    HttpCalls,
+    NameResolver,
+    RateLimiter,
+    RetryPolicy,
+    SnapshotStore,
+    TokenManager,
+    setup_logger,
+)
+from zscaler_api_talkers.helpers.credential_cache import SESSION_TTL, CredentialCache
+from zscaler_api_talkers.helpers.journal import MutationJournal
+from zscaler_api_talkers.helpers.lookup_cache import UrlLookupCache, normalize_url
+from zscaler_api_talkers.helpers.page_size import ZIA_PAGE_SIZES, PageMeter, PageSizePolicy
+from zscaler_api_talkers.helpers.pagination import iter_pages
+from zscaler_api_talkers.zia.directory import ZiaDirectory
+from zscaler_api_talkers.zia.firewall_policy import FirewallPolicyEngine
+from zscaler_api_talkers.zia.helpers import _obfuscate_api_key
 from zscaler_api_talkers.zia.models import (
+    audit_log_collections,
+    audit_log_read_actions,
     super_categories,
     valid_category_ids,
     valid_countries,
 )
-
-from zscaler_api_talkers.zia.helpers import _obfuscate_api_key
+from zscaler_api_talkers.zia.overlap import OverlapAnalyzer
+from zscaler_api_talkers.zia.sync import SyncPlan, SyncPlanner
+from zscaler_api_talkers.zia.url_classifier import UrlClassifier
+from zscaler_api_talkers.zia.url_policy import UrlPolicyEngine
 
 logger = setup_logger(name=__name__)
 
@@ -30,6 +57,14 @@ class ZiaTalker(object):
         api_key: str = "",
         username: str = "",
         password: str = "",
+        session: requests.Session = None,
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        prefetch: int = 0,
+        page_size_policy: PageSizePolicy = None,
+        credential_cache: CredentialCache = None,
+        url_lookup_cache: UrlLookupCache = None,
+        journal: MutationJournal = None,
     ):
         """
         Method to start the class
@@ -37,12 +72,38 @@ class ZiaTalker(object):
         :param cloud_name: (str) Example: zscalerbeta.net, zscalerone.net, zscalertwo.net, zscalerthree.net,
             zscaler.net, zscloud.net
         :param bearer: (str) OAuth2.0 Bear token
+        :param session: (requests.Session) Optional pooled session shared with other talkers
+        :param rate_limiter: (RateLimiter) Optional scheduler shared with other talkers of the same tenant. Default is
+            a new RateLimiter with ZIA_RATE_LIMITS
+        :param retry_policy: (RetryPolicy) Optional policy to retry throttled and failed calls. Default is a new
+            RetryPolicy, retrying up to 5 times with backoff. RetryPolicy(max_retries=0) sends every call once
+        :param prefetch: (int) Number of pages requested ahead of the current one when listing. Default 0 (serial)
+        :param page_size_policy: (PageSizePolicy) Optional policy choosing the page size of list methods, shared with
+            other talkers. Default is a new PageSizePolicy keeping its measures in memory
+        :param credential_cache: (CredentialCache) Optional cache to reuse the JSESSIONID of this user across
+            talkers and processes
+        :param url_lookup_cache: (UrlLookupCache) Optional cache of url_lookup results, shared with other talkers
+        :param journal: (MutationJournal) Optional write-ahead journal of the add_*, update_*, delete_* and remove_*
+            calls, to resume interrupted jobs
         """
         self.base_uri = f"https://zsapi.{cloud_name}/api/v1"
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(ZIA_RATE_LIMITS, name=cloud_name)
         self.hp_http = HttpCalls(
             host=self.base_uri,
             verify=True,
-        )
+            session=session,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy or RetryPolicy(),
+        )
+        self.prefetch = prefetch
+        self.tenant = cloud_name
+        self.page_size_policy = page_size_policy or PageSizePolicy()
+        self.credential_cache = credential_cache
+        self.url_lookup_cache = url_lookup_cache
+        if journal:
+            journal.attach(self)
+        self._username = None
         self.cookies = None
         self.headers = None
         if bearer:
@@ -61,11 +122,40 @@ class ZiaTalker(object):
         password: str = None,
     ):
         """
-        Method to authenticate.
+        Method to authenticate. With a credential cache, a cached session of this user is reused when still valid.
+        The session is opened again when it times out or is rejected with a 401.
+
+        :param api_key: (str) API key
+        :param username: (str) A string that contains the email ID of the API admin
+        :param password: (str) A string that contains the password for the API admin
+        """
+        self._username = username
+        self.hp_http.token_manager = TokenManager(
+            login=lambda: self._login(api_key, username, password),
+            target=self,
+            attribute="cookies",
+            kwarg="cookies",
+            credential_cache=self.credential_cache,
+            cloud=self.base_uri,
+            user=username,
+            background=False,
+        )
+        self.hp_http.token_manager.refresh()
+
+    def _login(
+        self,
+        api_key: str,
+        username: str,
+        password: str = None,
+    ) -> tuple:
+        """
+        Internal method to open a new session
 
         :param api_key: (str) API key
         :param username: (str) A string that contains the email ID of the API admin
         :param password: (str) A string that contains the password for the API admin
+
+        :return: (tuple) (cookies, epoch of expiry)
         """
         timestamp, key = _obfuscate_api_key(api_key)
         payload = {
@@ -79,7 +169,8 @@ class ZiaTalker(object):
             url=url,
             payload=payload,
         )
-        self.cookies = {"JSESSIONID": response.cookies["JSESSIONID"]}
+
+        return {"JSESSIONID": response.cookies["JSESSIONID"]}, time.time() + SESSION_TTL
 
     def authenticated_session(self) -> json:
         """
@@ -109,37 +200,64 @@ class ZiaTalker(object):
             error_handling=True,
             payload={},
         )
+        if self.credential_cache:
+            self.credential_cache.delete(self.base_uri, self._username)
 
         return response.json()
 
     def _obtain_all(
         self,
         url: str,
+        page_size: int = None,
     ) -> list:
         """
         Internal method that queries all pages
 
-        :param url: (str) URL
+        :param url: (str) URL, without pageSize
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (list) List of results
         """
-        page = 1
-        result = []
-        while True:
-            response = self.hp_http.get_call(
-                url=f"{url}&page={page}",
-                cookies=self.cookies,
-                error_handling=True,
-                headers=self.headers,
-            )
-            if response.json():
-                result += response.json()
-                page += 1
-                time.sleep(1)
-            else:
-                break
+        return list(self._iter_all(url, page_size=page_size))
 
-        return result
+    def _iter_all(
+        self,
+        url: str,
+        page_size: int = None,
+    ):
+        """
+        Internal generator that queries all pages and yields the records of each page as it arrives
+
+        :param url: (str) URL, without pageSize
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Records
+        """
+        endpoint = url.split("?")[0]
+        max_page_size = ZIA_PAGE_SIZES.get(endpoint, 1000)
+        if page_size is None:
+            page_size = self.page_size_policy.page_size(self.tenant, endpoint, max_page_size)
+        url = f"{url}{'&' if '?' in url else '?'}pageSize={page_size}"
+        meter = PageMeter(self.page_size_policy, self.tenant, endpoint, page_size, max_page_size)
+        pages = iter_pages(
+            meter.wrap(
+                lambda page: self.hp_http.get_call(
+                    url=f"{url}&page={page}",
+                    cookies=self.cookies,
+                    error_handling=True,
+                    headers=self.headers,
+                )
+            ),
+            prefetch=self.prefetch,
+        )
+        try:
+            for page in pages:
+                meter.count(len(page))
+                yield from page
+        except Exception:
+            meter.record(failed=True)
+            raise
+        meter.record()
 
     def get_status(self) -> json:
         """
@@ -260,17 +378,74 @@ class ZiaTalker(object):
 
         return response
 
+    def changed_collections(
+        self,
+        start_time: float,
+        end_time: float = None,
+        timeout: float = 300,
+    ) -> set:
+        """
+        Method to find which list methods return different results since start_time, according to the audit log.
+        Generates an audit log report, waits for it and reads the categories of the changes it lists.
+
+        :param start_time: (float) Epoch of the start of the period
+        :param end_time: (float) Epoch of the end of the period. Default now
+        :param timeout: (float) Seconds to wait for the report
+
+        :return: (set) Names of list methods, e.g. {"list_users"}. None when a change could not be mapped to list
+            methods, so everything must be considered changed
+        """
+        if end_time is None:
+            end_time = time.time()
+        self.add_auditlog_entry_report(
+            start_time=int(start_time * 1000),
+            end_time=int(end_time * 1000),
+        )
+        deadline = time.time() + timeout
+        while self.list_auditlog_entry_report().get("status") != "COMPLETE":
+            if time.time() > deadline:
+                raise ValueError(f"Audit log report not complete after {timeout} seconds")
+            time.sleep(2)
+        rows = csv.reader(io.StringIO(self.download_auditlog_entry_report().text))
+        header = None
+        changed = set()
+        for row in rows:
+            if header is None:
+                # The report starts with a few lines describing it
+                if "Category" in row:
+                    header = row
+                continue
+            entry = dict(zip(header, row))
+            action = entry.get("Action", "").upper().replace(" ", "_")
+            if any(read_action in action for read_action in audit_log_read_actions):
+                continue
+            subject = f'{entry.get("Category", "")} {entry.get("Sub-Category", "")}'.upper().replace(" ", "_")
+            collections = [
+                collection
+                for keyword, keyword_collections in audit_log_collections
+                if keyword in subject
+                for collection in keyword_collections
+            ]
+            if not collections:
+                logger.info(f"Audit log category {subject} is not mapped to list methods")
+                return None
+            changed.update(collections)
+
+        return changed
+
     # Admin & Role Management
     def list_admin_users(
         self,
         user_id: int = None,
         query: str = None,
+        page_size: int = None,
     ) -> json:
         """
         Gets a list of admin users. By default, auditor user information is not included.
 
         :param user_id: (int) user ID
         :param query: (str) HTTP query  # TODO: What is this?  Looks like it is just parameters
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (json) JSON of results
         """
@@ -284,11 +459,31 @@ class ZiaTalker(object):
             ).json()
         else:
             if query:
-                url = f"/adminUsers?{query}?pageSize=1000"
+                url = f"/adminUsers?{query}"
             else:
-                url = "/adminUsers?pageSize=1000"
+                url = "/adminUsers"
+
+        return self._obtain_all(url, page_size=page_size)
+
+    def iter_admin_users(
+        self,
+        query: str = None,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_admin_users. Yields admin users page by page as they arrive.
 
-        return self._obtain_all(url)
+        :param query: (str) HTTP query
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Admin users
+        """
+        if query:
+            url = f"/adminUsers?{query}"
+        else:
+            url = "/adminUsers"
+
+        return self._iter_all(url, page_size=page_size)
 
     def add_admin_users(self, loginName: str, userName: str, email: str, password: str, role: dict, comments: str = '',
                        adminScopeType: str ='ORGANIZATION',
@@ -586,6 +781,27 @@ class ZiaTalker(object):
 
         return response.json()
 
+    def plan_sync(
+        self,
+        desired: dict,
+        batch_size: int = 1000,
+        prune: bool = False,
+    ) -> SyncPlan:
+        """
+        Method to plan the smallest set of writes converging custom URL categories and the security black and white
+        lists to a desired state, using ADD_TO_LIST and REMOVE_FROM_LIST deltas. Run it with plan.execute(talker).
+
+        :param desired: (dict) Desired state, see SyncPlanner. E.g. {"url_categories": [...],
+            "security_blacklisted_urls": [...]}
+        :param batch_size: (int) Maximum number of list entries per write
+        :param prune: (bool) True to delete the custom categories missing from the desired state
+
+        :return: (SyncPlan)
+        """
+        planner = SyncPlanner(batch_size=batch_size, prune=prune)
+
+        return planner.plan(desired, planner.live_state(self, desired))
+
     def delete_url_categories(
         self,
         category_id: str,
@@ -676,34 +892,99 @@ class ZiaTalker(object):
         url_list: list,
     ) -> list:
         """
-        Method to look up the categorization of the given list of URLs, ["abc.com","zyz.com"]
+        Method to look up the categorization of the given list of URLs, ["abc.com","zyz.com"]. URLs are normalized
+        and deduplicated before they are sent, and with a url_lookup_cache only the URLs it does not know are sent to
+        the API.
 
         :param url_list: (list) List of urls
 
-        :return: (list)
+        :return: (list) One categorization per URL of url_list, in the same order, duplicates included
+        """
+        keys = [normalize_url(item) for item in url_list]
+        urls = list(dict.fromkeys(keys))
+        results = self.url_lookup_cache.get_many(urls) if self.url_lookup_cache else {}
+        misses = [item for item in urls if item not in results]
+        # 100 URLs per call, the 1/sec and 400/hr limits are enforced by the rate limiter
+        for i in range(0, len(misses), 100):
+            results.update(self.url_lookup_batch(misses[i : i + 100]))
+        missing = [url_list[i] for i, key in enumerate(keys) if key not in results]
+        if missing:
+            logger.warning(f"No categorization returned for {len(missing)} URLs, e.g. {missing[0]}")
+
+        return [results[key] for key in keys if key in results]
+
+    @staticmethod
+    def _match_lookups(
+        batch: list,
+        response: list,
+    ) -> dict:
+        """
+        Internal method to pair the categorizations of a /urlLookup call with the URLs sent. The API answers one
+        categorization per URL in the order they were sent, but may echo a URL in another form, e.g. with a scheme
+        removed or a host in lower case, so results are paired by position. When the counts differ, they are paired
+        by the normalized echoed URL instead.
+
+        :param batch: (list) Normalized URLs sent
+        :param response: (list) Categorizations returned
+
+        :return: (dict) Normalized URL: categorization
+        """
+        if len(response) == len(batch):
+            return dict(zip(batch, response))
+        logger.warning(f"/urlLookup returned {len(response)} results for {len(batch)} URLs, matching them by URL")
+
+        return {normalize_url(item["url"]): item for item in response}
+
+    def url_lookup_batch(
+        self,
+        url_list: list,
+    ) -> dict:
         """
-        result = []
+        Method to look up at most 100 normalized URLs in one call, without reading the url_lookup_cache, for callers
+        that batch URLs themselves. The categorizations are stored in the url_lookup_cache, if any.
+
+        :param url_list: (list) Normalized URLs, see normalize_url
+
+        :return: (dict) Normalized URL: categorization
+        """
+        if len(url_list) > 100:
+            raise ValueError(f"At most 100 URLs can be looked up in one call, got {len(url_list)}")
         url = "/urlLookup"
-        # Verify urls format
-        list(set(url_list))
-        # Rate limit 1/sec  and 400 hr and 100 URLs per call
-        list_of_lists = [url_list[i : i + 100] for i in range(0, len(url_list), 100)]
-        for item in list_of_lists:
-            response = self.hp_http.post_call(
-                url,
-                payload=item,
-                cookies=self.cookies,
-                headers=self.headers,
-                error_handling=True,
-            )
-            result.append(response.json())
-            time.sleep(1)
-        final_result = []
-        for i in result:
-            for j in i:
-                final_result.append(j)
+        response = self.hp_http.post_call(
+            url,
+            payload=url_list,
+            cookies=self.cookies,
+            headers=self.headers,
+            error_handling=True,
+        )
+        looked_up = self._match_lookups(url_list, response.json())
+        if self.url_lookup_cache:
+            self.url_lookup_cache.set_many(looked_up)
+
+        return looked_up
+
+    def iter_url_lookup(
+        self,
+        source,
+        checkpoint: str = None,
+        talkers: list = None,
+    ):
+        """
+        Streaming version of url_lookup for large inputs. URLs are deduplicated and sent in 100-URL batches by this
+        talker and the given ones at once, and the job can resume from a checkpoint. See UrlClassifier.
+
+        :param source: (str|iterable) Path of a file with one URL per line, or any iterable of URLs
+        :param checkpoint: (str) Optional path of a SQLite file to resume from
+        :param talkers: (list) Other authenticated ZiaTalkers, e.g. of other sessions or tenants, to share the load
+
+        :return: (generator) Categorizations, batch by batch in input order
+        """
+        classifier = UrlClassifier(
+            [self] + list(talkers or []),
+            checkpoint=checkpoint,
+        )
 
-        return final_result
+        return classifier.classify(source)
 
     # URL filtering Policies
     def list_url_filtering_rules(self) -> json:
@@ -852,19 +1133,21 @@ class ZiaTalker(object):
     def list_departments(
         self,
         department_id: int = None,
+        page_size: int = None,
     ) -> json or list:
         """
         Gets a list of departments. The search parameters find matching values within the "name" or "comments"
         attributes. if ID, gets the department for the specified ID
 
         :param department_id: (int) department ID
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (json or list)
         """
 
         if not department_id:
-            url = "/departments?pageSize=10000"
-            return self._obtain_all(url)
+            url = "/departments"
+            return self._obtain_all(url, page_size=page_size)
         else:
             url = f"/departments/{department_id}"
             response = self.hp_http.get_call(
@@ -875,20 +1158,37 @@ class ZiaTalker(object):
             )
             return response.json()
 
+    def iter_departments(
+        self,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_departments. Yields departments page by page as they arrive.
+
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Departments
+        """
+        url = "/departments"
+
+        return self._iter_all(url, page_size=page_size)
+
     def list_groups(
         self,
         group_id: int = None,
+        page_size: int = None,
     ) -> json or list:
         """
         Gets a list of groups if ID, gets the group for the specified ID
 
         :param group_id: group ID
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (json)
         """
         if not group_id:
-            url = "/groups?pageSize=10000"
-            return self._obtain_all(url)
+            url = "/groups"
+            return self._obtain_all(url, page_size=page_size)
         else:
             url = f"/groups/{group_id}"
             response = self.hp_http.get_call(
@@ -899,10 +1199,26 @@ class ZiaTalker(object):
             )
             return response.json()
 
+    def iter_groups(
+        self,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_groups. Yields groups page by page as they arrive.
+
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Groups
+        """
+        url = "/groups"
+
+        return self._iter_all(url, page_size=page_size)
+
     def list_users(
         self,
         user_id: int = None,
         query: str = None,
+        page_size: int = None,
     ) -> json or list:
         """
         Gets a list of all users and allows user filtering by name, department, or group. The name search parameter
@@ -911,10 +1227,11 @@ class ZiaTalker(object):
 
         :param user_id: (int) user ID
         :param query: (str)
+        :param page_size: (int) Page size. Default is chosen by the page size policy. With query, only the first page
+            is returned and the default is 1000
 
         :return: (json or list)
         """
-        url = "/users?pageSize=1000"
         if user_id:
             url = f"/users/{user_id}"
             return self.hp_http.get_call(
@@ -924,7 +1241,7 @@ class ZiaTalker(object):
                 headers=self.headers,
             ).json()
         elif query:
-            url = f"/users?{query}&pageSize=1000"
+            url = f"/users?{query}&pageSize={page_size or 1000}"
             return self.hp_http.get_call(
                 url,
                 cookies=self.cookies,
@@ -932,7 +1249,142 @@ class ZiaTalker(object):
                 headers=self.headers,
             ).json()
 
-        return self._obtain_all(url)
+        return list(self.iter_users(page_size=page_size))
+
+    def iter_users(
+        self,
+        query: str = None,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_users. Yields users page by page as they arrive, so large tenants can be processed
+        with constant memory.
+
+        :param query: (str) Filter, e.g. "dept=Sales". All pages of the filtered result are returned
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Users
+        """
+        url = "/users"
+        if query:
+            url = f"/users?{query}"
+
+        return self._iter_all(url, page_size=page_size)
+
+    def load_directory(
+        self,
+        page_size: int = None,
+    ) -> ZiaDirectory:
+        """
+        Method to load the users, groups and departments in an indexed in-memory directory, to resolve them without
+        further calls
+
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (ZiaDirectory)
+        """
+        return ZiaDirectory.from_talker(self, page_size=page_size)
+
+    def name_resolver(
+        self,
+        ttl: float = 3600,
+        snapshot_store: SnapshotStore = None,
+    ) -> NameResolver:
+        """
+        Method to get a resolver of the names of locations, groups, departments, users, IP groups, network services,
+        URL categories, device groups, rule labels and DLP engines to the name-ID pairs the rule methods take. Custom
+        URL categories are resolved by configuredName, the others by ID.
+
+        :param ttl: (float) Seconds a collection is kept for
+        :param snapshot_store: (SnapshotStore) Optional snapshot the collections are loaded from
+
+        :return: (NameResolver)
+        """
+
+        def loader(method: str):
+            if snapshot_store:
+                return lambda: snapshot_store.get(self, method)
+            return getattr(self, method)
+
+        return NameResolver(
+            {
+                "locations": loader("list_locations"),
+                "location_groups": loader("list_locations_groups"),
+                "groups": loader("list_groups"),
+                "departments": loader("list_departments"),
+                "users": loader("list_users"),
+                "ip_source_groups": loader("list_ip_source_groups"),
+                "ip_destination_groups": loader("list_ip_destination_groups"),
+                "network_services": loader("list_network_services"),
+                "url_categories": (loader("list_url_categories"), ("configuredName", "id")),
+                "device_groups": loader("list_devices_groups"),
+                "rule_labels": loader("list_rule_labels"),
+                "dlp_engines": loader("list_dlp_engines"),
+            },
+            ttl=ttl,
+        )
+
+    def url_policy_engine(
+        self,
+        directory: ZiaDirectory = None,
+        lookup_missing: bool = False,
+    ) -> UrlPolicyEngine:
+        """
+        Method to load the URL filtering rules and URL categories in an engine that tells which rule a request
+        matches, without sending traffic. Predefined categories of URLs come from the url_lookup_cache.
+
+        :param directory: (ZiaDirectory) Optional directory giving the groups and department of users, see
+            load_directory
+        :param lookup_missing: (bool) True to look up the URLs missing from the url_lookup_cache with url_lookup.
+            Otherwise they are MISCELLANEOUS_OR_UNKNOWN
+
+        :return: (UrlPolicyEngine)
+        """
+        return UrlPolicyEngine(
+            self.list_url_filtering_rules(),
+            self.list_url_categories(),
+            lookup_cache=self.url_lookup_cache,
+            directory=directory,
+            talker=self if lookup_missing else None,
+        )
+
+    def firewall_policy_engine(
+        self,
+        directory: ZiaDirectory = None,
+        rules: list = None,
+    ) -> FirewallPolicyEngine:
+        """
+        Method to load the firewall filtering rules, IP groups and network services in an engine that tells which
+        rule a flow matches, without sending traffic
+
+        :param directory: (ZiaDirectory) Optional directory giving the groups and department of users, see
+            load_directory
+        :param rules: (list) Optional proposed rules to evaluate instead of the live ones
+
+        :return: (FirewallPolicyEngine)
+        """
+        return FirewallPolicyEngine(
+            self.list_firewall_filtering_rules() if rules is None else rules,
+            ip_source_groups=self.list_ip_source_groups(),
+            ip_destination_groups=self.list_ip_destination_groups(),
+            network_services=self.list_network_services(),
+            directory=directory,
+        )
+
+    def overlap_analyzer(self) -> OverlapAnalyzer:
+        """
+        Method to load the URL categories, IP destination groups and URL quota in an analyzer of their duplicate,
+        covered and overlapping entries. Its report tells how much of the URL quota a cleanup would reclaim. The IP
+        destination groups of all types are loaded: addresses in DSTN_IP groups, FQDNs and domains in DSTN_FQDN and
+        DSTN_DOMAIN groups.
+
+        :return: (OverlapAnalyzer)
+        """
+        return OverlapAnalyzer(
+            url_categories=self.list_url_categories(),
+            ip_destination_groups=self.list_ip_destination_groups(),
+            url_quota=self.list_url_categories_url_quota(),
+        )
 
     def add_users(
         self,
@@ -990,7 +1442,7 @@ class ZiaTalker(object):
         :return: (json)
         """
         url = "/users/bulkDelete"
-        if len(user_ids) < 500:
+        if len(user_ids) <= 500:
             payload = {"ids": user_ids}
             response = self.hp_http.post_call(
                 url,
@@ -1003,6 +1455,25 @@ class ZiaTalker(object):
         else:
             raise ValueError("Maximum 500 users per request")
 
+    def bulk_delete_users(
+        self,
+        user_ids: list,
+        concurrency: int = 1,
+    ) -> BulkResult:
+        """
+        Deletes any number of users, 500 per request
+
+        :param user_ids: (list) List of user IDs to be deleted
+        :param concurrency: (int) Maximum number of requests sent at the same time
+
+        :return: (BulkResult) IDs deleted and IDs that failed, with the reason
+        """
+        return BulkExecutor(chunk_size=500, concurrency=concurrency).run(
+            self.delete_bulk_users,
+            user_ids,
+            succeeded=lambda chunk, response: response.get("ids", chunk),
+        )
+
     # Location Management
 
     def list_locations(
@@ -1083,7 +1554,7 @@ class ZiaTalker(object):
         :return: (json)
         """
         url = "/locations/bulkDelete"
-        if len(location_ids) < 100:
+        if len(location_ids) <= 100:
             payload = {"ids": location_ids}
             response = self.hp_http.post_call(
                 url,
@@ -1096,6 +1567,25 @@ class ZiaTalker(object):
         else:
             raise ValueError("Maximum 100 locations per request")
 
+    def bulk_delete_locations(
+        self,
+        location_ids: list,
+        concurrency: int = 1,
+    ) -> BulkResult:
+        """
+        Deletes any number of locations, 100 per request
+
+        :param location_ids: (list) List of location IDs
+        :param concurrency: (int) Maximum number of requests sent at the same time
+
+        :return: (BulkResult) IDs deleted and IDs that failed, with the reason
+        """
+        return BulkExecutor(chunk_size=100, concurrency=concurrency).run(
+            self.delete_bulk_locations,
+            location_ids,
+            succeeded=lambda chunk, response: response.get("ids", chunk),
+        )
+
     def delete_locations(
         self,
         location_id: int,
@@ -2498,18 +2988,20 @@ class ZiaTalker(object):
     def list_rule_labels(
         self,
         rule_label_id: int = None,
-    ) -> json:
+        page_size: int = None,
+    ) -> json or list:
         """
-        Gets rule label information for the specified ID
+        Gets a list of rule labels, or the rule label information for the specified ID
 
         :param rule_label_id: (int)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
-        :return: (json)
+        :return: (json or list)
         """
-        url = "/ruleLabels?pageSize=1000"
-        if rule_label_id:
-            url = f"/ruleLabels/{rule_label_id}"
+        if not rule_label_id:
+            return self._obtain_all("/ruleLabels", page_size=page_size)
 
+        url = f"/ruleLabels/{rule_label_id}"
         response = self.hp_http.get_call(
             url,
             cookies=self.cookies,
@@ -2600,6 +3092,64 @@ class ZiaTalker(object):
 
         return response.json()
 
+    def export_all(
+        self,
+        directory: str,
+        concurrency: int = 8,
+        collections: list = None,
+    ) -> dict:
+        """
+        Method to export the configuration of the tenant, one NDJSON file per collection and a manifest.json with the
+        count and duration of each. Collections are fetched at the same time within the rate limits, and the
+        sub-locations of each location are fetched at the same time too.
+
+        :param directory: (str) Export directory, created if missing
+        :param concurrency: (int) Maximum number of calls in flight
+        :param collections: (list) Optional names of the collections to export, e.g. ["users", "locations"]. Default all
+
+        :return: (dict) Manifest
+        """
+        exports = {
+            "url_categories": self.list_url_categories,
+            "url_filtering_rules": self.list_url_filtering_rules,
+            "firewall_filtering_rules": self.list_firewall_filtering_rules,
+            "dlp_dictionaries": self.list_dlp_dictionaries,
+            "dlp_engines": self.list_dlp_engines,
+            "dlp_notification_templates": self.list_dlp_notification_templates,
+            "dlp_exact_data_match_schemas": self.list_dlp_exact_data_match_schemas,
+            "web_dlp_rules": self.list_web_dlp_rules,
+            "icap_servers": self.list_icap_server,
+            "idm_profiles": self.list_idm_profile,
+            "locations": self.list_locations,
+            "location_groups": self.list_locations_groups,
+            "gre_tunnels": self.list_gre_tunnels,
+            "vpn_credentials": self.list_vpn_credentials,
+            "static_ips": self.list_static_ip,
+            "ip_source_groups": self.list_ip_source_groups,
+            "ip_destination_groups": self.list_ip_destination_groups,
+            "network_services": self.list_network_services,
+            "rule_labels": self.list_rule_labels,
+            "users": self.iter_users,
+            "groups": self.iter_groups,
+            "departments": self.iter_departments,
+            "admin_users": self.iter_admin_users,
+            "admin_roles": self.list_admin_roles,
+            "security_whitelisted_urls": self.list_security_whitelisted_urls,
+            "security_blacklisted_urls": self.list_security_blacklisted_urls,
+            "exempted_urls": self.list_exempted_urls,
+            "device_groups": self.list_devices_groups,
+        }
+        fan_outs = {
+            "sublocations": ("locations", lambda location_id: self.list_sublocations(location_id=location_id)),
+        }
+        if collections is not None:
+            exports = {name: call for name, call in exports.items() if name in collections}
+            fan_outs = {name: fan_out for name, fan_out in fan_outs.items() if name in collections}
+            if fan_outs and "locations" not in exports:
+                exports["locations"] = self.list_locations
+
+        return ConfigExporter(exports, fan_outs=fan_outs, concurrency=concurrency).export(directory)
+
     # Manage Subclouds
 
     def list_subclouds(
@@ -2624,4 +3174,13 @@ class ZiaTalker(object):
             headers=self.headers,
         )
 
-        return response.json()
\ No newline at end of file
+        return response.json()
+
+
+class AsyncZiaTalker(AsyncTalker):
+    """
+    asyncio version of ZiaTalker. Every public ZiaTalker method is available as a coroutine with the same name and
+    parameters. Example: await AsyncZiaTalker(cloud_name, api_key=..., username=..., password=...).list_users()
+    """
+
+    talker_class = ZiaTalker
@@ -0,0 +1,288 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from zscaler_api_talkers.helpers.logger import setup_logger
+from zscaler_api_talkers.helpers.lookup_cache import UrlLookupCache, normalize_url
+from zscaler_api_talkers.helpers.pagination import fetch_pages
+
+logger = setup_logger(name=__name__)
+
+
+def _read_urls(
+    source,
+):
+    """
+    Internal generator over the URLs of a source
+
+    :param source: (str|iterable) Path of a file with one URL per line, or any iterable of URLs
+
+    :return: (generator) URLs, blank lines and lines starting with # skipped
+    """
+    if isinstance(source, str):
+        with open(source) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+    else:
+        for url in source:
+            if url and url.strip():
+                yield url
+
+
+def _digest(
+    url: str,
+) -> bytes:
+    return hashlib.blake2b(url.encode(), digest_size=8).digest()
+
+
+class UrlClassifier(object):
+    """
+    Streaming URL classification for large inputs. URLs are normalized and deduplicated, cached categorizations are
+    answered without calls, and the rest is packed in 100-URL batches sent by several ZiaTalkers at once. Each
+    talker waits on its own rate limiter, so the batches go out at the combined quota of all sessions or tenants.
+
+    The input is read in chunks: the cache and the checkpoint are queried once per chunk, over one connection each.
+    Duplicates are found with a bounded set of URL digests in memory, cleared when full, then in the checkpoint, so
+    memory stays constant however long the input. A URL repeated after more than max_seen other URLs may be
+    classified again, unless the checkpoint already holds it.
+
+    With a checkpoint file, the position in the input and the URLs already classified are saved each time the
+    results of a batch have been yielded. A job started again with the same source and checkpoint skips what was
+    done, so results are delivered at least once: only the batches in progress when a job is killed come again.
+    Their categorizations are kept in the checkpoint as soon as they are looked up, so they are not looked up again.
+    """
+
+    def __init__(
+        self,
+        talkers: list,
+        checkpoint: str = None,
+        batch_size: int = 100,
+        max_cached_batch: int = 1000,
+        read_size: int = 1000,
+        max_seen: int = 1000000,
+    ):
+        """
+        :param talkers: (list) Authenticated ZiaTalkers, one per session or tenant. The url_lookup_cache of the first
+            one is read, if any, and each talker stores its lookups in its own url_lookup_cache
+        :param checkpoint: (str) Optional path of a SQLite file to resume from
+        :param batch_size: (int) URLs per call. The API accepts 100 at most
+        :param max_cached_batch: (int) Maximum number of cached categorizations held back in one batch
+        :param read_size: (int) Input lines read per chunk
+        :param max_seen: (int) Maximum number of URL digests kept in memory to find duplicates
+        """
+        if not talkers:
+            raise ValueError("At least one ZiaTalker is required")
+        self.talkers = talkers
+        self.cache = talkers[0].url_lookup_cache
+        self.checkpoint = checkpoint
+        self.batch_size = min(batch_size, 100)
+        self.max_cached_batch = max_cached_batch
+        self.read_size = read_size
+        self.max_seen = max_seen
+        self.looked_up = 0
+        self.cached = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self._stats_lock = threading.Lock()
+        self._idle = queue.Queue()
+        for talker in talkers:
+            self._idle.put(talker)
+        self._pending = None
+        if checkpoint:
+            os.makedirs(os.path.dirname(os.path.abspath(checkpoint)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS seen (digest BLOB PRIMARY KEY)")
+                conn.execute("CREATE TABLE IF NOT EXISTS progress (key TEXT PRIMARY KEY, value INTEGER)")
+            # Categorizations looked up, kept for the batches a killed job had not saved yet
+            self._pending = UrlLookupCache(max_entries=max_cached_batch, path=checkpoint)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.checkpoint, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _offset(self) -> int:
+        if not self.checkpoint:
+            return 0
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM progress WHERE key = 'offset'").fetchone()
+
+        return row[0] if row else 0
+
+    @staticmethod
+    def _seen_before(
+        conn: sqlite3.Connection,
+        digests: list,
+    ) -> set:
+        """
+        Internal method to find which digests the checkpoint holds, in one query per 500 digests
+        """
+        if conn is None or not digests:
+            return set()
+        found = set()
+        for i in range(0, len(digests), 500):
+            chunk = digests[i : i + 500]
+            rows = conn.execute(f"SELECT digest FROM seen WHERE digest IN ({','.join('?' * len(chunk))})", chunk)
+            found.update(row[0] for row in rows)
+
+        return found
+
+    def _chunks(
+        self,
+        source,
+        start: int,
+    ):
+        """
+        Internal generator over the input in chunks of read_size lines
+
+        :return: (generator) Lists of (input offset, normalized URL)
+        """
+        chunk = []
+        for offset, raw_url in enumerate(_read_urls(source), start=1):
+            if offset <= start:
+                self.skipped += 1
+                continue
+            chunk.append((offset, normalize_url(raw_url)))
+            if len(chunk) >= self.read_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _batches(
+        self,
+        source,
+        conn: sqlite3.Connection,
+        start: int,
+    ):
+        """
+        Internal generator that packs the input in batches
+
+        :param source: (str|iterable) URLs
+        :param conn: (sqlite3.Connection) Checkpoint connection, or None
+        :param start: (int) Number of input lines already done
+
+        :return: (generator) (urls to look up, cached categorizations, digests, input offset after the batch)
+        """
+        seen = set()
+        urls, cached, digests = [], [], []
+        offset = start
+        for chunk in self._chunks(source, start):
+            if len(seen) >= self.max_seen:
+                seen.clear()
+            chunk = [(offset, url, _digest(url)) for offset, url in chunk]
+            new = {digest: url for _, url, digest in chunk if digest not in seen}
+            checkpointed = self._seen_before(conn, list(new))
+            to_read = [url for digest, url in new.items() if digest not in checkpointed]
+            hits = self._cached(to_read)
+            for offset, url, digest in chunk:
+                if digest in seen or digest in checkpointed:
+                    self.duplicates += 1
+                    continue
+                seen.add(digest)
+                digests.append(digest)
+                if url in hits:
+                    cached.append(hits[url])
+                else:
+                    urls.append(url)
+                if len(urls) >= self.batch_size or len(cached) >= self.max_cached_batch:
+                    yield urls, cached, digests, offset
+                    urls, cached, digests = [], [], []
+        if urls or cached or offset > start:
+            yield urls, cached, digests, offset
+
+    def _cached(
+        self,
+        urls: list,
+    ) -> dict:
+        """
+        Internal method to find the categorizations known from the cache or from the checkpoint
+
+        :param urls: (list) Normalized URLs
+
+        :return: (dict) url: categorization, for the URLs found
+        """
+        if not urls:
+            return {}
+        hits = self.cache.get_many(urls) if self.cache else {}
+        if self._pending is not None:
+            hits.update(self._pending.get_many([url for url in urls if url not in hits]))
+
+        return hits
+
+    def _classify(
+        self,
+        batch: tuple,
+    ) -> tuple:
+        """
+        Internal method that looks up a batch with the first idle talker
+
+        :param batch: (tuple) As yielded by _batches
+
+        :return: (tuple) (categorizations, digests, input offset after the batch)
+        """
+        urls, cached, digests, offset = batch
+        results = list(cached)
+        if urls:
+            talker = self._idle.get()
+            try:
+                looked_up = talker.url_lookup_batch(urls)
+            finally:
+                self._idle.put(talker)
+            if self.cache and talker.url_lookup_cache is not self.cache:
+                self.cache.set_many(looked_up)
+            if self._pending is not None:
+                self._pending.set_many(looked_up)
+            results.extend(looked_up[url] for url in urls if url in looked_up)
+        with self._stats_lock:
+            self.looked_up += len(urls)
+            self.cached += len(cached)
+
+        return results, digests, offset
+
+    def classify(
+        self,
+        source,
+    ):
+        """
+        Generator of the categorizations of a stream of URLs, batch by batch in input order. Within a batch, cached
+        categorizations come first
+
+        :param source: (str|iterable) Path of a file with one URL per line, or any iterable of URLs
+
+        :return: (generator) Categorizations, as returned by url_lookup
+        """
+        start = self._offset()
+        if start:
+            logger.info(f"Resuming from checkpoint {self.checkpoint} after {start} input lines")
+        reader = sqlite3.connect(self.checkpoint, timeout=60) if self.checkpoint else None
+        try:
+            batches = fetch_pages(
+                self._classify,
+                self._batches(source, reader, start),
+                concurrency=len(self.talkers),
+            )
+            for results, digests, offset in batches:
+                yield from results
+                if self.checkpoint:
+                    with self._connect() as conn:
+                        conn.executemany(
+                            "INSERT OR IGNORE INTO seen (digest) VALUES (?)",
+                            [(digest,) for digest in digests],
+                        )
+                        conn.execute(
+                            "INSERT OR REPLACE INTO progress (key, value) VALUES ('offset', ?)",
+                            (offset,),
+                        )
+        finally:
+            if reader is not None:
+                reader.close()
@@ -0,0 +1,301 @@
+import time
+
+from zscaler_api_talkers.helpers.intervals import BitIndex
+from zscaler_api_talkers.helpers.logger import setup_logger
+from zscaler_api_talkers.helpers.lookup_cache import normalize_url
+from zscaler_api_talkers.zia.helpers import _ids
+
+logger = setup_logger(name=__name__)
+
+UNKNOWN_CATEGORY = "MISCELLANEOUS_OR_UNKNOWN"
+
+
+def _path_covers(
+    prefix: str,
+    path: str,
+) -> bool:
+    """
+    Internal method to tell if the path of a custom URL covers the path of a URL, segment by segment: "/docs" covers
+    "/docs" and "/docs/a" but not "/documents"
+    """
+    return not prefix or path == prefix or (path.startswith(prefix) and path[len(prefix)] in "/?")
+
+
+class UrlPolicyEngine(object):
+    """
+    Offline evaluation of the URL filtering policy. URLs are categorized from the custom URLs and keywords of the URL
+    categories, then from the url_lookup cache, the way ZIA does: custom URLs replace the predefined categories of a
+    URL, URLs retaining their parent category add to them.
+
+    Enabled rules are compiled in evaluation order into bit sets per criterion (URL category, location, identity,
+    request method): a request matches the rules in the intersection of the bit sets of its values, and the first
+    one is the lowest bit. As in ZIA, a rule applies to a user matching any of its users, groups or departments, and
+    to a location matching any of its locations or location groups, so each of these families is one criterion. Each
+    evaluation costs a few dictionary lookups whatever the number of rules.
+    """
+
+    def __init__(
+        self,
+        rules: list,
+        categories: list,
+        lookup_cache: object = None,
+        directory: object = None,
+        talker: object = None,
+        max_cached_urls: int = 100000,
+    ):
+        """
+        :param rules: (list) URL filtering rules, as returned by list_url_filtering_rules
+        :param categories: (list) URL categories, as returned by list_url_categories
+        :param lookup_cache: (UrlLookupCache) Optional cache of url_lookup results giving the predefined categories
+        :param directory: (ZiaDirectory) Optional directory giving the groups and department of users
+        :param talker: (ZiaTalker) Optional talker to look up URLs missing from the cache. Without it they are
+            MISCELLANEOUS_OR_UNKNOWN
+        :param max_cached_urls: (int) Maximum number of URL categorizations and lookups kept by the engine
+        """
+        self.lookup_cache = lookup_cache
+        self.directory = directory
+        self.talker = talker
+        self.max_cached_urls = max_cached_urls
+        self._categorized = {}
+        self._looked_up = {}
+        self._compile_categories(categories)
+        self._compile_rules(rules)
+
+    def _compile_categories(
+        self,
+        categories: list,
+    ):
+        # host: [(category, path prefix, retains parent category)]. Wildcard entries are keyed by the domain they cover
+        self._exact_hosts = {}
+        self._wildcard_hosts = {}
+        self._keywords = []
+        for category in categories:
+            category_id = category["id"]
+            for field, retains in (("urls", False), ("dbCategorizedUrls", True)):
+                for entry in category.get(field) or []:
+                    entry = entry.strip().lower()
+                    wildcard = entry.startswith(".")
+                    host, _, path = normalize_url(entry.lstrip(".")).partition("/")
+                    index = self._wildcard_hosts if wildcard else self._exact_hosts
+                    path = path.rstrip("/")
+                    index.setdefault(host, []).append((category_id, f"/{path}" if path else "", retains))
+            for field, retains in (("keywords", False), ("keywordsRetainingParentCategory", True)):
+                for keyword in category.get(field) or []:
+                    self._keywords.append((keyword.lower(), category_id, retains))
+
+    def _compile_rules(
+        self,
+        rules: list,
+    ):
+        self.rules = sorted(
+            (rule for rule in rules if rule.get("state", "ENABLED") == "ENABLED"),
+            key=lambda rule: (rule.get("order", 0), rule.get("rank", 7)),
+        )
+        self._indexes = {criterion: BitIndex() for criterion in ("categories", "locations", "identities", "methods")}
+        for position, rule in enumerate(self.rules):
+            categories = [category for category in rule.get("urlCategories") or [] if category != "ANY"]
+            self._indexes["categories"].add(position, categories)
+            # Values of one family are tagged with their field, the rule matching any of them
+            self._indexes["locations"].add(
+                position,
+                [("location", i) for i in _ids(rule.get("locations"))]
+                + [("location_group", i) for i in _ids(rule.get("locationGroups"))],
+            )
+            self._indexes["identities"].add(
+                position,
+                [("user", i) for i in _ids(rule.get("users"))]
+                + [("group", i) for i in _ids(rule.get("groups"))]
+                + [("department", i) for i in _ids(rule.get("departments"))],
+            )
+            self._indexes["methods"].add(position, rule.get("requestMethods") or [])
+        self._timed = 0
+        for position, rule in enumerate(self.rules):
+            if rule.get("enforceTimeValidity"):
+                self._timed |= 1 << position
+        logger.debug(f"Compiled {len(self.rules)} URL filtering rules")
+
+    def _custom_categories(
+        self,
+        url: str,
+    ) -> tuple:
+        """
+        Internal method to match a normalized URL with the custom URLs and keywords
+
+        :return: (tuple) (categories replacing the predefined ones, categories retaining them)
+        """
+        lower_url = url.lower()
+        host, _, path = lower_url.partition("/")
+        host = host.split("?", 1)[0]
+        path = f"/{path}" if path else ""
+        entries = list(self._exact_hosts.get(host, ()))
+        labels = host.split(".")
+        for i in range(len(labels)):
+            entries.extend(self._wildcard_hosts.get(".".join(labels[i:]), ()))
+        replacing, retaining = set(), set()
+        for category, prefix, retains in entries:
+            if _path_covers(prefix, path):
+                (retaining if retains else replacing).add(category)
+        for keyword, category, retains in self._keywords:
+            if keyword in lower_url:
+                (retaining if retains else replacing).add(category)
+
+        return replacing, retaining
+
+    def _predefined_categories(
+        self,
+        url: str,
+    ) -> set:
+        if url not in self._looked_up:
+            self.prefetch([url])
+        result = self._looked_up.get(url)
+        if not result:
+            return {UNKNOWN_CATEGORY}
+
+        return set(result.get("urlClassifications") or []) | set(
+            result.get("urlClassificationsWithSecurityAlert") or []
+        ) or {UNKNOWN_CATEGORY}
+
+    def prefetch(
+        self,
+        urls: list,
+    ):
+        """
+        Method to read at once the predefined categories of URLs before evaluating them: from the url_lookup cache in
+        one query, then, with a talker, from url_lookup_batch for the URLs missing from the cache, 100 per call
+
+        :param urls: (list) URLs
+        """
+        urls = {normalize_url(url) for url in urls}
+        urls -= self._categorized.keys() | self._looked_up.keys()
+        if not urls:
+            return
+        if len(self._looked_up) + len(urls) > self.max_cached_urls:
+            self._looked_up.clear()
+        if self.lookup_cache:
+            cached = self.lookup_cache.get_many(list(urls))
+            self._looked_up.update(cached)
+            urls -= cached.keys()
+        if urls and self.talker is not None:
+            missing = sorted(urls)
+            for i in range(0, len(missing), 100):
+                self._looked_up.update(self.talker.url_lookup_batch(missing[i : i + 100]))
+            urls -= self._looked_up.keys()
+        # Not found anywhere: MISCELLANEOUS_OR_UNKNOWN, without looking again
+        self._looked_up.update(dict.fromkeys(urls))
+
+    def categorize(
+        self,
+        url: str,
+    ) -> set:
+        """
+        Method to get the URL categories of a URL
+
+        :param url: (str) URL
+
+        :return: (set) Category IDs
+        """
+        url = normalize_url(url)
+        categories = self._categorized.get(url)
+        if categories is not None:
+            return categories
+        replacing, retaining = self._custom_categories(url)
+        categories = replacing | retaining
+        if retaining or not replacing:
+            categories |= self._predefined_categories(url)
+        if len(self._categorized) >= self.max_cached_urls:
+            self._categorized.clear()
+        self._categorized[url] = categories
+
+        return categories
+
+    def evaluate(
+        self,
+        url: str,
+        user: int = None,
+        groups: list = None,
+        department: int = None,
+        location: int = None,
+        location_groups: list = None,
+        request_method: str = "GET",
+        at: float = None,
+    ) -> dict:
+        """
+        Method to find the URL filtering rule a request matches
+
+        :param url: (str) URL
+        :param user: (int) User ID
+        :param groups: (list) Group IDs of the user. Default from the directory, if any
+        :param department: (int) Department ID of the user. Default from the directory, if any
+        :param location: (int) Location ID
+        :param location_groups: (list) Location group IDs of the location
+        :param request_method: (str) HTTP method, e.g. "GET"
+        :param at: (float) Epoch of the request, for rules with a validity period. Default now
+
+        :return: (json) First matching rule, None if no rule matches (the default rule of the tenant applies)
+        """
+        if self.directory is not None and user is not None and (groups is None or department is None):
+            record = self.directory.user(user_id=user)
+            if record is not None:
+                groups = record.group_ids if groups is None else groups
+                department = record.department_id if department is None else department
+        places = [("location_group", i) for i in location_groups or ()]
+        if location is not None:
+            places.append(("location", location))
+        identities = [("group", i) for i in groups or ()]
+        if user is not None:
+            identities.append(("user", user))
+        if department is not None:
+            identities.append(("department", department))
+        indexes = self._indexes
+        matched = (
+            indexes["categories"].match(self.categorize(url))
+            & indexes["locations"].match(places)
+            & indexes["identities"].match(identities)
+            & indexes["methods"].match((request_method,) if request_method else ())
+        )
+        while matched:
+            position = (matched & -matched).bit_length() - 1
+            rule = self.rules[position]
+            if not self._timed >> position & 1 or self._valid_at(rule, at):
+                return rule
+            matched &= matched - 1
+
+        return None
+
+    @staticmethod
+    def _valid_at(
+        rule: dict,
+        at: float = None,
+    ) -> bool:
+        at = time.time() if at is None else at
+        start = rule.get("validityStartTime") or 0
+        end = rule.get("validityEndTime") or float("inf")
+
+        return start <= at <= end
+
+    def evaluate_many(
+        self,
+        requests: list,
+    ):
+        """
+        Generator of the rules matched by many requests
+
+        :param requests: (iterable) Dicts of the parameters of evaluate, e.g. {"url": "example.com", "user": 1234}
+
+        :return: (generator) (request, matching rule or None)
+        """
+        batch = []
+        for request in requests:
+            batch.append(request)
+            if len(batch) == 1000:
+                yield from self._evaluate_batch(batch)
+                batch = []
+        yield from self._evaluate_batch(batch)
+
+    def _evaluate_batch(
+        self,
+        requests: list,
+    ):
+        self.prefetch([request["url"] for request in requests])
+        for request in requests:
+            yield request, self.evaluate(**request)
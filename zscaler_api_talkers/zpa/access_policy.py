@@ -0,0 +1,263 @@
+from zscaler_api_talkers.helpers.logger import setup_logger
+from zscaler_api_talkers.zpa.segment_index import AppSegmentIndex
+
+logger = setup_logger(name=__name__)
+
+# Operand object types matched against the application of a request rather than the user
+APP_OBJECT_TYPES = ("APP", "APP_GROUP")
+
+
+def _operand_keys(
+    operand: dict,
+) -> list:
+    """
+    Internal method to get the (objectType, lhs, rhs) facts an operand matches, from lhs and rhs, or from the
+    entryValues and values of the newer policy format
+    """
+    object_type = operand.get("objectType")
+    if operand.get("entryValues"):
+        return [(object_type, str(entry.get("lhs")), str(entry.get("rhs"))) for entry in operand["entryValues"]]
+    if operand.get("values"):
+        return [(object_type, str(operand.get("lhs", "id")), str(value)) for value in operand["values"]]
+
+    return [(object_type, str(operand.get("lhs")), str(operand.get("rhs")))]
+
+
+def _compile_condition(
+    condition: dict,
+):
+    """
+    Internal method to compile a condition into a predicate on a set of facts. Operands are combined with the
+    operator of the condition, OR by default.
+    """
+    keys = frozenset(key for operand in condition.get("operands") or [] for key in _operand_keys(operand))
+    negated = condition.get("negated") in (True, "true")
+    if (condition.get("operator") or "OR") == "AND":
+
+        def predicate(facts):
+            return keys <= facts
+
+    else:
+
+        def predicate(facts):
+            return not keys.isdisjoint(facts)
+
+    if negated:
+        return lambda facts: not predicate(facts)
+
+    return predicate
+
+
+class AccessPolicySimulator(object):
+    """
+    Offline evaluation of the ZPA access policy. Requests are matched to application segments by the most specific
+    domain and their port ranges, through an AppSegmentIndex. The conditions of each rule are compiled into
+    predicates on the facts of a request, (objectType, lhs, rhs) tuples such as ("SAML", "<attribute id>",
+    "<value>"), and rules are indexed by the applications and segment groups their conditions require, so a request
+    only tests the rules that may apply to its segment, in rule order. A request matching no rule is denied.
+
+    User attributes are given by name or ID: SAML attributes by name, samlName or ID, SCIM groups by name or ID.
+    """
+
+    def __init__(
+        self,
+        policies: list,
+        app_segments: list,
+        segment_groups: list = None,
+        saml_attributes: list = None,
+        scim_groups: list = None,
+    ):
+        """
+        :param policies: (list) Access policy rules, as returned by list_policies("ACCESS_POLICY")
+        :param app_segments: (list|AppSegmentIndex) Application segments, as returned by list_application_segments,
+            or their index
+        :param segment_groups: (list) Optional segment groups, as returned by list_segment_group, for the segments
+            without segmentGroupId
+        :param saml_attributes: (list) Optional SAML attributes, as returned by list_saml_attributes, to give
+            attributes by name
+        :param scim_groups: (list) Optional SCIM groups, as returned by list_all_scim_groups, to give groups by name
+        """
+        self.segments = app_segments if isinstance(app_segments, AppSegmentIndex) else AppSegmentIndex(app_segments)
+        self._segment_groups = {}
+        for segment_group in segment_groups or []:
+            for application in segment_group.get("applications") or []:
+                self._segment_groups[str(application["id"])] = str(segment_group["id"])
+        for segment_id, segment in self.segments.segments.items():
+            if segment.get("segmentGroupId"):
+                self._segment_groups[segment_id] = str(segment["segmentGroupId"])
+        self._saml_ids = {}
+        for attribute in saml_attributes or []:
+            for field in ("id", "name", "samlName"):
+                if attribute.get(field) is not None:
+                    self._saml_ids[str(attribute[field])] = str(attribute["id"])
+        self._scim_groups = {}
+        for group in scim_groups or []:
+            for field in ("id", "name"):
+                if group.get(field) is not None:
+                    self._scim_groups[str(group[field])] = (str(group.get("idpId")), str(group["id"]))
+        self._compile_rules(policies)
+
+    def _compile_rules(
+        self,
+        policies: list,
+    ):
+        self.rules = sorted(
+            (rule for rule in policies if rule.get("disabled") not in (True, "true", "1")),
+            key=lambda rule: int(rule.get("ruleOrder") or 0),
+        )
+        self._predicates = []
+        # (objectType, id): rule positions requiring it. Rules not restricted to applications apply to all
+        self._rules_by_app = {}
+        self._unrestricted = []
+        for position, rule in enumerate(self.rules):
+            conditions = rule.get("conditions") or []
+            predicates = [_compile_condition(condition) for condition in conditions if condition.get("operands")]
+            if (rule.get("operator") or "AND") == "OR":
+                self._predicates.append(lambda facts, predicates=predicates: any(p(facts) for p in predicates))
+            else:
+                self._predicates.append(lambda facts, predicates=predicates: all(p(facts) for p in predicates))
+            app_keys = None
+            for condition in conditions:
+                keys = [key for operand in condition.get("operands") or [] for key in _operand_keys(operand)]
+                # A condition only on applications, not negated, restricts the rule to them
+                if (
+                    keys
+                    and all(key[0] in APP_OBJECT_TYPES for key in keys)
+                    and condition.get("negated") not in (True, "true")
+                    and (condition.get("operator") or "OR") == "OR"
+                    and (rule.get("operator") or "AND") == "AND"
+                ):
+                    app_keys = {(key[0], key[2]) for key in keys}
+                    break
+            if app_keys is None:
+                self._unrestricted.append(position)
+            else:
+                for app_key in app_keys:
+                    self._rules_by_app.setdefault(app_key, []).append(position)
+        self._candidates = {}
+        logger.debug(f"Compiled {len(self.rules)} access policy rules")
+
+    def _rules_for(
+        self,
+        segment_id: str,
+    ) -> list:
+        """
+        Internal method to get the positions of the rules that may apply to a segment, in order
+        """
+        if segment_id not in self._candidates:
+            positions = set(self._unrestricted)
+            positions.update(self._rules_by_app.get(("APP", segment_id), ()))
+            segment_group_id = self._segment_groups.get(segment_id)
+            if segment_group_id:
+                positions.update(self._rules_by_app.get(("APP_GROUP", segment_group_id), ()))
+            self._candidates[segment_id] = sorted(positions)
+
+        return self._candidates[segment_id]
+
+    def user_facts(
+        self,
+        idp: int = None,
+        saml: dict = None,
+        scim: dict = None,
+        scim_groups: list = None,
+        client_type: str = None,
+        posture: dict = None,
+        platform: list = None,
+        facts: list = None,
+    ) -> frozenset:
+        """
+        Method to describe a user as the facts the policy operands match
+
+        :param idp: (int) IdP ID
+        :param saml: (dict) SAML attribute name, samlName or ID: value or list of values
+        :param scim: (dict) SCIM attribute ID: value or list of values
+        :param scim_groups: (list) SCIM group names or IDs
+        :param client_type: (str) e.g. "zpn_client_type_zapp"
+        :param posture: (dict) Posture profile UDID: True if the posture is met
+        :param platform: (list) e.g. ["windows"]
+        :param facts: (list) Other (objectType, lhs, rhs) facts, e.g. [("COUNTRY_CODE", "US", "true")]
+
+        :return: (frozenset) Facts
+        """
+        result = set()
+        if idp is not None:
+            result.add(("IDP", "id", str(idp)))
+        for object_type, attributes, names in (("SAML", saml, self._saml_ids), ("SCIM", scim, {})):
+            for attribute, values in (attributes or {}).items():
+                if not isinstance(values, (list, tuple, set)):
+                    values = [values]
+                attribute_id = names.get(str(attribute), str(attribute))
+                result.update((object_type, attribute_id, str(value)) for value in values)
+        for group in scim_groups or []:
+            if str(group) not in self._scim_groups:
+                raise ValueError(f"Unknown SCIM group {group}")
+            idp_id, group_id = self._scim_groups[str(group)]
+            result.add(("SCIM_GROUP", idp_id, group_id))
+        if client_type:
+            result.add(("CLIENT_TYPE", "id", client_type))
+        for udid, met in (posture or {}).items():
+            result.add(("POSTURE", str(udid), "true" if met else "false"))
+        for name in platform or []:
+            result.add(("PLATFORM", name, "true"))
+        result.update((str(a), str(b), str(c)) for a, b, c in facts or [])
+
+        return frozenset(result)
+
+    def evaluate(
+        self,
+        user: frozenset,
+        host: str,
+        port: int,
+        protocol: str = "TCP",
+    ) -> dict:
+        """
+        Method to find the access policy rule that applies to a user reaching host:port
+
+        :param user: (frozenset) Facts of the user, see user_facts
+        :param host: (str) FQDN or IP address
+        :param port: (int) Port
+        :param protocol: (str) TCP or UDP
+
+        :return: (dict) {"action": "ALLOW" or "DENY", "rule": matching rule or None, "segment": matching application
+            segment or None}
+        """
+        return self._evaluate_segment(user, self.segments.match(host, int(port), protocol.upper()))
+
+    def _evaluate_segment(
+        self,
+        user: frozenset,
+        segment: dict,
+    ) -> dict:
+        if segment is None:
+            return {"action": "DENY", "rule": None, "segment": None}
+        segment_id = str(segment["id"])
+        facts = user | {("APP", "id", segment_id), ("APP_GROUP", "id", self._segment_groups.get(segment_id))}
+        for position in self._rules_for(segment_id):
+            if self._predicates[position](facts):
+                rule = self.rules[position]
+                return {"action": rule.get("action", "DENY"), "rule": rule, "segment": segment}
+
+        return {"action": "DENY", "rule": None, "segment": segment}
+
+    def matrix(
+        self,
+        users: dict,
+        apps: list,
+    ) -> dict:
+        """
+        Method to evaluate every user against every application, e.g. for access reviews
+
+        :param users: (dict) User name: facts, see user_facts
+        :param apps: (list) (host, port) or (host, port, protocol)
+
+        :return: (dict) User name: {(host, port...): result of evaluate}
+        """
+        segments = {
+            tuple(app): self.segments.match(app[0], int(app[1]), app[2].upper() if len(app) > 2 else "TCP")
+            for app in apps
+        }
+
+        return {
+            name: {app: self._evaluate_segment(facts, segment) for app, segment in segments.items()}
+            for name, facts in users.items()
+        }
@@ -0,0 +1,288 @@
+from zscaler_api_talkers.helpers.domain_trie import EXACT, DomainTrie, covers, parse_domain
+from zscaler_api_talkers.helpers.intervals import IntervalMap, IntervalSet, address_range, address_value
+from zscaler_api_talkers.helpers.logger import setup_logger
+
+logger = setup_logger(name=__name__)
+
+PROTOCOLS = ("TCP", "UDP")
+
+
+def segment_port_ranges(
+    segment: dict,
+    protocol: str = "TCP",
+) -> list:
+    """
+    Method to get the port ranges of an application segment, from tcpPortRange/udpPortRange ([{"from": "80", "to":
+    "80"}]) or the older tcpPortRanges/udpPortRanges (["80", "80", "443", "443"])
+
+    :param segment: (dict) Application segment
+    :param protocol: (str) TCP or UDP
+
+    :return: (list) (first, last) port ranges
+    """
+    name = protocol.lower()
+    ranges = [
+        (int(port_range["from"]), int(port_range.get("to") or port_range["from"]))
+        for port_range in segment.get(f"{name}PortRange") or []
+    ]
+    flat = segment.get(f"{name}PortRanges") or []
+    ranges.extend((int(flat[i]), int(flat[i + 1])) for i in range(0, len(flat) - 1, 2))
+
+    return ranges
+
+
+class AppSegmentIndex(object):
+    """
+    Reverse index of application segments by the domains and IP ranges they claim. Domains are kept in a DomainTrie,
+    so finding the segments of a host, or the segments a new segment overlaps, walks one node per label instead of
+    scanning the domainNames of every segment. IP addresses and CIDRs are kept in an IntervalMap, so the ranges of an
+    address, or overlapping a range, are found with binary searches. The smallest range is the most specific.
+
+    The index is updated segment by segment with upsert and remove, and a ZpaTalker keeps the index of its
+    load_segment_index up to date as it adds, updates and deletes segments.
+    """
+
+    def __init__(
+        self,
+        segments=(),
+    ):
+        """
+        :param segments: (iterable) Application segments, as returned by list_application_segments
+        """
+        self.segments = {}
+        self._domains = DomainTrie()
+        # IP ranges, carrying (segment id, domain)
+        self._ranges = IntervalMap()
+        self._ports = {}
+        for segment in segments:
+            self.upsert(segment)
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def __contains__(
+        self,
+        segment_id,
+    ) -> bool:
+        return str(segment_id) in self.segments
+
+    def upsert(
+        self,
+        segment: dict,
+    ):
+        """
+        Method to add a segment, or replace the segment of the same ID
+
+        :param segment: (dict) Application segment, with its id
+        """
+        segment_id = str(segment["id"])
+        self.remove(segment_id)
+        self.segments[segment_id] = segment
+        self._ports[segment_id] = {
+            protocol: IntervalSet(segment_port_ranges(segment, protocol)) for protocol in PROTOCOLS
+        }
+        for domain in segment.get("domainNames") or []:
+            interval = address_range(domain)
+            if interval is None:
+                self._domains.add(domain, segment_id)
+            else:
+                self._ranges.add(interval[0], interval[1], (segment_id, domain))
+
+    def remove(
+        self,
+        segment_id,
+    ) -> bool:
+        """
+        Method to remove a segment
+
+        :param segment_id: (int|str) Segment ID
+
+        :return: (bool) False if the segment was not indexed
+        """
+        segment_id = str(segment_id)
+        segment = self.segments.pop(segment_id, None)
+        if segment is None:
+            return False
+        del self._ports[segment_id]
+        for domain in segment.get("domainNames") or []:
+            interval = address_range(domain)
+            if interval is None:
+                self._domains.remove(domain, segment_id)
+            else:
+                self._ranges.remove(interval[0], interval[1], (segment_id, domain))
+
+        return True
+
+    def _enabled(
+        self,
+        segment_id: str,
+    ) -> bool:
+        return self.segments[segment_id].get("enabled") not in (False, "false")
+
+    def lookup(
+        self,
+        host: str,
+    ) -> list:
+        """
+        Method to find the segments claiming a host
+
+        :param host: (str) FQDN or IP address
+
+        :return: (list) (domain or IP range, segment), the most specific first
+        """
+        if address_range(host) is not None:
+            matches = self._range_matches(self._ranges.match(address_value(host)))
+        else:
+            matches = self._domains.lookup(host)
+
+        return [(domain, self.segments[segment_id]) for domain, segment_id in matches]
+
+    @staticmethod
+    def _range_matches(
+        entries: list,
+    ) -> list:
+        """
+        Internal method to sort IP ranges of the IntervalMap, the smallest first, as (domain, segment id)
+        """
+        return [
+            (domain, segment_id)
+            for _, _, (segment_id, domain) in sorted(entries, key=lambda entry: (entry[1] - entry[0], entry[0]))
+        ]
+
+    def match(
+        self,
+        host: str,
+        port: int,
+        protocol: str = "TCP",
+    ) -> dict:
+        """
+        Method to find the segment a request reaches: the enabled segment of the most specific domain or IP range
+        whose ports include the port
+
+        :param host: (str) FQDN or IP address
+        :param port: (int) Port
+        :param protocol: (str) TCP or UDP
+
+        :return: (dict) Segment, None if none
+        """
+        for _, segment in self.lookup(host):
+            segment_id = str(segment["id"])
+            if self._enabled(segment_id) and int(port) in self._ports[segment_id][protocol.upper()]:
+                return segment
+
+        return None
+
+    def claims(
+        self,
+        domain: str,
+    ) -> list:
+        """
+        Method to find the segments claiming exactly a domain pattern, e.g. "*.example.com"
+
+        :param domain: (str) Domain pattern or IP range
+
+        :return: (list) Segments
+        """
+        interval = address_range(domain)
+        if interval is None:
+            segment_ids = self._domains.exact(domain)
+        else:
+            segment_ids = [
+                segment_id
+                for first, last, (segment_id, _) in self._ranges.match(interval[0])
+                if (first, last) == interval
+            ]
+
+        return [self.segments[segment_id] for segment_id in dict.fromkeys(segment_ids)]
+
+    def _shared_ports(
+        self,
+        ports: dict,
+        segment_id: str,
+    ) -> dict:
+        shared = {}
+        for protocol in PROTOCOLS:
+            overlap = list(ports[protocol].intersection(self._ports[segment_id][protocol]))
+            if overlap:
+                shared[protocol] = overlap
+
+        return shared
+
+    def conflicts(
+        self,
+        segment: dict,
+    ) -> list:
+        """
+        Method to check a segment, new or indexed, against the other segments. Two segments claiming the same domain
+        with overlapping ports conflict, and ZPA rejects the second one. A domain covering or covered by the domain
+        of another segment, e.g. "*.example.com" and "www.example.com", with overlapping ports overlaps: the most
+        specific one wins, which may hide applications.
+
+        :param segment: (dict) Application segment, its id being optional for a new segment
+
+        :return: (list) Findings, each {"type": "conflict" or "overlap", "domain": domain of the segment,
+            "other_domain": domain of the other segment, "other": other segment, "ports": {"TCP": [(first, last)]}}
+        """
+        own_id = str(segment.get("id"))
+        ports = {protocol: IntervalSet(segment_port_ranges(segment, protocol)) for protocol in PROTOCOLS}
+        findings = []
+        seen = set()
+        for domain in segment.get("domainNames") or []:
+            interval = address_range(domain)
+            if interval is None:
+                candidates = self._domains.covering(domain)
+                if parse_domain(domain)[1] == EXACT:
+                    candidates += [(domain, other_id) for other_id in self._domains.exact(domain)]
+                else:
+                    # Only wildcards reach below their domain
+                    candidates += self._domains.under(domain)
+                candidates = [
+                    (other_domain, other_id)
+                    for other_domain, other_id in candidates
+                    if covers(domain, other_domain) or covers(other_domain, domain)
+                ]
+            else:
+                candidates = self._range_matches(self._ranges.overlapping(*interval))
+            for other_domain, other_id in candidates:
+                if other_id == own_id or (domain, other_domain, other_id) in seen:
+                    continue
+                seen.add((domain, other_domain, other_id))
+                shared = self._shared_ports(ports, other_id)
+                if not shared:
+                    continue
+                same = (
+                    parse_domain(domain) == parse_domain(other_domain)
+                    if interval is None
+                    else address_range(other_domain) == interval
+                )
+                findings.append(
+                    {
+                        "type": "conflict" if same else "overlap",
+                        "domain": domain,
+                        "other_domain": other_domain,
+                        "other": self.segments[other_id],
+                        "ports": shared,
+                    }
+                )
+
+        return findings
+
+    def all_conflicts(self) -> list:
+        """
+        Method to check all the indexed segments against each other
+
+        :return: (list) Findings as returned by conflicts, with the "segment" they were found for, each pair of
+            segments and domains once
+        """
+        findings = []
+        reported = set()
+        for segment_id, segment in self.segments.items():
+            for finding in self.conflicts(segment):
+                other_id = str(finding["other"]["id"])
+                pair = frozenset(((segment_id, finding["domain"]), (other_id, finding["other_domain"])))
+                if pair in reported:
+                    continue
+                reported.add(pair)
+                findings.append({"segment": segment, **finding})
+
+        return findings
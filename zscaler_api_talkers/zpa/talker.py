@@ -1,8 +1,31 @@
+import functools
 import json
+import time
 
 import requests
 
-from zscaler_api_talkers.helpers import HttpCalls, setup_logger
+from zscaler_api_talkers.helpers import (
+    ZPA_PAGE_SIZE,
+    ZPA_RATE_LIMITS,
+    AsyncTalker,
+    BulkExecutor,
+    BulkResult,
+    ConfigExporter,
+    CredentialCache,
+    HttpCalls,
+    MutationJournal,
+    NameResolver,
+    PageSizePolicy,
+    RateLimiter,
+    RetryPolicy,
+    SnapshotStore,
+    TokenManager,
+    setup_logger,
+)
+from zscaler_api_talkers.helpers.page_size import PageMeter
+from zscaler_api_talkers.helpers.pagination import fetch_pages
+from zscaler_api_talkers.zpa.access_policy import AccessPolicySimulator
+from zscaler_api_talkers.zpa.segment_index import AppSegmentIndex
 from typing import Any
 
 logger = setup_logger(name=__name__)
@@ -21,6 +44,12 @@ class ZpaTalker(object):
         druid_cloud: str = None,
         client_id: str = None,
         client_secret: str = "",
+        session: requests.Session = None,
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        page_size_policy: PageSizePolicy = None,
+        credential_cache: CredentialCache = None,
+        journal: MutationJournal = None,
     ):
         """
         :param cloud: (str) Example https://config.zpabeta.net
@@ -28,16 +57,38 @@ class ZpaTalker(object):
         :param customer_id: (int) The unique identifier of the ZPA tenant
         :param client_id: (str)
         :param client_secret: (str)
+        :param session: (requests.Session) Optional pooled session shared with other talkers
+        :param rate_limiter: (RateLimiter) Optional scheduler shared with other talkers of the same tenant. Default is
+            a new RateLimiter with ZPA_RATE_LIMITS
+        :param retry_policy: (RetryPolicy) Optional policy to retry throttled and failed calls. Default is a new
+            RetryPolicy, retrying up to 5 times with backoff. RetryPolicy(max_retries=0) sends every call once
+        :param page_size_policy: (PageSizePolicy) Optional policy choosing the page size of list methods, shared with
+            other talkers. Default is a new PageSizePolicy keeping its measures in memory
+        :param credential_cache: (CredentialCache) Optional cache to reuse the bearer token of this client across
+            talkers and processes
+        :param journal: (MutationJournal) Optional write-ahead journal of the add_*, update_*, delete_* and remove_*
+            calls, to resume interrupted jobs
         """
         self.base_uri = cloud
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(ZPA_RATE_LIMITS, name=str(customer_id))
         self.hp_http = HttpCalls(
             host=self.base_uri,
             verify=True,
+            session=session,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy or RetryPolicy(),
         )
         self.jsessionid = None
         self.version = "1.3"
         self.header = None
         self.customer_id = customer_id
+        self.tenant = str(customer_id)
+        self.page_size_policy = page_size_policy or PageSizePolicy()
+        self.credential_cache = credential_cache
+        self.segment_index = None
+        if journal:
+            journal.attach(self)
         if client_id and client_secret:
             self.authenticate(
                 client_id=client_id,
@@ -47,90 +98,146 @@ class ZpaTalker(object):
     def _obtain_all_results(
         self,
         url: str,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> list:
         """
         API response can have multiple pages. This method return the whole response in a list
 
         :param url: (str) url
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy, unless url has a pagesize
 
         :return: (list)
         """
-        result = []
-        if "?pagesize" not in url:
-            url = f"{url}?pagesize=500"  # TODO: Move to parameters
-        response = self.hp_http.get_call(
-            url,
-            headers=self.header,
-            error_handling=True,
-        )
-        if "list" not in response.json().keys():
-            return []
-        if int(response.json()["totalPages"]) > 1:
-            i = 0
-            while i <= int(response.json()["totalPages"]):
-                result = (
-                    result
-                    + self.hp_http.get_call(
-                        f"{url}&page={i}",
-                        headers=self.header,
-                        error_handling=True,
-                    ).json()["list"]
-                )
-                i += 1
-        else:
-            result = response.json()["list"]
+        return list(self._iter_all_results(url, concurrency=concurrency, page_size=page_size))
 
-        return result
+    def _iter_all_results(
+        self,
+        url: str,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Internal generator that yields the records of every page as they arrive. The first page tells totalPages,
+        then pages 2..totalPages are fetched, up to concurrency at a time, and yielded in order.
+
+        :param url: (str) url
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy, unless url has a pagesize
+
+        :return: (generator) Records
+        """
+        endpoint = url.split("?")[0]
+        if "pagesize=" not in url.lower():
+            if page_size is None:
+                page_size = self.page_size_policy.page_size(self.tenant, endpoint, ZPA_PAGE_SIZE)
+            url = f"{url}{'&' if '?' in url else '?'}pagesize={page_size}"
+        meter = PageMeter(self.page_size_policy, self.tenant, endpoint, page_size, ZPA_PAGE_SIZE)
+        fetch = meter.wrap(
+            lambda page: self.hp_http.get_call(
+                f"{url}&page={page}",
+                headers=self.header,
+                error_handling=True,
+            )
+        )
+        try:
+            response = fetch(1)
+            if "list" not in response.keys():
+                return
+            meter.count(len(response["list"]))
+            yield from response["list"]
+            pages = fetch_pages(
+                lambda page: fetch(page).get("list", []),
+                range(2, int(response.get("totalPages", 1)) + 1),
+                concurrency=concurrency,
+            )
+            for page in pages:
+                meter.count(len(page))
+                yield from page
+        except Exception:
+            meter.record(failed=True)
+            raise
+        meter.record()
 
     def authenticate(
         self,
         client_id: str,
         client_secret: str,
-        bearer: str,
-
+        bearer: str = None,
     ) -> None:
         """
         Method to obtain the Bearer Token. Refer to https://help.zscaler.com/zpa/adding-api-keys
+        With a credential cache, a cached token of this client is reused when still valid. The token is refreshed in
+        the background shortly before it expires, and right away when it is rejected with a 401.
         :param client_id: (str) client id
         :param client_secret. (str) client secret
         :param bearer (str) leverage existing Bearer Token (optional)
 
         return (json))
         """
-        url = f"/signin"
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
         if bearer:
             self.header = dict(authorization=bearer)
         else:
-            payload = {
-                "client_id": client_id,
-                "client_secret": client_secret,
-            }
-            response = self.hp_http.post_call(
-                url,
-                headers=headers,
-                error_handling=True,
-                payload=payload,
-                urlencoded=True,
+            self.hp_http.token_manager = TokenManager(
+                login=lambda: self._login(client_id, client_secret),
+                target=self,
+                attribute="header",
+                kwarg="headers",
+                credential_cache=self.credential_cache,
+                cloud=self.base_uri,
+                user=client_id,
             )
-            self.header = {
-                "Authorization": f"{response.json()['token_type']} {response.json()['access_token']}"
-            }
+            self.hp_http.token_manager.refresh()
 
         return
 
+    def _login(
+        self,
+        client_id: str,
+        client_secret: str,
+    ) -> tuple:
+        """
+        Internal method to obtain a new Bearer Token
+
+        :param client_id: (str) client id
+        :param client_secret: (str) client secret
+
+        :return: (tuple) (header, epoch of expiry)
+        """
+        url = f"/signin"
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        payload = {
+            "client_id": client_id,
+            "client_secret": client_secret,
+        }
+        response = self.hp_http.post_call(
+            url,
+            headers=headers,
+            error_handling=True,
+            payload=payload,
+            urlencoded=True,
+        ).json()
+        header = {
+            "Authorization": f"{response['token_type']} {response['access_token']}"
+        }
+
+        return header, time.time() + int(response.get("expires_in", 3600))
+
     # app-server-controller
 
     def list_servers(
         self,
         query: str = False,
         server_id: int = None,
+        page_size: int = 500,
     ) -> json:
         """
         Method to obtain all the configured Servers.
 
         :param query: (str) Example ?page=1&pagesize=20&search=consequat
         :param server_id: (int) Unique server id number
+        :param page_size: (int) Number of results returned when query is not given. Default 500
 
         :return: (json)
         """
@@ -140,7 +247,7 @@ class ZpaTalker(object):
             )
         else:
             if not query:
-                query = "?pagesize=500"
+                query = f"?pagesize={page_size}"
             url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/server{query}"
         response = self.hp_http.get_call(
             url,
@@ -154,11 +261,15 @@ class ZpaTalker(object):
     def list_application_segments(
         self,
         application_id: int = None,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> json or list:
         """
         Method to obtain application segments
 
         :param application_id: (int) Application unique identified id
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (json|list)
         """
@@ -172,10 +283,43 @@ class ZpaTalker(object):
             return response.json()
 
         url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/application"
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_application_segments(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_application_segments. Yields application segments page by page as they arrive.
+
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Application segments
+        """
+        url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/application"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
+    def load_segment_index(
+        self,
+        concurrency: int = 1,
+    ) -> AppSegmentIndex:
+        """
+        Method to load the application segments in a reverse index by domain, kept up to date by this talker as it
+        adds, updates and deletes segments, e.g. to check new segments for conflicts
+
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+
+        :return: (AppSegmentIndex)
+        """
+        self.segment_index = AppSegmentIndex(self.iter_application_segments(concurrency=concurrency))
+
+        return self.segment_index
+
     def add_application_segment(
         self,
         name: str,
@@ -269,6 +413,8 @@ class ZpaTalker(object):
             headers=self.header,
             error_handling=True,
         )
+        if self.segment_index is not None:
+            self.segment_index.upsert(response.json())
 
         return response.json()
 
@@ -292,6 +438,14 @@ class ZpaTalker(object):
             headers=self.header,
             error_handling=True,
         )
+        if self.segment_index is not None:
+            current = dict(self.segment_index.segments.get(str(application_id), {}))
+            # The payload replaces the ports of a protocol whichever of its two port fields it sets
+            for fields in (("tcpPortRange", "tcpPortRanges"), ("udpPortRange", "udpPortRanges")):
+                if any(field in payload for field in fields):
+                    for field in fields:
+                        current.pop(field, None)
+            self.segment_index.upsert({**current, **payload, "id": current.get("id", application_id)})
 
         return response
 
@@ -311,6 +465,8 @@ class ZpaTalker(object):
             url=url,
             error_handling=True,
         )
+        if self.segment_index is not None:
+            self.segment_index.remove(application_id)
 
         return response
 
@@ -320,12 +476,16 @@ class ZpaTalker(object):
         self,
         segment_group_id: int = None,
         query: str = False,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> json or list:
         """
         Get all the configured Segment Groups. If segmentGroupId obtains the segment sroup details
 
         :param segment_group_id: (int) The unique identifier of the Segment Group.
         :param query: (str) Example ?page=1&pagesize=20&search=consequat
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         return (json|list)
         """
@@ -335,15 +495,34 @@ class ZpaTalker(object):
                 url, headers=self.header, error_handling=True
             ).json()
         else:
-            if not query:
-                query = "?pagesize=500"
+            query = query or ""
             url = (
                 f"/mgmtconfig/v1/admin/customers/{self.customer_id}/segmentGroup{query}"
             )
-            response = self._obtain_all_results(url)
+            response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_segment_group(
+        self,
+        query: str = False,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_segment_group. Yields segment groups page by page as they arrive.
+
+        :param query: (str) Example ?page=1&pagesize=20&search=consequat
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Segment groups
+        """
+        query = query or ""
+        url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/segmentGroup{query}"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     def add_segment_group(
         self,
         name: str,
@@ -398,11 +577,15 @@ class ZpaTalker(object):
     def list_connector(
         self,
         connector_id: int = None,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> json or list:
         """
         Get all the configured Segment Groups. If segmentGroupId obtains the segment group details
 
         :param connector_id: The unique identifier of the App Connector.
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         return (json|list)
         """
@@ -415,10 +598,27 @@ class ZpaTalker(object):
             ).json()
         else:
             url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/connector"
-            response = self._obtain_all_results(url)
+            response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_connector(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_connector. Yields App Connectors page by page as they arrive.
+
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) App Connectors
+        """
+        url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/connector"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     def update_connector(self, connector_id: int, payload: dict) -> requests.Response:
         """
         Update Connector =
@@ -435,7 +635,7 @@ class ZpaTalker(object):
         ids: list,
     ) -> json:
         """
-        Get all the configured Segment Groups. If segmentGroupId obtains the segment sroup details
+        Bulk delete App Connectors
 
         :param ids: (list) list of resources ids for bulk deleting the App Connectors.
 
@@ -449,18 +649,44 @@ class ZpaTalker(object):
             error_handling=True,
             payload=payload,
         )
+        if not response.content:  # 204 No Content
+            return {}
 
         return response.json()
 
+    def bulk_delete_connectors(
+        self,
+        ids: list,
+        chunk_size: int = 100,
+        concurrency: int = 1,
+    ) -> BulkResult:
+        """
+        Deletes any number of App Connectors, chunk_size per request
+
+        :param ids: (list) list of resources ids of the App Connectors
+        :param chunk_size: (int) Number of App Connectors per request. Default 100
+        :param concurrency: (int) Maximum number of requests sent at the same time
+
+        :return: (BulkResult) IDs deleted and IDs that failed, with the reason
+        """
+        return BulkExecutor(chunk_size=chunk_size, concurrency=concurrency).run(
+            self.delete_bulk_connector,
+            ids,
+        )
+
     # Connector-group-controller
     def list_connector_group(
         self,
         app_connector_group_id: int = None,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> json or list:
         """
         Gets all configured App Connector Groups for a ZPA tenant.
 
         :param app_connector_group_id: (int) The unique identifier of the Connector Group.
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         return (json|list)
         """
@@ -473,10 +699,27 @@ class ZpaTalker(object):
             ).json()
         else:
             url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/appConnectorGroup"
-            response = self._obtain_all_results(url)
+            response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_connector_group(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_connector_group. Yields App Connector Groups page by page as they arrive.
+
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) App Connector Groups
+        """
+        url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/appConnectorGroup"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     def add_connector_group(self, name: str, description: str, latitude: str, longitude: str, location: str, upgradeDay: str = 'SUNDAY',
                             enabled: bool = True,
                             dnsQueryType: str = 'IPV4_IPV6', upgradeTimeInSecs: int = 66600,
@@ -549,60 +792,130 @@ class ZpaTalker(object):
 
     def list_browser_access_certificates(
         self,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> list:  # FIXME: duplicate but URL is slightly different.
         """
         Get all Browser issued certificates
 
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
         :return: (list)
         """
         url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/clientlessCertificate/issued"
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_browser_access_certificates(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_browser_access_certificates.
+
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Certificates
+        """
+        url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/clientlessCertificate/issued"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     # enrollment-cert-controller
 
-    def list_enrollment_certificates(self) -> list:
+    def list_enrollment_certificates(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ) -> list:
         """
         Get all the Enrollment certificates
 
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
         :return: (list)
         """
         url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/enrollmentCert"
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_enrollment_certificates(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_enrollment_certificates.
+
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Certificates
+        """
+        url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/enrollmentCert"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     def list_v1_browser_access_certificates(
         self,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> list:
         """
         Get all the issued certificates
 
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
         :return: (list)
         """
         url = (
             f"/mgmtconfig/v1/admin/customers/{self.customer_id}/visible/versionProfiles"
         )
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_v1_browser_access_certificates(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_v1_browser_access_certificates.
+
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Certificates
+        """
+        url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/visible/versionProfiles"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     # customer-version-profile-controller
 
     def list_customer_version_profile(
         self,
         query: str = False,
+        page_size: int = 500,
     ) -> json:
         """
         Get Version Profiles visible to a customer
 
         :param query: (str) Example ?page=1&pagesize=20&search=consequat
+        :param page_size: (int) Number of results returned when query is not given. Default 500
 
         :return: (json)
         """
         if not query:
-            query = "?pagesize=500"
+            query = f"?pagesize={page_size}"
         url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/visible/versionProfiles{query}"
         response = self.hp_http.get_call(
             url,
@@ -617,12 +930,14 @@ class ZpaTalker(object):
         self,
         group_id: int = None,
         query: str = False,
+        page_size: int = 500,
     ) -> json:
         """
         Get all configured Cloud Connector Groups. If id, Get the Cloud Connector Group details
 
         :param group_id: (int)
         :param query: (str) Example ?page=1&pagesize=20&search=consequat
+        :param page_size: (int) Number of results returned when query is not given. Default 500
 
         :return: (json)
         """
@@ -630,7 +945,7 @@ class ZpaTalker(object):
             url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/cloudConnectorGroup/{group_id}"
         else:
             if not query:
-                query = "?pagesize=500"
+                query = f"?pagesize={page_size}"
             url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/cloudConnectorGroup{query}"
 
         response = self.hp_http.get_call(
@@ -645,38 +960,84 @@ class ZpaTalker(object):
     def list_idp(
         self,
         query: str = False,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> list:
         """
         Method to Get all the idP details for a ZPA tenant
 
         :param query: (str) HTTP query
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (list)
         """
-        if not query:
-            query = "?pagesize=500"
+        query = query or ""
         url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/idp{query}"
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_idp(
+        self,
+        query: str = False,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_idp. Yields idP details page by page as they arrive.
+
+        :param query: (str) HTTP query
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) idPs
+        """
+        query = query or ""
+        url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/idp{query}"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     # provisioningKey-controller
     def list_provisioning_key(
         self,
         association_type: str = "CONNECTOR_GRP",
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> list:
         """
         Gets details of all the configured provisioning keys.
 
         :param association_type: (str) The supported values are CONNECTOR_GRP and SERVICE_EDGE_GRP.
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (list)
         """
         url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/associationType/{association_type}/provisioningKey"
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_provisioning_key(
+        self,
+        association_type: str = "CONNECTOR_GRP",
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_provisioning_key.
+
+        :param association_type: (str) The supported values are CONNECTOR_GRP and SERVICE_EDGE_GRP.
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Provisioning keys
+        """
+        url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/associationType/{association_type}/provisioningKey"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     # policy-set-controller
 
     # scim-attribute-header-controller
@@ -685,15 +1046,17 @@ class ZpaTalker(object):
         self,
         idp_id: int,
         query: str = False,
+        page_size: int = 500,
     ) -> json:
         """
         :param idp_id: (int) The unique identifies of the Idp
         :param query: (str) ?page=1&pagesize=20&search=consequat
+        :param page_size: (int) Number of results returned when query is not given. Default 500
 
         :return: (json)
         """
         if not query:
-            query = "?pagesize=500"
+            query = f"?pagesize={page_size}"
         url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/idp/{idp_id}/scimattribute{query}"
         response = self.hp_http.get_call(
             url,
@@ -708,52 +1071,256 @@ class ZpaTalker(object):
         self,
         idp_id: int,
         query: str = False,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> list:
         """
         Method to list all SCIM groups
 
         :param idp_id: (int) The unique identifies of the Idp
         :param query: (str) ?page=1&pagesize=20&search=consequat
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (list)
         """
-        if not query:
-            query = "?pagesize=500"
+        query = query or ""
         url = f"/userconfig/v1/customers/{self.customer_id}/scimgroup/idpId/{idp_id}{query}"
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_scim_groups(
+        self,
+        idp_id: int,
+        query: str = False,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_scim_groups. Yields SCIM groups page by page as they arrive, so large directories
+        can be processed with constant memory.
+
+        :param idp_id: (int) The unique identifies of the Idp
+        :param query: (str) ?page=1&pagesize=20&search=consequat
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) SCIM groups
+        """
+        query = query or ""
+        url = f"/userconfig/v1/customers/{self.customer_id}/scimgroup/idpId/{idp_id}{query}"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     # saml-attr-controller-v-2
-    def list_saml_attributes(self) -> list:
+    def list_saml_attributes(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ) -> list:
         """
         Method to get all SAML attributes
 
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
         :return: (list)
         """
         url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/samlAttribute"
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_saml_attributes(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_saml_attributes.
+
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) SAML attributes
+        """
+        url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/samlAttribute"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     # global-policy-controller
 
+    def list_all_scim_groups(
+        self,
+        concurrency: int = 1,
+    ) -> list:
+        """
+        Method to list the SCIM groups of all the IdPs
+
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+
+        :return: (list)
+        """
+        scim_groups = []
+        for idp in self.list_idp():
+            scim_groups.extend(self.list_scim_groups(idp_id=idp["id"], concurrency=concurrency))
+
+        return scim_groups
+
     def list_policies(
         self,
         policy_type: str = "ACCESS_POLICY",
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> list:
         """list policie(s)  by policy type,
 
         :param policy_type: (str) Supported values Possible values = ACCESS_POLICY,GLOBAL_POLICY, TIMEOUT_POLICY,
         REAUTH_POLICY, SIEM_POLICY, CLIENT_FORWARDING_POLICY,BYPASS_POLICY
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (list)
         """
         url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/policySet/rules/policyType/{policy_type}"
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_policies(
+        self,
+        policy_type: str = "ACCESS_POLICY",
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_policies. Yields policy rules page by page as they arrive.
+
+        :param policy_type: (str) Supported values Possible values = ACCESS_POLICY,GLOBAL_POLICY, TIMEOUT_POLICY,
+        REAUTH_POLICY, SIEM_POLICY, CLIENT_FORWARDING_POLICY,BYPASS_POLICY
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Policy rules
+        """
+        url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/policySet/rules/policyType/{policy_type}"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
+    def export_all(
+        self,
+        directory: str,
+        concurrency: int = 8,
+        collections: list = None,
+    ) -> dict:
+        """
+        Method to export the configuration of the tenant, one NDJSON file per collection and a manifest.json with the
+        count and duration of each. Collections are fetched at the same time within the rate limits, and the SCIM
+        groups of each IdP are fetched at the same time too.
+
+        :param directory: (str) Export directory, created if missing
+        :param concurrency: (int) Maximum number of calls in flight
+        :param collections: (list) Optional names of the collections to export, e.g. ["app_segments"]. Default all
+
+        :return: (dict) Manifest
+        """
+        customer_url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}"
+        exports = {
+            "app_segments": self.iter_application_segments,
+            "segment_groups": self.iter_segment_group,
+            "server_groups": self.iter_server_groups,
+            "servers": lambda: self._iter_all_results(f"{customer_url}/server"),
+            "connectors": self.iter_connector,
+            "connector_groups": self.iter_connector_group,
+            "cloud_connector_groups": lambda: self._iter_all_results(f"{customer_url}/cloudConnectorGroup"),
+            "version_profiles": lambda: self._iter_all_results(f"{customer_url}/visible/versionProfiles"),
+            "idps": self.iter_idp,
+            "saml_attributes": self.iter_saml_attributes,
+            "posture_profiles": self.iter_posture_profiles,
+            "provisioning_keys_connector": lambda: self.iter_provisioning_key(association_type="CONNECTOR_GRP"),
+            "provisioning_keys_service_edge": lambda: self.iter_provisioning_key(association_type="SERVICE_EDGE_GRP"),
+            "browser_access_certificates": self.iter_browser_access_certificates,
+            "enrollment_certificates": self.iter_enrollment_certificates,
+            "issued_certificates": self.iter_issued_certificates,
+            "privileged_consoles": self.iter_privileged_consoles,
+            "sra_consoles": self.list_sra_consoles,
+        }
+        for policy_type in (
+            "ACCESS_POLICY",
+            "TIMEOUT_POLICY",
+            "REAUTH_POLICY",
+            "SIEM_POLICY",
+            "CLIENT_FORWARDING_POLICY",
+            "BYPASS_POLICY",
+        ):
+            exports[f"policies_{policy_type.lower()}"] = functools.partial(self.iter_policies, policy_type=policy_type)
+        fan_outs = {
+            "scim_groups": ("idps", lambda idp_id: self.list_scim_groups(idp_id=idp_id)),
+        }
+        if collections is not None:
+            exports = {name: call for name, call in exports.items() if name in collections}
+            fan_outs = {name: fan_out for name, fan_out in fan_outs.items() if name in collections}
+            if fan_outs and "idps" not in exports:
+                exports["idps"] = self.iter_idp
+
+        return ConfigExporter(exports, fan_outs=fan_outs, concurrency=concurrency).export(directory)
+
+    def name_resolver(
+        self,
+        ttl: float = 3600,
+        snapshot_store: SnapshotStore = None,
+    ) -> NameResolver:
+        """
+        Method to get a resolver of the names of application segments, segment groups, server groups, connector
+        groups, IdPs, posture profiles, SAML attributes and SCIM groups to the IDs policy operands take
+
+        :param ttl: (float) Seconds a collection is kept for
+        :param snapshot_store: (SnapshotStore) Optional snapshot the collections are loaded from
+
+        :return: (NameResolver)
+        """
+
+        def loader(method: str):
+            if snapshot_store:
+                return lambda: snapshot_store.get(self, method)
+            return getattr(self, method)
+
+        return NameResolver(
+            {
+                "app_segments": loader("list_application_segments"),
+                "segment_groups": loader("list_segment_group"),
+                "server_groups": loader("list_server_groups"),
+                "connector_groups": loader("list_connector_group"),
+                "idps": loader("list_idp"),
+                "posture_profiles": loader("list_posture_profiles"),
+                "saml_attributes": loader("list_saml_attributes"),
+                "scim_groups": loader("list_all_scim_groups"),
+            },
+            ttl=ttl,
+        )
+
+    def access_policy_simulator(
+        self,
+        policies: list = None,
+    ) -> AccessPolicySimulator:
+        """
+        Method to load the access policy, application segments, segment groups, SAML attributes and SCIM groups in a
+        simulator that tells which rule allows or denies a user access to host:port, without the live cloud. The
+        segments come from the segment index when load_segment_index was called.
+
+        :param policies: (list) Optional proposed access policy rules to evaluate instead of the live ones
+
+        :return: (AccessPolicySimulator)
+        """
+        return AccessPolicySimulator(
+            self.list_policies("ACCESS_POLICY") if policies is None else policies,
+            self.segment_index if self.segment_index is not None else self.list_application_segments(),
+            segment_groups=self.list_segment_group(),
+            saml_attributes=self.list_saml_attributes(),
+            scim_groups=self.list_all_scim_groups(),
+        )
+
     def list_policy_set(
         self,
         policy_type: str = "ACCESS_POLICY",
@@ -840,11 +1407,15 @@ class ZpaTalker(object):
     def list_server_groups(
         self,
         group_id: int = None,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> json or list:
         """
         Method to get all configured Server Groups. If groupI, get the Server Group details
 
         :param group_id: (int) The unique identifier of the Server Group.
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (json|list)
         """
@@ -857,10 +1428,27 @@ class ZpaTalker(object):
             ).json()
         else:
             url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/serverGroup"
-            response = self._obtain_all_results(url)
+            response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_server_groups(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_server_groups. Yields Server Groups page by page as they arrive.
+
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Server Groups
+        """
+        url = f"/mgmtconfig/v1/admin/customers/{self.customer_id}/serverGroup"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     def add_server_groups(
         self,
         name: str,
@@ -896,47 +1484,100 @@ class ZpaTalker(object):
     def list_posture_profiles(
         self,
         query: str = False,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> list:
         """
         Method to Get all the idP details for a ZPA tenant
 
         :param query: (str) HTTP query
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (list)
         """
-        if not query:
-            query = "?pagesize=500"
+        query = query or ""
         url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/posture{query}"
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
+    def iter_posture_profiles(
+        self,
+        query: str = False,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_posture_profiles.
+
+        :param query: (str) HTTP query
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Posture profiles
+        """
+        query = query or ""
+        url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/posture{query}"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
     def list_privileged_consoles(
         self,
         query: str = False,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> list:
         """
         Method to Get all the privileged_remote_consoles for a ZPA tenant
 
         :param query: (str) HTTP query
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
 
         :return: (list)
         """
-        if not query:
-            query = "?pagesize=500"
+        query = query or ""
         url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/privilegedConsoles{query}"
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
 
-    def list_sra_consoles(self) -> list:
+    def iter_privileged_consoles(
+        self,
+        query: str = False,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_privileged_consoles.
+
+        :param query: (str) HTTP query
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Privileged consoles
+        """
+        query = query or ""
+        url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/privilegedConsoles{query}"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
+    def list_sra_consoles(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ) -> list:
         """
         Method to obtain list of sra consoles from all application segments
 
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
         :return: (list)
         """
         sra_list = []
-        app_segments = self.list_application_segments()
+        app_segments = self.list_application_segments(concurrency=concurrency, page_size=page_size)
         for apps in app_segments:
             srap = apps.get("sraApps")
             if srap is not None:
@@ -948,16 +1589,47 @@ class ZpaTalker(object):
     def list_issued_certificates(
         self,
         query: str = None,
+        concurrency: int = 1,
+        page_size: int = None,
     ) -> list:
         """
         Method to get all issued certificates
 
+        :param concurrency: (int) Maximum number of pages fetched at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
         :return: (list)
         """
         if not query:
             query = "?pagesize=500"  # TODO: Query never put into url.
 
         url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/certificate/issued"
-        response = self._obtain_all_results(url)
+        response = self._obtain_all_results(url, concurrency=concurrency, page_size=page_size)
 
         return response
+
+    def iter_issued_certificates(
+        self,
+        concurrency: int = 1,
+        page_size: int = None,
+    ):
+        """
+        Generator version of list_issued_certificates.
+
+        :param concurrency: (int) Maximum number of pages fetched ahead at the same time. Default 1 (serial)
+        :param page_size: (int) Page size. Default is chosen by the page size policy
+
+        :return: (generator) Certificates
+        """
+        url = f"/mgmtconfig/v2/admin/customers/{self.customer_id}/certificate/issued"
+
+        return self._iter_all_results(url, concurrency=concurrency, page_size=page_size)
+
+
+class AsyncZpaTalker(AsyncTalker):
+    """
+    asyncio version of ZpaTalker. Every public ZpaTalker method is available as a coroutine with the same name and
+    parameters.
+    """
+
+    talker_class = ZpaTalker